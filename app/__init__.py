@@ -19,6 +19,11 @@ def create_app(config_object=None):
     register_extensions(app)
     # Importa modelos para povoar o metadata do SQLAlchemy/Alembic.
     from app import models  # noqa: F401
+    from app.utils.estatisticas import registrar_agendamento
+    from app.utils.progresso import registrar_eventos_status
+
+    registrar_eventos_status()
+    registrar_agendamento()
     register_blueprints(app)
 
     return app
@@ -47,13 +52,51 @@ def register_blueprints(app: Flask) -> None:
 
 
 def make_celery(app: Flask) -> Celery:
-    """Cria instância do Celery acoplada ao contexto do Flask."""
+    """
+    Cria instância do Celery acoplada ao contexto do Flask, com a topologia de filas:
+    - fila interativa e fila de lote (roteamento estático para coordenadores/subtarefas de lote;
+      o resto é decidido por tamanho do job em `app.tasks.submissao.enfileirar`);
+    - prioridades, limites de tempo por tarefa e prefetch=1/acks_late para tarefas longas de CPU.
+    A instância fica em app.extensions["celery"].
+    """
+    from kombu import Exchange, Queue
+
     celery = Celery(
         app.import_name,
         broker=app.config.get("CELERY_BROKER_URL"),
         backend=app.config.get("CELERY_RESULT_BACKEND"),
     )
-    celery.conf.update(app.config)
+    # Broker/backend vêm do construtor; o restante do config Flask (chaves CELERY_* no formato antigo)
+    # não é copiado, pois o Celery recusa misturar chaves antigas com as configurações abaixo.
+    fila_interativa = app.config.get("CELERY_FILA_INTERATIVA", "interativo")
+    fila_lote = app.config.get("CELERY_FILA_LOTE", "lote")
+    limite_hard = max((hard for _, hard in app.config.get("CELERY_LIMITES_TEMPO", {}).values()), default=3600)
+    celery.conf.update(
+        task_queues=(
+            Queue(fila_interativa, Exchange(fila_interativa), routing_key=fila_interativa),
+            Queue(fila_lote, Exchange(fila_lote), routing_key=fila_lote),
+        ),
+        task_default_queue=fila_interativa,
+        task_default_priority=app.config.get("CELERY_PRIORIDADE_INTERATIVA", 0),
+        task_routes={
+            padrao: {"queue": fila_lote, "priority": prioridade}
+            for padrao, prioridade in app.config.get("CELERY_ROTAS_LOTE", {}).items()
+        },
+        task_annotations={
+            nome: {"soft_time_limit": soft, "time_limit": hard}
+            for nome, (soft, hard) in app.config.get("CELERY_LIMITES_TEMPO", {}).items()
+        },
+        # Tarefas longas de CPU: cada processo reserva uma mensagem por vez e só confirma ao terminar.
+        worker_prefetch_multiplier=1,
+        task_acks_late=True,
+        broker_transport_options={
+            "priority_steps": list(range(10)),
+            "sep": ":",
+            "queue_order_strategy": "priority",
+            # com acks_late a mensagem volta para a fila após o visibility_timeout: precisa superar o maior limite
+            "visibility_timeout": 2 * limite_hard,
+        },
+    )
 
     class ContextTask(celery.Task):
         def __call__(self, *args, **kwargs):
@@ -61,4 +104,5 @@ def make_celery(app: Flask) -> Celery:
                 return self.run(*args, **kwargs)
 
     celery.Task = ContextTask
+    app.extensions["celery"] = celery
     return celery
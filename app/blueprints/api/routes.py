@@ -1,9 +1,14 @@
-from flask import jsonify
+import json
+
+from flask import Response, current_app, jsonify, request, stream_with_context
 from shapely.geometry import mapping
 
 from app.blueprints.api import api_bp
 from app import db
-import sqlalchemy as sa
+from app.utils.http import resposta_gzip
+
+# Contornos não mudam depois de gravados (id novo a cada cálculo).
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
 
 
 @api_bp.route("/health", methods=["GET"])
@@ -12,10 +17,21 @@ def health() -> tuple:
     return jsonify(status="ok"), 200
 
 
+@api_bp.route("/ready", methods=["GET"])
+def ready() -> tuple:
+    """Prontidão: 200 depois do aquecimento do processo (curvas, normas, terreno), 503 antes."""
+    from app.utils.aquecimento import estado
+
+    atual = estado()
+    return jsonify(atual), 200 if atual["pronto"] else 503
+
+
 @api_bp.route("/simulacoes/<sim_id>/status", methods=["GET"])
 def simulacao_status(sim_id: str):
     """Retorna status e mensagem de uma simulação."""
     from app.models import Simulacao  # import tardio para evitar ciclos
+    from app.utils.progresso import ultimo_evento
+
     sim = Simulacao.query.get(sim_id)
     if not sim:
         return jsonify(error="simulação não encontrada"), 404
@@ -26,6 +42,8 @@ def simulacao_status(sim_id: str):
             status=sim.status,
             mensagem_status=sim.mensagem_status,
             params=sim.params,
+            resultado=sim.resultado,
+            progresso=ultimo_evento(sim.id),
             created_at=sim.created_at,
             updated_at=sim.updated_at,
         ),
@@ -33,107 +51,194 @@ def simulacao_status(sim_id: str):
     )
 
 
+@api_bp.route("/simulacoes/<sim_id>/eventos", methods=["GET"])
+def simulacao_eventos(sim_id: str):
+    """
+    Stream SSE (text/event-stream) com o progresso da simulação: radiais, interferentes,
+    tempos por etapa e mudanças de status. Encerra no status final (done/failed/cancelled).
+    O banco só é consultado se ainda não houver evento publicado.
+    """
+    from app.models import Simulacao  # late import
+    from app.utils.progresso import STATUS_FINAIS, eventos, ultimo_evento
+
+    def formatar(ev: dict) -> str:
+        return f"event: {ev['evento']}\ndata: {json.dumps(ev, default=str)}\n\n"
+
+    if ultimo_evento(sim_id) is None:
+        sim = Simulacao.query.get(sim_id)
+        if not sim:
+            return jsonify(error="simulação não encontrada"), 404
+        if sim.status in STATUS_FINAIS:
+            ev = {"sim_id": sim.id, "evento": "status", "status": sim.status, "mensagem": sim.mensagem_status}
+            return Response(formatar(ev), mimetype="text/event-stream")
+
+    heartbeat = current_app.config.get("SSE_HEARTBEAT_S", 15)
+    max_s = current_app.config.get("SSE_MAX_S", 600)
+
+    def gerar():
+        for ev in eventos(sim_id, heartbeat_s=heartbeat, max_s=max_s):
+            yield ": keepalive\n\n" if ev is None else formatar(ev)
+
+    return Response(
+        stream_with_context(gerar()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@api_bp.route("/simulacoes/<sim_id>/cancelar", methods=["POST"])
+def simulacao_cancelar(sim_id: str):
+    """
+    Cancela uma simulação. Se ainda está na fila, a tarefa é revogada e o status vira `cancelled`;
+    em execução, o status gravado vira `cancelando` (deixa de coalescer submissões idênticas) e a tarefa
+    encerra no próximo bloco de radiais/interferentes/pares.
+    """
+    from app.models import Simulacao  # late import
+    from app.tasks.submissao import cancelar_simulacao
+    from app.utils.progresso import STATUS_FINAIS
+
+    sim = Simulacao.query.get(sim_id)
+    if not sim:
+        return jsonify(error="simulação não encontrada"), 404
+    if sim.status in STATUS_FINAIS:
+        return jsonify(error=f"simulação já finalizada ({sim.status})"), 409
+    status = cancelar_simulacao(sim)
+    return jsonify(id=sim.id, status=status), 202
+
+
+@api_bp.route("/simulacoes/<sim_id>/resultado", methods=["GET"])
+def simulacao_resultado(sim_id: str):
+    """
+    Resultado detalhado gravado pela simulação (por radial e por interferente), sem recálculo.
+    Parâmetros: campos=radiais.dist_km,interferentes.margem_db (filtra arrays);
+    formato=bin devolve os bytes empacotados (float32/int32 LE) com o layout no header X-Layout.
+    """
+    from app.models import ResultadoSimulacao  # late import
+    from app.utils.resultados import resultado_para_dict
+
+    res = ResultadoSimulacao.query.get(sim_id)
+    if not res:
+        return jsonify(error="resultado não encontrado"), 404
+    if request.args.get("formato") == "bin":
+        return Response(
+            res.dados,
+            mimetype="application/octet-stream",
+            headers={"X-Layout": json.dumps(res.layout)},
+        )
+    campos = request.args.get("campos")
+    return jsonify(resultado_para_dict(res, campos.split(",") if campos else None))
+
+
+@api_bp.route("/simulacoes/<sim_id>/lote", methods=["GET"])
+def simulacao_lote(sim_id: str):
+    """Progresso agregado de um lote (contagem de simulações-filhas por status)."""
+    from app.models import Simulacao  # late import
+    from app.tasks.lote import progresso_lote
+
+    sim = Simulacao.query.get(sim_id)
+    if not sim:
+        return jsonify(error="simulação não encontrada"), 404
+    if not sim.tipo.startswith("lote_"):
+        return jsonify(error="simulação não é um lote"), 400
+    resumo = (sim.resultado or {}).get("resumo")
+    return jsonify(id=sim.id, tipo=sim.tipo, status=sim.status, progresso=progresso_lote(sim.id), resumo=resumo)
+
+
 @api_bp.route("/simulacoes/<sim_id>/contornos", methods=["GET"])
 def simulacao_contornos(sim_id: str):
-    """Retorna FeatureCollection GeoJSON dos contornos de uma simulação."""
-    from app.models import Simulacao, ResultadoCobertura  # late import
-    from app.utils.gis import geom_to_geojson
-
+    """
+    Retorna FeatureCollection GeoJSON dos contornos de uma simulação.
+    Parâmetros opcionais: tolerance (graus) ou zoom para simplificação; precision (casas decimais).
+    """
+    from app.models import Simulacao  # late import
+    from app.utils.contornos import contornos_simulacao_gzip, parametros_simplificacao
+    from app.utils.progresso import STATUS_FINAIS
+
+    try:
+        tolerancia, precisao = parametros_simplificacao(request.args)
+    except ValueError as exc:
+        return jsonify(error=f"parâmetros inválidos: {exc}"), 400
     sim = Simulacao.query.get(sim_id)
     if not sim:
         return jsonify(error="simulação não encontrada"), 404
 
-    results = (
-        ResultadoCobertura.query.filter_by(simulacao_id=sim_id)
-        .order_by(ResultadoCobertura.id)
-        .all()
+    # contornos só são gravados ao fim da simulação: em status final a coleção não muda mais
+    final = sim.status in STATUS_FINAIS
+    corpo = contornos_simulacao_gzip(sim_id, tolerancia, precisao, final)
+    if not final:
+        return resposta_gzip(corpo, "application/geo+json", cache_control="no-cache")
+    return resposta_gzip(
+        corpo, "application/geo+json", f"simulacao-{sim_id}-{tolerancia}-{precisao}", CACHE_IMUTAVEL
     )
-    features = []
-    for r in results:
-        gj = geom_to_geojson(r.geom)
-        if not gj:
-            continue
-        features.append(
-            {
-                "type": "Feature",
-                "geometry": gj,
-                "properties": {
-                    "id": r.id,
-                    "simulacao_id": sim_id,
-                    "tipo_contorno": r.tipo_contorno,
-                    "nivel_campo_dbuv_m": r.nivel_campo_dbuv_m,
-                },
-            }
-        )
-    return jsonify({"type": "FeatureCollection", "features": features})
 
 
 @api_bp.route("/contornos/<int:contorno_id>", methods=["GET"])
 def contorno_geojson(contorno_id: int):
-    """Retorna um contorno específico (Feature GeoJSON)."""
-    from app.models import ResultadoCobertura  # late import
-    from app.utils.gis import feature_from_geom
-
-    r = ResultadoCobertura.query.get(contorno_id)
-    if not r:
+    """
+    Retorna um contorno específico (Feature GeoJSON).
+    Parâmetros opcionais: tolerance (graus) ou zoom para simplificação; precision (casas decimais).
+    """
+    from app.utils.contornos import contorno_gzip, parametros_simplificacao
+
+    try:
+        tolerancia, precisao = parametros_simplificacao(request.args)
+    except ValueError as exc:
+        return jsonify(error=f"parâmetros inválidos: {exc}"), 400
+    corpo = contorno_gzip(contorno_id, tolerancia, precisao)
+    if corpo is None:
         return jsonify(error="contorno não encontrado"), 404
-    feat = feature_from_geom(
-        r.geom,
-        {
-            "id": r.id,
-            "simulacao_id": r.simulacao_id,
-            "tipo_contorno": r.tipo_contorno,
-            "nivel_campo_dbuv_m": r.nivel_campo_dbuv_m,
-        },
+    return resposta_gzip(
+        corpo, "application/geo+json", f"contorno-{contorno_id}-{tolerancia}-{precisao}", CACHE_IMUTAVEL
     )
-    if not feat:
-        return jsonify(error="geometria ausente"), 404
-    return jsonify(feat)
 
 
 @api_bp.route("/contornos/<int:contorno_id>/stats", methods=["GET"])
 def contorno_stats(contorno_id: int):
     """
-    Retorna área (km²) e população estimada pela interseção com setores censitários.
-    População ponderada pela fração de área do setor sobreposta ao contorno (pop_total pode ser nula).
+    Retorna área (km²), população estimada, setores interceptados e quebra por município do contorno.
+    As estatísticas exatas são calculadas em background após a gravação do contorno
+    (tabela estatisticas_contorno) e refeitas só quando a versão do censo muda.
+    Parâmetro `modo`:
+      - (ausente): estatística gravada; se ainda não existir (ou estiver desatualizada), agenda o
+        cálculo e responde com a estimativa da grade (`pendente: true`);
+      - grade: soma das células da grade nacional de população (ver app.utils.etl.build_pop_grid);
+      - exato: estatística gravada ou, se não houver, calculada na hora (setores_subdivididos).
+    Sem grade gerada, o cálculo exato é feito na requisição.
     """
+    from geoalchemy2.shape import to_shape
+
     from app.models import ResultadoCobertura  # late import
+    from app.utils import estatisticas
+    from app.utils.populacao import carregar_grade, estimar_grade
 
+    modo = (request.args.get("modo") or "").lower() or None
+    if modo not in (None, "grade", "exato"):
+        return jsonify(error="modo deve ser grade ou exato"), 400
     contorno = ResultadoCobertura.query.get(contorno_id)
     if not contorno or not contorno.geom:
         return jsonify(error="contorno não encontrado ou sem geometria"), 404
 
-    poly_wkt = db.session.scalar(sa.select(sa.func.ST_AsEWKT(contorno.geom)))
-    if not poly_wkt:
-        return jsonify(error="geometria inválida"), 404
-
-    sql = sa.text(
-        """
-        WITH poly AS (SELECT ST_GeomFromText(:poly, 4674) AS g),
-        setores AS (
-          SELECT
-            s.id,
-            s.pop_total,
-            ST_Area(s.geom::geography)/1e6 AS area_setor_km2,
-            ST_Area(ST_Intersection(s.geom, p.g)::geography)/1e6 AS area_int_km2
-          FROM setores_censitarios s
-          CROSS JOIN poly p
-          WHERE ST_Intersects(s.geom, p.g)
+    if modo != "grade":
+        est = estatisticas.vigente(contorno_id)
+        if est is not None:
+            return jsonify(modo="exato", **estatisticas.para_dict(est))
+
+    grade = carregar_grade() if modo != "exato" else None
+    if grade is not None:
+        pendente = modo is None
+        if pendente:
+            estatisticas.agendar(contorno_id)
+        estimativa = estimar_grade(to_shape(contorno.geom), grade)
+        return jsonify(
+            contorno_id=contorno_id,
+            modo="grade",
+            area_km2=estimativa["area_km2"],
+            pop_estimada=estimativa["pop_estimada"],
+            celulas=estimativa["celulas"],
+            versao_censo=estimativa["versao_censo"],
+            pendente=pendente,
         )
-        SELECT
-          COALESCE(SUM(area_int_km2),0) AS area_km2,
-          SUM(CASE WHEN pop_total IS NULL THEN NULL
-                   WHEN area_setor_km2 > 0 THEN pop_total * (area_int_km2 / area_setor_km2)
-                   ELSE NULL END) AS pop_estimada,
-          COUNT(*) AS setores_intersect
-        FROM setores
-        WHERE area_int_km2 > 0;
-        """
-    )
-    row = db.session.execute(sql, {"poly": poly_wkt}).fetchone()
-    return jsonify(
-        contorno_id=contorno_id,
-        area_km2=float(row.area_km2) if row and row.area_km2 is not None else 0.0,
-        pop_estimada=float(row.pop_estimada) if row and row.pop_estimada is not None else None,
-        setores_intersect=int(row.setores_intersect) if row and row.setores_intersect is not None else 0,
-    )
+
+    est = estatisticas.calcular(contorno_id)
+    db.session.commit()
+    return jsonify(modo="exato", **estatisticas.para_dict(est))
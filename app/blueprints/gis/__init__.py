@@ -5,5 +5,9 @@ gis_bp = Blueprint("gis", __name__)
 
 @gis_bp.route("/ping", methods=["GET"])
 def ping():
-    """Placeholder para serviços GIS."""
+    """Ping simples do módulo GIS."""
     return {"service": "gis", "message": "ok"}, 200
+
+
+# Importa rotas
+from app.blueprints.gis import routes  # noqa: E402,F401
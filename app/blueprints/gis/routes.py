@@ -0,0 +1,26 @@
+import hashlib
+
+from flask import current_app, jsonify, request
+
+from app.blueprints.gis import gis_bp
+from app.utils.http import resposta_gzip
+from app.utils.mvt import CAMADAS, normalizar_filtros, tile_gzip, tile_valido
+
+
+@gis_bp.route("/tiles/<camada>/<int:z>/<int:x>/<int:y>.mvt", methods=["GET"])
+def tile_mvt(camada: str, z: int, x: int, y: int):
+    """
+    Tile vetorial (MVT) de estações ou contornos.
+    Camadas: estacoes_fm, estacoes_tv, estacoes_radcom, resultados_cobertura.
+    Filtros opcionais: uf/servico (FM/TV), tecnologia (TV), simulacao_id/tipo_contorno (contornos).
+    """
+    if camada not in CAMADAS:
+        return jsonify(error=f"camada desconhecida; use {', '.join(CAMADAS)}"), 404
+    if not tile_valido(z, x, y):
+        return jsonify(error="tile fora do intervalo z/x/y"), 400
+    filtros = normalizar_filtros(camada, request.args)
+    dados, chave = tile_gzip(camada, z, x, y, filtros)
+
+    etag = hashlib.sha1(chave.encode()).hexdigest()[:20]
+    max_age = current_app.config.get("MVT_MAX_AGE_S", 60)
+    return resposta_gzip(dados, "application/vnd.mapbox-vector-tile", etag, f"public, max-age={max_age}")
@@ -5,7 +5,8 @@ from app.blueprints.radcom import radcom_bp
 from app.models import EstacaoRadcom, Simulacao
 from app import db
 from app.tasks import radcom_viabilidade
-from app.utils.gis import geom_to_geojson
+from app.tasks.submissao import enfileirar
+from app.utils.listagem import listar
 
 
 @radcom_bp.route("/ping", methods=["GET"])
@@ -21,12 +22,13 @@ def listar_estacoes_radcom():
     Parâmetros:
       - municipio (substring)
       - bbox: xmin,ymin,xmax,ymax (SRID 4674)
-      - limit: padrão 100, máx 1000
+      - limit: registros por página (default 100; 0 = todos)
+      - cursor: último id da página anterior (paginação keyset)
+      - formato: json (default) ou ndjson
     """
     query = EstacaoRadcom.query
     municipio = request.args.get("municipio")
     bbox = request.args.get("bbox")
-    limit = min(int(request.args.get("limit", 100)), 1000)
 
     if municipio:
         like = f"%{municipio}%"
@@ -41,21 +43,14 @@ def listar_estacoes_radcom():
         except Exception:
             return jsonify(error="bbox inválido. Use xmin,ymin,xmax,ymax"), 400
 
-    rows = query.limit(limit).all()
-    data = []
-    for est in rows:
-        data.append(
-            {
-                "id": est.id,
-                "municipio_outorga": est.municipio_outorga,
-                "canal": est.canal,
-                "erp_w": est.erp_w,
-                "altura_sistema_m": est.altura_sistema_m,
-                "geom": geom_to_geojson(est.geom),
-                "area_prestacao": geom_to_geojson(est.area_prestacao),
-            }
-        )
-    return jsonify(count=len(data), results=data)
+    colunas = {
+        "municipio_outorga": EstacaoRadcom.municipio_outorga,
+        "canal": EstacaoRadcom.canal,
+        "erp_w": EstacaoRadcom.erp_w,
+        "altura_sistema_m": EstacaoRadcom.altura_sistema_m,
+    }
+    geometrias = {"geom": EstacaoRadcom.geom, "area_prestacao": EstacaoRadcom.area_prestacao}
+    return listar(query, EstacaoRadcom, colunas, geometrias)
 
 
 @radcom_bp.route("/viabilidade", methods=["POST"])
@@ -76,7 +71,7 @@ def viabilidade_radcom():
     db.session.commit()
 
     try:
-        radcom_viabilidade.delay(sim.id, payload)
+        enfileirar("app.tasks.radcom.viabilidade", (sim.id, payload), sim=sim)
     except Exception:
         # Se o broker estiver indisponível, executa de forma síncrona para não falhar a requisição.
         radcom_viabilidade.run(sim.id, payload)
@@ -3,10 +3,14 @@ import sqlalchemy as sa
 from sqlalchemy import func
 
 from app.blueprints.tv import tv_bp
-from app.models import EstacaoTV, Simulacao
+from app.models import EstacaoTV, MatrizInterferencia, Simulacao
 from app import db
-from app.tasks.tv import gerar_contorno_tv, avaliar_viabilidade_tv
-from app.utils.gis import geom_to_geojson
+from app.tasks.interferencia import executar_lote
+from app.tasks.lote import criar_lote, resolver_estacoes
+from app.tasks.matriz import criar_simulacao_matriz
+from app.tasks.submissao import chave_simulacao, criar_simulacao, enfileirar
+from app.utils.estacoes import hash_estacao
+from app.utils.listagem import listar
 from app.utils.propagacao.p526_assis import field_strength_p2p
 
 
@@ -25,14 +29,15 @@ def listar_estacoes_tv():
       - tecnologia (digital/analogica)
       - servico (TV/RTV/GTVD/RTVD)
       - bbox: xmin,ymin,xmax,ymax (SRID 4674)
-      - limit (default 100, máx 1000)
+      - limit: registros por página (default 100; 0 = todos)
+      - cursor: último id da página anterior (paginação keyset)
+      - formato: json (default) ou ndjson
     """
     query = EstacaoTV.query
     uf = request.args.get("uf")
     tecnologia = request.args.get("tecnologia")
     servico = request.args.get("servico")
     bbox = request.args.get("bbox")
-    limit = min(int(request.args.get("limit", 100)), 1000)
 
     if uf:
         query = query.filter(EstacaoTV.uf == uf.upper())
@@ -50,32 +55,25 @@ def listar_estacoes_tv():
         except Exception:
             return jsonify(error="bbox inválido. Use xmin,ymin,xmax,ymax"), 400
 
-    rows = query.limit(limit).all()
-    data = []
-    for est in rows:
-        data.append(
-            {
-                "id": est.id,
-                "id_plano": est.id_plano,
-                "servico": est.servico,
-                "tecnologia": est.tecnologia,
-                "canal": est.canal,
-                "classe": est.classe,
-                "freq_mhz": est.freq_mhz,
-                "erp_kw": est.erp_max_kw,
-                "hnmt_m": est.hnmt_m,
-                "uf": est.uf,
-                "municipio": est.municipio,
-                "status": est.status,
-                "entidade": est.entidade,
-                "carater": est.carater,
-                "categoria": est.categoria,
-                "geom": geom_to_geojson(est.geom),
-                "erp_por_radial": est.erp_por_radial,
-                "observacoes": est.observacoes,
-            }
-        )
-    return jsonify(count=len(data), results=data)
+    colunas = {
+        "id_plano": EstacaoTV.id_plano,
+        "servico": EstacaoTV.servico,
+        "tecnologia": EstacaoTV.tecnologia,
+        "canal": EstacaoTV.canal,
+        "classe": EstacaoTV.classe,
+        "freq_mhz": EstacaoTV.freq_mhz,
+        "erp_kw": EstacaoTV.erp_max_kw,
+        "hnmt_m": EstacaoTV.hnmt_m,
+        "uf": EstacaoTV.uf,
+        "municipio": EstacaoTV.municipio,
+        "status": EstacaoTV.status,
+        "entidade": EstacaoTV.entidade,
+        "carater": EstacaoTV.carater,
+        "categoria": EstacaoTV.categoria,
+        "erp_por_radial": EstacaoTV.erp_por_radial,
+        "observacoes": EstacaoTV.observacoes,
+    }
+    return listar(query, EstacaoTV, colunas, {"geom": EstacaoTV.geom})
 
 
 @tv_bp.route("/viabilidade", methods=["POST"])
@@ -96,13 +94,27 @@ def viabilidade_tv():
     estacao_id = payload.get("estacao_id")
     if not estacao_id:
         return jsonify(error="estacao_id é obrigatório"), 400
+    try:
+        estacao_id = int(estacao_id)
+    except (TypeError, ValueError):
+        return jsonify(error="estacao_id deve ser inteiro"), 400
 
-    sim = Simulacao(tipo="tv", params=payload, status="queued", mensagem_status=None)
-    db.session.add(sim)
-    db.session.commit()
+    # Submissões idênticas (duplo clique, vários usuários) reaproveitam a simulação em andamento.
+    chave = chave_simulacao(
+        "tv",
+        {"estacao_id": estacao_id, "time_percent": payload.get("time_percent") or 50, "path": payload.get("path") or "Land"},
+        versao=hash_estacao("tv", EstacaoTV.query.get(estacao_id)),
+    )
+    sim, nova = criar_simulacao("tv", payload, chave)
+    if not nova:
+        return jsonify(id=sim.id, status=sim.status, deduplicada=True), 202
 
     try:
-        avaliar_viabilidade_tv.delay(sim.id, estacao_id, payload.get("time_percent"), payload.get("path"))
+        enfileirar(
+            "app.tasks.tv.viabilidade",
+            (sim.id, estacao_id, payload.get("time_percent"), payload.get("path")),
+            sim=sim,
+        )
     except Exception as exc:
         sim.status = "failed"
         sim.mensagem_status = f"Falha ao enfileirar viabilidade: {exc}"
@@ -113,6 +125,56 @@ def viabilidade_tv():
     return jsonify(id=sim.id, status=sim.status), 202
 
 
+@tv_bp.route("/viabilidade/lote", methods=["POST"])
+def viabilidade_lote_tv():
+    """
+    Viabilidade TV em lote (auditoria por UF, serviço ou bbox).
+    Entrada JSON (estacao_ids e/ou filtro):
+    {
+      "estacao_ids": [1, 2, 3],
+      "filtro": {"uf": "SP", "servico": "GTVD", "tecnologia": "digital", "bbox": "xmin,ymin,xmax,ymax"},
+      "time_percent": 50, "path": "Land"  (opcionais)
+    }
+    Progresso agregado em GET /simulacoes/<id>/lote; resultado consolidado em /simulacoes/<id>/status.
+    """
+    payload = request.get_json(force=True, silent=True) or {}
+    estacao_ids = payload.get("estacao_ids")
+    filtro = payload.get("filtro")
+    if not estacao_ids and not filtro:
+        return jsonify(error="estacao_ids ou filtro é obrigatório"), 400
+    if estacao_ids is not None and not (
+        isinstance(estacao_ids, list) and all(isinstance(i, int) for i in estacao_ids)
+    ):
+        return jsonify(error="estacao_ids deve ser lista de inteiros"), 400
+    if filtro is not None and not isinstance(filtro, dict):
+        return jsonify(error="filtro deve ser um objeto"), 400
+
+    try:
+        ids = resolver_estacoes("tv", estacao_ids, filtro)
+    except ValueError as exc:
+        return jsonify(error=str(exc)), 400
+    if not ids:
+        return jsonify(error="nenhuma estação com geometria encontrada"), 404
+    if len(ids) > current_app.config.get("VIABILIDADE_LOTE_MAX", 20000):
+        return jsonify(error="lote excede VIABILIDADE_LOTE_MAX"), 400
+
+    params = {k: payload.get(k) for k in ("estacao_ids", "filtro", "time_percent", "path") if payload.get(k)}
+    lote, novo = criar_lote("tv", ids, params)
+    if not novo:
+        return jsonify(id=lote.id, status=lote.status, total=len(ids), deduplicada=True), 202
+
+    try:
+        enfileirar("app.tasks.lote.viabilidade", (lote.id, "tv"), itens=len(ids), sim=lote)
+    except Exception as exc:
+        lote.status = "failed"
+        lote.mensagem_status = f"Falha ao enfileirar lote: {exc}"
+        db.session.commit()
+        current_app.logger.exception("Erro ao enfileirar lote de viabilidade TV")
+        return jsonify(error=lote.mensagem_status), 500
+
+    return jsonify(id=lote.id, status=lote.status, total=len(ids)), 202
+
+
 @tv_bp.route("/interferencia", methods=["POST"])
 def interferencia_tv():
     """
@@ -155,3 +217,157 @@ def interferencia_tv():
         dist_km=dist_km,
         modelo="P.526/Assis simplificado",
     )
+
+
+@tv_bp.route("/interferencia/lote", methods=["POST"])
+def interferencia_lote_tv():
+    """
+    Interferência ponto-a-ponto TV em lote (P.526/Assis simplificado, vetorizado).
+    Entrada JSON:
+    {
+      "pares": [
+        {"tx_id": 1, "rx_id": 2},
+        {"tx": {"lat": -23.5, "lon": -46.6, "freq_mhz": ..., "erp_kw": ...}, "rx": {"lat": -23.1, "lon": -46.2}}
+      ]
+    }
+    Lotes pequenos com terreno .hgt já em memória são calculados na hora (200); os demais viram
+    simulação assíncrona (202) com resultados em GET /simulacoes/<id>/status.
+    """
+    payload = request.get_json(force=True, silent=True) or {}
+    itens = payload.get("pares")
+    if not isinstance(itens, list) or not itens or not all(isinstance(i, dict) for i in itens):
+        return jsonify(error="pares (lista de objetos) é obrigatório"), 400
+    if len(itens) > current_app.config.get("INTERFERENCIA_LOTE_MAX", 1000):
+        return jsonify(error="lote excede INTERFERENCIA_LOTE_MAX"), 400
+
+    if len(itens) <= current_app.config.get("INTERFERENCIA_LOTE_INLINE_MAX", 10):
+        resultados = executar_lote("tv", itens, somente_local=True)
+        if resultados is not None:
+            return jsonify(count=len(resultados), results=resultados)
+
+    sim = Simulacao(tipo="interferencia_lote_tv", params={"pares": len(itens)}, status="queued", mensagem_status=None)
+    db.session.add(sim)
+    db.session.commit()
+
+    try:
+        enfileirar("app.tasks.interferencia.lote", (sim.id, "tv", itens), itens=len(itens), sim=sim)
+    except Exception as exc:
+        sim.status = "failed"
+        sim.mensagem_status = f"Falha ao enfileirar lote: {exc}"
+        db.session.commit()
+        current_app.logger.exception("Erro ao enfileirar lote de interferência TV")
+        return jsonify(error=sim.mensagem_status), 500
+
+    return jsonify(id=sim.id, status=sim.status), 202
+
+
+@tv_bp.route("/matriz", methods=["POST"])
+def matriz_tv():
+    """
+    Dispara (ou retoma) o job nacional da matriz de interferência TV.
+    Entrada JSON (opcional):
+    {
+      "time_percent": 50,
+      "path": "Land",
+      "reiniciar": false  (true descarta checkpoints e recalcula todos os tiles)
+    }
+    Um job por vez: repetir com os mesmos parâmetros devolve o job ativo; com outros, 409.
+    Progresso/resultado via GET /simulacoes/<id>/status.
+    """
+    payload = request.get_json(force=True, silent=True) or {}
+    sim, situacao = criar_simulacao_matriz("tv", payload)
+    if situacao == "conflito":
+        return jsonify(error="job da matriz TV em andamento com outros parâmetros", id=sim.id, status=sim.status), 409
+    if situacao == "deduplicada":
+        return jsonify(id=sim.id, status=sim.status, deduplicada=True), 202
+
+    try:
+        enfileirar(
+            "app.tasks.matriz.calcular",
+            (sim.id, "tv", sim.params["time_percent"], sim.params["path"], sim.params["reiniciar"]),
+            itens=None,
+            sim=sim,
+        )
+    except Exception as exc:
+        sim.status = "failed"
+        sim.mensagem_status = f"Falha ao enfileirar matriz: {exc}"
+        db.session.commit()
+        current_app.logger.exception("Erro ao enfileirar matriz TV")
+        return jsonify(error=sim.mensagem_status), 500
+
+    return jsonify(id=sim.id, status=sim.status), 202
+
+
+@tv_bp.route("/matriz/atualizar", methods=["POST"])
+def atualizar_matriz_tv():
+    """
+    Recalcula na matriz TV apenas os pares que tocam as estações informadas
+    (como desejada, como interferente e novos vizinhos após mudança de posição).
+    Entrada JSON:
+    {
+      "estacao_ids": [1, 2, 3],
+      "time_percent": 50, "path": "Land"  (opcionais)
+    }
+    """
+    payload = request.get_json(force=True, silent=True) or {}
+    ids = payload.get("estacao_ids") or []
+    if not ids or not all(isinstance(i, int) for i in ids):
+        return jsonify(error="estacao_ids (lista de inteiros) é obrigatório"), 400
+
+    try:
+        task = enfileirar(
+            "app.tasks.matriz.atualizar",
+            ("tv", ids, payload.get("time_percent"), payload.get("path")),
+            itens=len(set(ids)),
+        )
+    except Exception as exc:
+        current_app.logger.exception("Erro ao enfileirar atualização da matriz TV")
+        return jsonify(error=f"Falha ao enfileirar atualização: {exc}"), 500
+
+    return jsonify(task_id=task.id, estacoes=len(set(ids))), 202
+
+
+@tv_bp.route("/matriz", methods=["GET"])
+def listar_matriz_tv():
+    """
+    Consulta a matriz de interferência TV pré-computada.
+    Parâmetros:
+      - uf: UF da estação desejada
+      - desejado_id / interferente_id
+      - falhas: 1 para apenas pares com margem negativa (C/I não atendida)
+      - limit (default 100, máx 1000)
+    """
+    query = db.session.query(MatrizInterferencia, EstacaoTV.uf).join(
+        EstacaoTV, EstacaoTV.id == MatrizInterferencia.desejado_id
+    ).filter(MatrizInterferencia.servico == "tv")
+    uf = request.args.get("uf")
+    desejado_id = request.args.get("desejado_id", type=int)
+    interferente_id = request.args.get("interferente_id", type=int)
+    limit = min(int(request.args.get("limit", 100)), 1000)
+
+    if uf:
+        query = query.filter(EstacaoTV.uf == uf.upper())
+    if desejado_id:
+        query = query.filter(MatrizInterferencia.desejado_id == desejado_id)
+    if interferente_id:
+        query = query.filter(MatrizInterferencia.interferente_id == interferente_id)
+    if request.args.get("falhas") in ("1", "true"):
+        query = query.filter(MatrizInterferencia.margem_db < 0)
+
+    rows = query.order_by(MatrizInterferencia.margem_db).limit(limit).all()
+    data = [
+        {
+            "desejado_id": m.desejado_id,
+            "interferente_id": m.interferente_id,
+            "uf": uf_desejado,
+            "dist_km": m.dist_km,
+            "delta": m.delta,
+            "campo_dbuv_m": m.campo_dbuv_m,
+            "ci_requerida_db": m.ci_requerida_db,
+            "margem_db": m.margem_db,
+            "modelo": m.modelo,
+            "atualizado_em": m.atualizado_em,
+        }
+        for m, uf_desejado in rows
+    ]
+    return jsonify(count=len(data), results=data)
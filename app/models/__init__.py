@@ -13,11 +13,15 @@ from app.models.normas import (
 )
 from app.models.estacoes import (
     EstacaoFM,
+    EstacaoPropagacao,
     EstacaoRadcom,
     EstacaoTV,
     SetorCensitario,
+    SetorSubdividido,
 )
-from app.models.simulacoes import Simulacao, ResultadoCobertura
+from app.models.simulacoes import Simulacao, ResultadoCobertura, ResultadoSimulacao, EstatisticaContorno
+from app.models.interferencia import MatrizInterferencia, MatrizInterferenciaTile
+from app.models.versoes import VersaoDados
 
 __all__ = [
     "NormasFMClasses",
@@ -30,9 +34,16 @@ __all__ = [
     "NormasTVFMCompatibilidade",
     "NormasTVNivelContorno",
     "EstacaoFM",
+    "EstacaoPropagacao",
     "EstacaoRadcom",
     "EstacaoTV",
     "SetorCensitario",
+    "SetorSubdividido",
     "Simulacao",
     "ResultadoCobertura",
+    "ResultadoSimulacao",
+    "EstatisticaContorno",
+    "MatrizInterferencia",
+    "MatrizInterferenciaTile",
+    "VersaoDados",
 ]
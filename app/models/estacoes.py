@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from sqlalchemy.dialects.postgresql import JSONB
 from geoalchemy2 import Geometry
 
@@ -30,6 +32,7 @@ class EstacaoFM(db.Model):
     finalidade = db.Column(db.String(32), nullable=True)
     fistel = db.Column(db.String(64), nullable=True)
     observacoes = db.Column(db.Text, nullable=True)
+    hash_tecnico = db.Column(db.String(40), nullable=True)  # app.utils.estacoes.hash_valores, gravado na carga
 
 
 class EstacaoRadcom(db.Model):
@@ -70,6 +73,7 @@ class EstacaoTV(db.Model):
     fistel = db.Column(db.String(64), nullable=True)
     fistel_geradora = db.Column(db.String(64), nullable=True)
     observacoes = db.Column(db.Text, nullable=True)
+    hash_tecnico = db.Column(db.String(40), nullable=True)  # app.utils.estacoes.hash_valores, gravado na carga
 
 
 class SetorCensitario(db.Model):
@@ -77,6 +81,40 @@ class SetorCensitario(db.Model):
 
     id = db.Column(db.String(32), primary_key=True)  # código IBGE
     municipio = db.Column(db.String(128), nullable=False)
+    cod_municipio = db.Column(db.String(7), nullable=True)  # 7 primeiros dígitos do código do setor
     tipo = db.Column(db.String(16), nullable=False)  # urbano/rural
     pop_total = db.Column(db.Integer, nullable=True)
+    area_km2 = db.Column(db.Float, nullable=True)  # geodésica, soma dos pedaços de setores_subdivididos
     geom = db.Column(Geometry(geometry_type="GEOMETRY", srid=4674), nullable=False)
+
+
+class SetorSubdividido(db.Model):
+    """Pedaço de setor censitário (ST_Subdivide) com área pré-calculada, para overlays rápidos."""
+
+    __tablename__ = "setores_subdivididos"
+
+    id = db.Column(db.Integer, primary_key=True)
+    setor_id = db.Column(db.String(32), db.ForeignKey("setores_censitarios.id", ondelete="CASCADE"), nullable=False)
+    area_km2 = db.Column(db.Float, nullable=False)
+    fracao_setor = db.Column(db.Float, nullable=False)  # área do pedaço / área do setor
+    geom = db.Column(Geometry(geometry_type="GEOMETRY", srid=4674), nullable=False)
+
+
+class EstacaoPropagacao(db.Model):
+    """
+    Parâmetros fixos de propagação por estação (altitude, altura efetiva por radial, diagrama e ERP
+    por grau), pré-calculados após a carga dos planos; arrays float32 empacotados em `dados`
+    conforme `layout` (ver `app.utils.resultados`). Válidos enquanto o hash técnico da estação e a
+    versão do terreno (`versoes_dados.terreno`) não mudarem.
+    """
+
+    __tablename__ = "estacoes_propagacao"
+
+    servico = db.Column(db.String(2), primary_key=True)  # fm / tv
+    estacao_id = db.Column(db.Integer, primary_key=True)
+    hash_tecnico = db.Column(db.String(40), nullable=False)
+    versao_terreno = db.Column(db.BigInteger, nullable=False)
+    altitude_m = db.Column(db.Float, nullable=True)
+    layout = db.Column(db.JSON().with_variant(JSONB, "postgresql"), nullable=False)  # nome -> [dtype, offset, n]
+    dados = db.Column(db.LargeBinary, nullable=False)
+    calculado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from app import db
+
+
+class MatrizInterferencia(db.Model):
+    """Matriz esparsa de interferência pré-computada (apenas pares que passam na poda espacial/frequência)."""
+
+    __tablename__ = "matriz_interferencia"
+
+    servico = db.Column(db.String(8), primary_key=True)  # fm ou tv
+    desejado_id = db.Column(db.Integer, primary_key=True)
+    interferente_id = db.Column(db.Integer, primary_key=True)
+    dist_km = db.Column(db.Float, nullable=True)
+    delta = db.Column(db.Float, nullable=True)  # Δf em kHz (FM) ou Δcanal (TV)
+    campo_dbuv_m = db.Column(db.Float, nullable=False)
+    ci_requerida_db = db.Column(db.Float, nullable=False)
+    margem_db = db.Column(db.Float, nullable=False)  # limite - campo; negativo = falha de C/I
+    modelo = db.Column(db.String(32), nullable=False)  # P.526/Assis ou P.1546
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class MatrizInterferenciaTile(db.Model):
+    """Checkpoint do job nacional: um registro por tile geográfico de 1° (nome no padrão SRTM)."""
+
+    __tablename__ = "matriz_interferencia_tiles"
+
+    servico = db.Column(db.String(8), primary_key=True)
+    tile = db.Column(db.String(16), primary_key=True)  # ex.: S24W047
+    status = db.Column(db.String(16), nullable=False, default="pending")  # pending, done, failed
+    pares = db.Column(db.Integer, nullable=True)
+    mensagem = db.Column(db.String(255), nullable=True)
+    atualizado_em = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
@@ -19,6 +19,12 @@ class Simulacao(db.Model):
     params = db.Column(db.JSON().with_variant(JSONB, "postgresql"), nullable=True)
     status = db.Column(db.String(16), nullable=False, default="queued")
     mensagem_status = db.Column(db.String(255), nullable=True)
+    resultado = db.Column(db.JSON().with_variant(JSONB, "postgresql"), nullable=True)  # resultado de jobs em lote
+    lote_id = db.Column(db.String(36), db.ForeignKey("simulacoes.id"), nullable=True, index=True)
+    # hash canônico (tipo, parâmetros, versão da estação) para coalescer submissões idênticas;
+    # único entre simulações queued/running (índice parcial uq_simulacoes_chave_ativa)
+    chave_hash = db.Column(db.String(64), nullable=True)
+    task_id = db.Column(db.String(64), nullable=True)  # id Celery da tarefa principal (cancelamento/revoke)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(
         db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
@@ -35,3 +41,40 @@ class ResultadoCobertura(db.Model):
     tipo_contorno = db.Column(db.String(64), nullable=False)  # protegido, interferente, radcom_servico, tv_digital, etc.
     nivel_campo_dbuv_m = db.Column(db.Float, nullable=True)
     geom = db.Column(Geometry(geometry_type="POLYGON", srid=4674), nullable=False)
+
+
+class ResultadoSimulacao(db.Model):
+    """
+    Resultado detalhado de uma simulação em forma compacta: metadados JSON pequenos + arrays
+    numéricos (float32/int32) empacotados em `dados` conforme `layout` (ver `app.utils.resultados`).
+    """
+
+    __tablename__ = "resultados_simulacao"
+
+    simulacao_id = db.Column(
+        db.String(36), db.ForeignKey("simulacoes.id", ondelete="CASCADE"), primary_key=True
+    )
+    meta = db.Column(db.JSON().with_variant(JSONB, "postgresql"), nullable=True)
+    layout = db.Column(db.JSON().with_variant(JSONB, "postgresql"), nullable=False)  # nome -> [dtype, offset, n]
+    dados = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class EstatisticaContorno(db.Model):
+    """
+    Estatísticas de um contorno (área, população, setores, quebra por município), calculadas uma vez
+    após a gravação do contorno e refeitas só quando a versão do censo (`versoes_dados.censo`) muda.
+    """
+
+    __tablename__ = "estatisticas_contorno"
+
+    contorno_id = db.Column(
+        db.Integer, db.ForeignKey("resultados_cobertura.id", ondelete="CASCADE"), primary_key=True
+    )
+    versao_censo = db.Column(db.BigInteger, nullable=False)
+    area_km2 = db.Column(db.Float, nullable=False)
+    pop_estimada = db.Column(db.Float, nullable=True)
+    setores_intersect = db.Column(db.Integer, nullable=False)
+    # [{"cod_municipio", "municipio", "area_km2", "pop_estimada", "setores"}]
+    por_municipio = db.Column(db.JSON().with_variant(JSONB, "postgresql"), nullable=True)
+    calculado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
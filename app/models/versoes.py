@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from app import db
+
+
+class VersaoDados(db.Model):
+    """Versão (contador) de cada conjunto de dados; caches derivados usam a versão na chave."""
+
+    __tablename__ = "versoes_dados"
+
+    nome = db.Column(db.String(64), primary_key=True)  # ex.: estacoes_fm, estacoes_tv
+    versao = db.Column(db.BigInteger, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
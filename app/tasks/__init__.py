@@ -3,6 +3,10 @@ from app import db
 from app.models import Simulacao
 from app.tasks.fm import gerar_contorno_fm, avaliar_viabilidade_fm  # noqa: F401
 from app.tasks.tv import gerar_contorno_tv, avaliar_viabilidade_tv  # noqa: F401
+from app.tasks.interferencia import calcular_interferencia_lote  # noqa: F401
+from app.tasks.estatisticas import calcular_estatisticas_contorno  # noqa: F401
+from app.tasks.lote import consolidar_lote, executar_lote_viabilidade, processar_chunk  # noqa: F401
+from app.tasks.matriz import atualizar_matriz, calcular_matriz, calcular_tile, finalizar_matriz  # noqa: F401
 
 
 @shared_task(name="app.tasks.demo.add")
@@ -0,0 +1,26 @@
+"""Estatísticas de contornos em background (ver `app.utils.estatisticas`)."""
+
+from celery import shared_task
+
+from app import db
+from app.models import ResultadoCobertura
+from app.utils import estatisticas
+from app.utils.kvstore import get_store
+
+
+@shared_task(name="app.tasks.estatisticas.contorno")
+def calcular_estatisticas_contorno(contorno_id: int) -> dict:
+    """Calcula e grava as estatísticas do contorno (no-op se já vigentes para a versão do censo)."""
+    try:
+        if not ResultadoCobertura.query.get(contorno_id):
+            return {"status": "error", "detail": "contorno não encontrado"}
+        est = estatisticas.vigente(contorno_id)
+        if est is None:
+            est = estatisticas.calcular(contorno_id)
+            db.session.commit()
+        return {"status": "done", "contorno_id": contorno_id, "versao_censo": est.versao_censo}
+    finally:
+        try:
+            get_store().delete(f"estatisticas:{contorno_id}:agendado")
+        except Exception:
+            pass
@@ -2,22 +2,17 @@ import math
 
 import sqlalchemy as sa
 from celery import shared_task
+from celery.exceptions import SoftTimeLimitExceeded
 
 from app import db
 from app.models import EstacaoFM, NormasFMClasses, NormasFMProtecao, ResultadoCobertura, Simulacao
 from app.utils.propagacao.p526 import field_strength_from_erp_dbuvm, path_loss_p526_db, sample_profile
-from app.utils.propagacao.p1546_curves import field_strength_p1546
+from app.utils.propagacao.p1546_curves import tabela_campo
 from app.utils.propagacao.terrain import effective_height, destination_point
-
-
-def _erp_kw_por_radial(erp_kw: float, erp_por_radial: list[float] | None, angle: int) -> float:
-    """Ajusta ERP por radial se o diagrama estiver disponível (valores presumidos em dBd)."""
-    if not erp_por_radial or len(erp_por_radial) != 72:
-        return erp_kw
-    idx = angle // 5
-    ganho_db = erp_por_radial[idx] or 0.0
-    fator = 10 ** (ganho_db / 10.0)
-    return max(0.001, erp_kw * fator)
+from app.utils.progresso import Progresso, SimulacaoCancelada
+from app.utils.propagacao.diagrama import aplicar_erp, decodificar, diagrama_estacao
+from app.utils.propagacao.parametros import obter as parametros_estacao
+from app.utils.resultados import gravar_resultado_estacao
 
 
 def _altura_efetiva(est: EstacaoFM, angle: float) -> float:
@@ -32,6 +27,8 @@ def _altura_efetiva(est: EstacaoFM, angle: float) -> float:
             ).fetchone()
             if latlon and latlon.lat is not None and latlon.lon is not None:
                 return effective_height(latlon.lat, latlon.lon, angle, hnmt_fallback=est.hnmt_m or 30.0)
+    except SoftTimeLimitExceeded:
+        raise
     except Exception:
         pass
     return est.hnmt_m or 30.0
@@ -45,15 +42,20 @@ def _distancia_alvo_km(
     erp_por_radial: list[float] | None,
     time_percent: float,
     path: str,
-) -> float:
+    h_eff_m: float | None = None,
+    erp_eff_kw: float | None = None,
+) -> tuple[float, float]:
     """
     Define distância-alvo do contorno protegido, radial por radial:
     - Usa dist_max_contorno66_km da norma como teto base se existir;
-    - Busca distância onde campo ≈ 66 dBµV/m com P.1546 simplificado;
+    - Busca distância onde campo ≈ 66 dBµV/m com P.1546 (curvas de 1 kW escaladas para a ERP do radial);
     - Piso 3 km, teto 200 km.
+    `h_eff_m` e `erp_eff_kw` (calculadas uma vez por radial) evitam reamostrar o terreno e
+    reinterpolar o diagrama a cada passo da bisseção.
+    Retorna (distância km, campo dBµV/m nessa distância).
     """
-    erp_base = erp_kw or 1.0
-    erp_eff = _erp_kw_por_radial(erp_base, erp_por_radial, angle)
+    if erp_eff_kw is None:
+        erp_eff_kw = float(decodificar(erp_por_radial).erp_kw(erp_kw, angle))
 
     dist_cap = None
     if classe:
@@ -61,14 +63,13 @@ def _distancia_alvo_km(
         if norma and norma.dist_max_contorno66_km:
             dist_cap = norma.dist_max_contorno66_km
 
+    if h_eff_m is None:
+        h_eff_m = _altura_efetiva(est, angle)
+
+    tabela = tabela_campo(est.freq_mhz or 100.0, time_percent, path)  # grade densa da estação (LRU)
+
     def field(dist_km: float) -> float:
-        return field_strength_p1546(
-            freq_mhz=est.freq_mhz or 100.0,
-            dist_km=dist_km,
-            h_eff_m=_altura_efetiva(est, angle),
-            time_percent=time_percent,
-            path=path,
-        )
+        return float(aplicar_erp(tabela(dist_km, h_eff_m), erp_eff_kw))
 
     target = 66.0
     lo, hi = 0.5, dist_cap or 120.0
@@ -78,8 +79,8 @@ def _distancia_alvo_km(
             lo = mid
         else:
             hi = mid
-    dist = hi
-    return max(3.0, dist if dist_cap is None else min(dist, dist_cap))
+    dist = max(3.0, hi if dist_cap is None else min(hi, dist_cap))
+    return dist, field(dist)
 
 
 def _polygon_radial(table: str, estacao_id: int, dists_m: list[float], angles: list[int]):
@@ -89,25 +90,53 @@ def _polygon_radial(table: str, estacao_id: int, dists_m: list[float], angles: l
     return None
 
 
-def _gerar_contorno_geom(est: EstacaoFM, time_percent: float, path: str):
-    """Calcula polígono de contorno protegido (radiais de 5°)."""
+def _gerar_contorno_geom(est: EstacaoFM, time_percent: float, path: str, progresso: Progresso | None = None):
+    """
+    Calcula polígono de contorno protegido (radiais de 5°).
+    Retorna (geom SQL ou None, radiais) com listas por radial: azimute, dist_km, h_eff_m, erp_kw, campo_dbuv_m.
+    Com `progresso`, retoma do checkpoint de radiais e pode levantar SimulacaoCancelada entre blocos.
+    """
     angles = list(range(0, 360, 10))
-    dists_km: list[float] = []
-    for angle in angles:
+    radiais: dict[str, list[float]] = (progresso.retomar("radiais") if progresso else None) or {
+        k: [] for k in ("azimute", "dist_km", "h_eff_m", "erp_kw", "campo_dbuv_m")
+    }
+    dists_km = radiais["dist_km"]
+    params = parametros_estacao("fm", est)  # pré-calculados (estacoes_propagacao), se vigentes
+    erps = diagrama_estacao("fm", est).erp_kw(est.erp_max_kw, angles)  # todos os radiais de uma vez
+    for i, angle in enumerate(angles):
+        if i < len(dists_km):
+            continue  # já calculado antes da interrupção
+        h_eff = params.h_eff(angle) if params else _altura_efetiva(est, angle)
         try:
-            d = _distancia_alvo_km(
-                est, angle, est.erp_max_kw, est.classe, est.erp_por_radial, time_percent, path
+            d, campo = _distancia_alvo_km(
+                est,
+                angle,
+                est.erp_max_kw,
+                est.classe,
+                est.erp_por_radial,
+                time_percent,
+                path,
+                h_eff_m=h_eff,
+                erp_eff_kw=float(erps[i]),
             )
+        except SoftTimeLimitExceeded:
+            raise
         except Exception:
-            d = 10.0
+            d, campo = 10.0, math.nan
+        radiais["azimute"].append(angle)
         dists_km.append(d)
+        radiais["h_eff_m"].append(h_eff)
+        radiais["erp_kw"].append(float(erps[i]))
+        radiais["campo_dbuv_m"].append(campo)
+        if progresso:
+            progresso.radiais(i + 1, len(angles), radiais)
 
     # Gera polígono em Python (esférico) usando destination_point e grava via ST_GeomFromText.
     latlon = db.session.execute(
         sa.text("SELECT ST_Y(geom) AS lat, ST_X(geom) AS lon FROM estacoes_fm WHERE id=:id"), {"id": est.id}
     ).fetchone()
     if not latlon:
-        return None, dists_km
+        return None, radiais
 
     coords = []
     for angle, dist_km in zip(angles, dists_km):
@@ -120,7 +149,7 @@ def _gerar_contorno_geom(est: EstacaoFM, time_percent: float, path: str):
         points_txt = ", ".join(f"{lon} {lat}" for lon, lat in coords)
         wkt = f"POLYGON(({points_txt}))"
     geom = sa.func.ST_GeomFromText(wkt, 4674) if wkt else None
-    return geom, dists_km
+    return geom, radiais
 
 
 def _norma_por_delta(df_khz: float) -> NormasFMProtecao | None:
@@ -131,10 +160,55 @@ def _norma_por_delta(df_khz: float) -> NormasFMProtecao | None:
     )
 
 
-def _avaliar_interferencias(est: EstacaoFM, path: str, time_percent: float) -> tuple[bool, list[str], bool]:
-    """Avalia interferência ponto-a-ponto simplificada contra demais estações FM em até 300 km."""
+def _campo_interferente(
+    r,
+    rx_lat: float,
+    rx_lon: float,
+    freq_ref: float,
+    time_percent: float,
+    path: str,
+    h_eff_intf: float | None = None,
+) -> tuple[float, str]:
+    """
+    Campo do interferente `r` no ponto receptor: perfil SRTM + P.526/Assis; fallback P.1546 tabulado.
+    `r` deve expor lat, lon, freq_mhz, erp_max_kw, hnmt_m e dist_km. Retorna (campo dBµV/m, modelo).
+    `h_eff_intf` (pré-calculada, ver estacoes_propagacao) evita amostrar o terreno no fallback.
+    """
+    try:
+        profile_d, profile_h = sample_profile(r.lat, r.lon, rx_lat, rx_lon, samples=96)
+        h_tx_ground = profile_h[0]
+        h_rx_ground = profile_h[-1]
+        h_tx_asl = h_tx_ground + (r.hnmt_m or 30.0)
+        h_rx_asl = h_rx_ground + 10.0  # receptor a 10 m sobre o solo
+        pl_db = path_loss_p526_db(
+            profile_d, profile_h, freq_mhz=r.freq_mhz or freq_ref, h_tx_asl_m=h_tx_asl, h_rx_asl_m=h_rx_asl
+        )
+        return field_strength_from_erp_dbuvm(r.erp_max_kw or 1.0, pl_db), "P.526/Assis"
+    except SoftTimeLimitExceeded:
+        raise
+    except Exception:
+        # fallback: P.1546 tabulado
+        if h_eff_intf is None:
+            h_eff_intf = effective_height(r.lat, r.lon, 0.0, hnmt_fallback=r.hnmt_m or 30.0)
+        campo = tabela_campo(r.freq_mhz or freq_ref, time_percent, path)(r.dist_km or 1.0, h_eff_intf)
+        return float(aplicar_erp(campo, r.erp_max_kw or 1.0)), "P.1546"  # curvas de 1 kW
+
+
+def _avaliar_interferencias(
+    est: EstacaoFM,
+    path: str,
+    time_percent: float,
+    progresso: Progresso | None = None,
+    detalhes: list[dict] | None = None,
+) -> tuple[bool, list[str], bool]:
+    """
+    Avalia interferência ponto-a-ponto simplificada contra demais estações FM em até 300 km.
+    Se `detalhes` for informado, acrescenta um dict por interferente avaliado (campo, limite, margem).
+    Com `progresso`, retoma do checkpoint de interferentes e pode levantar SimulacaoCancelada entre blocos.
+    """
     msgs: list[str] = []
     aprovado = True
+    detalhes = detalhes if detalhes is not None else []
     if not est.freq_mhz or not est.geom:
         return aprovado, msgs, False
 
@@ -165,41 +239,48 @@ def _avaliar_interferencias(est: EstacaoFM, path: str, time_percent: float) -> t
         )
         rows = db.session.execute(sql, {"id": est.id, "wkt": base_wkt, "fmin": fmin, "fmax": fmax}).fetchall()
 
-        for r in rows:
+        inicio = 0
+        estado = progresso.retomar("interferentes") if progresso else None
+        if estado:
+            inicio, aprovado = estado["feitos"], estado["aprovado"]
+            msgs.extend(estado["msgs"])
+            detalhes.extend(estado["detalhes"])
+
+        for n, r in enumerate(rows, start=1):
+            if n <= inicio:
+                continue  # já avaliado antes da interrupção
             df_khz = abs((r.freq_mhz or 0) - est.freq_mhz) * 1000.0
             norma = _norma_por_delta(df_khz)
-            if not norma:
-                continue
-            ci_req = norma.ci_requerida_db
-            # Perfil de terreno + P.526/Assis
-            try:
-                profile_d, profile_h = sample_profile(r.lat, r.lon, base_latlon.lat, base_latlon.lon, samples=96)
-                h_tx_ground = profile_h[0]
-                h_rx_ground = profile_h[-1]
-                h_tx_asl = h_tx_ground + (r.hnmt_m or 30.0)
-                h_rx_asl = h_rx_ground + 10.0  # receptor a 10 m sobre o solo
-                pl_db = path_loss_p526_db(
-                    profile_d, profile_h, freq_mhz=r.freq_mhz or est.freq_mhz, h_tx_asl_m=h_tx_asl, h_rx_asl_m=h_rx_asl
+            if norma:
+                ci_req = norma.ci_requerida_db
+                campo_intf, modelo = _campo_interferente(
+                    r, base_latlon.lat, base_latlon.lon, est.freq_mhz, time_percent, path
                 )
-                campo_intf = field_strength_from_erp_dbuvm(r.erp_max_kw or 1.0, pl_db)
-            except Exception:
-                # fallback: P.1546 tabulado
-                h_eff_intf = effective_height(r.lat, r.lon, 0.0, hnmt_fallback=r.hnmt_m or 30.0)
-                campo_intf = field_strength_p1546(
-                    freq_mhz=r.freq_mhz or est.freq_mhz,
-                    dist_km=r.dist_km or 1.0,
-                    h_eff_m=h_eff_intf,
-                    time_percent=time_percent,
-                    path=path,
+                limite = 66.0 - ci_req
+                detalhes.append(
+                    {
+                        "id": r.id,
+                        "dist_km": r.dist_km,
+                        "delta": df_khz,
+                        "ci_requerida_db": ci_req,
+                        "campo_dbuv_m": campo_intf,
+                        "margem_db": limite - campo_intf,
+                        "modelo": modelo,
+                    }
                 )
-            limite = 66.0 - ci_req
-            if campo_intf > limite:
-                aprovado = False
-                msgs.append(
-                    f"Interf: est.{r.id} Δf={df_khz:.0f} kHz CI_req={ci_req} dB "
-                    f"campo_intf={campo_intf:.1f} dBµV/m > limite {limite:.1f} dBµV/m (dist {r.dist_km:.1f} km, P.526/Assis)."
+                if campo_intf > limite:
+                    aprovado = False
+                    msgs.append(
+                        f"Interf: est.{r.id} Δf={df_khz:.0f} kHz CI_req={ci_req} dB "
+                        f"campo_intf={campo_intf:.1f} dBµV/m > limite {limite:.1f} dBµV/m (dist {r.dist_km:.1f} km, P.526/Assis)."
+                    )
+            if progresso:
+                progresso.interferentes(
+                    n, len(rows), {"feitos": n, "aprovado": aprovado, "msgs": msgs, "detalhes": detalhes}
                 )
         return aprovado, msgs, True
+    except (SoftTimeLimitExceeded, SimulacaoCancelada):
+        raise
     except Exception as exc:
         db.session.rollback()
         msgs.append(f"Interferência não avaliada (erro: {str(exc)[:180]})")
@@ -235,6 +316,8 @@ def avaliar_viabilidade_fm(sim_id: str, estacao_id: int, time_percent: float | N
     sim = Simulacao.query.get(sim_id)
     if not sim:
         return {"status": "error", "detail": "simulação não encontrada"}
+    if sim.status == "cancelled":
+        return {"status": sim.status}
 
     est = EstacaoFM.query.get(estacao_id)
     if not est or not est.geom:
@@ -243,25 +326,50 @@ def avaliar_viabilidade_fm(sim_id: str, estacao_id: int, time_percent: float | N
         db.session.commit()
         return {"status": sim.status, "detail": sim.mensagem_status}
 
+    progresso = Progresso(sim.id)
+    sim.status = "running"
+    db.session.commit()
+
     aprovado = True
     msgs: list[str] = []
 
-    ok_limites, msgs_lim = _avaliar_limites_classe(est)
-    aprovado = aprovado and ok_limites
-    msgs.extend(msgs_lim)
-
-    tp = time_percent or 50
-    ph = path or "Land"
-
-    inter_ok, inter_msgs, ci_eval = _avaliar_interferencias(est, ph, tp)
-    aprovado = aprovado and inter_ok
-    msgs.extend(inter_msgs)
+    try:
+        with progresso.etapa("limites"):
+            ok_limites, msgs_lim = _avaliar_limites_classe(est)
+        aprovado = aprovado and ok_limites
+        msgs.extend(msgs_lim)
+
+        tp = time_percent or 50
+        ph = path or "Land"
+
+        interferentes: list[dict] = []
+        with progresso.etapa("interferencia"):
+            inter_ok, inter_msgs, ci_eval = _avaliar_interferencias(est, ph, tp, progresso, interferentes)
+        aprovado = aprovado and inter_ok
+        msgs.extend(inter_msgs)
+
+        with progresso.etapa("contorno"):
+            poly, radiais = _gerar_contorno_geom(est, tp, ph, progresso)
+    except SoftTimeLimitExceeded:
+        db.session.rollback()
+        sim.status = "failed"
+        sim.mensagem_status = "Tempo limite da tarefa excedido."
+        db.session.commit()
+        raise
+    except SimulacaoCancelada:
+        db.session.rollback()
+        sim.status = "cancelled"
+        sim.mensagem_status = "Cancelada pelo usuário."
+        db.session.commit()
+        progresso.limpar()
+        return {"status": sim.status}
+    dists_km = radiais["dist_km"]
 
-    poly, dists_km = _gerar_contorno_geom(est, tp, ph)
     if poly is None:
         sim.status = "failed"
         sim.mensagem_status = "Falha ao gerar contorno."
         db.session.commit()
+        progresso.limpar()
         return {"status": sim.status, "detail": sim.mensagem_status}
 
     contorno = ResultadoCobertura(
@@ -276,7 +384,24 @@ def avaliar_viabilidade_fm(sim_id: str, estacao_id: int, time_percent: float | N
     mensagem = ("Aprovado" if aprovado else "Reprovado") + (": " + "; ".join(msgs) if msgs else "")
     # evita estouro de coluna varchar(255)
     sim.mensagem_status = mensagem[:250]
+    gravar_resultado_estacao(
+        sim.id,
+        {
+            "servico": "fm",
+            "estacao_id": est.id,
+            "time_percent": tp,
+            "path": ph,
+            "nivel_alvo_dbuv_m": 66.0,
+            "aprovado": aprovado,
+            "ci_avaliada": ci_eval,
+            "mensagens": msgs,
+            "tempos_s": progresso.tempos,
+        },
+        radiais,
+        interferentes if ci_eval else None,
+    )
     db.session.commit()
+    progresso.limpar()
 
     return {
         "status": sim.status,
@@ -285,6 +410,7 @@ def avaliar_viabilidade_fm(sim_id: str, estacao_id: int, time_percent: float | N
         "dist_km_media": sum(dists_km) / len(dists_km),
         "mensagens": msgs,
         "ci_avaliada": ci_eval,
+        "tempos_s": progresso.tempos,
     }
 
 
@@ -294,6 +420,8 @@ def gerar_contorno_fm(sim_id: str, estacao_id: int, time_percent: float | None =
     sim = Simulacao.query.get(sim_id)
     if not sim:
         return {"status": "error", "detail": "simulação não encontrada"}
+    if sim.status == "cancelled":
+        return {"status": sim.status}
 
     est = EstacaoFM.query.get(estacao_id)
     if not est or not est.geom:
@@ -302,12 +430,35 @@ def gerar_contorno_fm(sim_id: str, estacao_id: int, time_percent: float | None =
         db.session.commit()
         return {"status": sim.status, "detail": sim.mensagem_status}
 
-    poly, dists_km = _gerar_contorno_geom(est, time_percent or 50, path or "Land")
+    progresso = Progresso(sim.id)
+    sim.status = "running"
+    db.session.commit()
+
+    tp = time_percent or 50
+    ph = path or "Land"
+    try:
+        with progresso.etapa("contorno"):
+            poly, radiais = _gerar_contorno_geom(est, tp, ph, progresso)
+    except SoftTimeLimitExceeded:
+        db.session.rollback()
+        sim.status = "failed"
+        sim.mensagem_status = "Tempo limite da tarefa excedido."
+        db.session.commit()
+        raise
+    except SimulacaoCancelada:
+        db.session.rollback()
+        sim.status = "cancelled"
+        sim.mensagem_status = "Cancelada pelo usuário."
+        db.session.commit()
+        progresso.limpar()
+        return {"status": sim.status}
+    dists_km = radiais["dist_km"]
 
     if poly is None:
         sim.status = "failed"
         sim.mensagem_status = "Falha ao gerar contorno."
         db.session.commit()
+        progresso.limpar()
         return {"status": sim.status, "detail": sim.mensagem_status}
 
     contorno = ResultadoCobertura(
@@ -319,6 +470,24 @@ def gerar_contorno_fm(sim_id: str, estacao_id: int, time_percent: float | None =
     db.session.add(contorno)
     sim.status = "done"
     sim.mensagem_status = "Contorno FM gerado (radiais 5°, P.1546 simplificado)."
+    gravar_resultado_estacao(
+        sim.id,
+        {
+            "servico": "fm",
+            "estacao_id": est.id,
+            "time_percent": tp,
+            "path": ph,
+            "nivel_alvo_dbuv_m": 66.0,
+            "tempos_s": progresso.tempos,
+        },
+        radiais,
+    )
     db.session.commit()
+    progresso.limpar()
 
-    return {"status": sim.status, "contorno_id": contorno.id, "dist_km_media": sum(dists_km) / len(dists_km)}
+    return {
+        "status": sim.status,
+        "contorno_id": contorno.id,
+        "dist_km_media": sum(dists_km) / len(dists_km),
+        "tempos_s": progresso.tempos,
+    }
@@ -0,0 +1,197 @@
+"""
+Interferência ponto-a-ponto em lote (P.526/Assis simplificado, vetorizado).
+
+Cada item é um par (tx_id, rx_id) de estações cadastradas ou coordenadas arbitrárias:
+  {"tx_id": 1, "rx_id": 2}
+  {"tx": {"lat": -23.5, "lon": -46.6, "freq_mhz": 98.1, "erp_kw": 5}, "rx": {"lat": -23.1, "lon": -46.2}}
+Os perfis são amostrados em blocos de PARES_POR_BLOCO pares (uma chamada de terreno por bloco);
+na tarefa Celery o pedido de cancelamento é verificado entre blocos.
+"""
+
+import math
+from typing import List, Optional
+
+import numpy as np
+import sqlalchemy as sa
+from celery import shared_task
+
+from app import db
+from app.models import Simulacao
+from app.utils.progresso import Progresso, SimulacaoCancelada
+from app.utils.propagacao.p526_assis import field_strength_p2p_batch
+from app.utils.propagacao.terrain import hgt_tiles_em_memoria
+
+MODELO = "P.526/Assis simplificado"
+PARES_POR_BLOCO = 256  # pares por chamada vetorizada
+
+_TABELAS = {"fm": "estacoes_fm", "tv": "estacoes_tv"}
+_FREQ_PADRAO = {"fm": 100.0, "tv": 600.0}
+
+
+def _carregar_estacoes(servico: str, itens: List[dict]) -> dict:
+    ids = set()
+    for item in itens:
+        for chave in ("tx_id", "rx_id"):
+            if isinstance(item.get(chave), int):
+                ids.add(item[chave])
+    if not ids:
+        return {}
+    rows = db.session.execute(
+        sa.text(
+            f"""
+            SELECT id, freq_mhz, erp_max_kw, ST_Y(geom) AS lat, ST_X(geom) AS lon
+            FROM {_TABELAS[servico]}
+            WHERE id = ANY(:ids) AND geom IS NOT NULL
+            """
+        ),
+        {"ids": sorted(ids)},
+    ).fetchall()
+    return {r.id: r for r in rows}
+
+
+def _positivo(valor) -> Optional[float]:
+    """Float finito > 0 (None se ausente); levanta ValueError se inválido."""
+    if valor is None:
+        return None
+    numero = float(valor)
+    if not (math.isfinite(numero) and numero > 0):
+        raise ValueError(numero)
+    return numero
+
+
+def _ponto(item: dict, lado: str, estacoes: dict) -> dict:
+    """
+    Resolve um lado do par (estação cadastrada ou coordenada) em lat/lon/freq/erp.
+    Levanta ValueError (mensagem vai para o `erro` do item) se o lado for inválido.
+    """
+    est_id = item.get(f"{lado}_id")
+    if est_id is not None:
+        est = estacoes.get(est_id)
+        if not est:
+            raise ValueError(f"{lado}: estação inválida ou sem geometria")
+        return {"lat": est.lat, "lon": est.lon, "freq_mhz": est.freq_mhz, "erp_kw": est.erp_max_kw}
+    coord = item.get(lado) or {}
+    try:
+        lat, lon = float(coord["lat"]), float(coord["lon"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"{lado}: coordenada ausente ou inválida") from None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):  # também descarta NaN
+        raise ValueError(f"{lado}: lat deve estar em [-90, 90] e lon em [-180, 180]")
+    try:
+        freq_mhz, erp_kw = _positivo(coord.get("freq_mhz")), _positivo(coord.get("erp_kw"))
+    except (TypeError, ValueError):
+        raise ValueError(f"{lado}: freq_mhz/erp_kw devem ser números positivos") from None
+    return {"lat": lat, "lon": lon, "freq_mhz": freq_mhz, "erp_kw": erp_kw}
+
+
+def preparar_lote(servico: str, itens: List[dict]) -> tuple[list, dict]:
+    """
+    Resolve os itens em pontos. Retorna (resultados com erros já preenchidos, arrays dos pares válidos).
+    """
+    estacoes = _carregar_estacoes(servico, itens)
+    resultados: list = []
+    arrays = {k: [] for k in ("idx", "freq", "erp", "tx_lat", "tx_lon", "rx_lat", "rx_lon")}
+    for idx, item in enumerate(itens):
+        base = {"tx_id": item.get("tx_id"), "rx_id": item.get("rx_id")}
+        try:
+            tx = _ponto(item, "tx", estacoes)
+            rx = _ponto(item, "rx", estacoes)
+        except ValueError as exc:
+            resultados.append({**base, "erro": str(exc)})
+            continue
+        resultados.append(base)
+        arrays["idx"].append(idx)
+        arrays["freq"].append(tx["freq_mhz"] or _FREQ_PADRAO[servico])
+        arrays["erp"].append(tx["erp_kw"] or 1.0)
+        arrays["tx_lat"].append(tx["lat"])
+        arrays["tx_lon"].append(tx["lon"])
+        arrays["rx_lat"].append(rx["lat"])
+        arrays["rx_lon"].append(rx["lon"])
+    return resultados, arrays
+
+
+def _tiles_locais(arrays: dict) -> bool:
+    """Todos os tiles 1° do retângulo envolvente de cada enlace já estão em memória no processo?"""
+    lats, lons = [], []
+    for la0, lo0, la1, lo1 in zip(arrays["tx_lat"], arrays["tx_lon"], arrays["rx_lat"], arrays["rx_lon"]):
+        for tlat in range(math.floor(min(la0, la1)), math.floor(max(la0, la1)) + 1):
+            for tlon in range(math.floor(min(lo0, lo1)), math.floor(max(lo0, lo1)) + 1):
+                lats.append(tlat + 0.5)
+                lons.append(tlon + 0.5)
+    return hgt_tiles_em_memoria(lats, lons)
+
+
+def executar_lote(
+    servico: str, itens: List[dict], somente_local: bool = False, progresso: Progresso | None = None
+) -> Optional[list]:
+    """
+    Calcula o lote. Com `somente_local=True` (caminho inline da API) usa apenas tiles .hgt já em
+    memória (sem leitura de disco no worker web) e devolve None se faltar algum — o chamador então
+    enfileira no Celery.
+    Com `progresso`, pode levantar SimulacaoCancelada entre blocos.
+    """
+    resultados, arrays = preparar_lote(servico, itens)
+    if arrays["idx"]:
+        if somente_local and not _tiles_locais(arrays):
+            return None
+        for ini in range(0, len(arrays["idx"]), PARES_POR_BLOCO):
+            if progresso:
+                progresso.verificar_cancelamento()
+            bloco = {k: v[ini : ini + PARES_POR_BLOCO] for k, v in arrays.items()}
+            campos, dists = field_strength_p2p_batch(
+                bloco["freq"],
+                bloco["erp"],
+                bloco["tx_lat"],
+                bloco["tx_lon"],
+                bloco["rx_lat"],
+                bloco["rx_lon"],
+                samples=128,
+                use_db=not somente_local,
+            )
+            for idx, campo, dist in zip(bloco["idx"], campos.tolist(), dists.tolist()):
+                resultados[idx].update(
+                    campo_dbuv_m=round(campo, 2) if np.isfinite(campo) else None,
+                    dist_km=round(dist, 3),
+                    modelo=MODELO,
+                )
+    return resultados
+
+
+@shared_task(name="app.tasks.interferencia.lote")
+def calcular_interferencia_lote(sim_id: str, servico: str, itens: List[dict]) -> dict:
+    """Executa o lote ponto-a-ponto e grava os resultados em `Simulacao.resultado`."""
+    sim = Simulacao.query.get(sim_id)
+    if not sim:
+        return {"status": "error", "detail": "simulação não encontrada"}
+    if sim.status == "cancelled":
+        return {"status": sim.status}
+
+    progresso = Progresso(sim.id)
+    sim.status = "running"
+    db.session.commit()
+
+    try:
+        resultados = executar_lote(servico, itens, progresso=progresso)
+    except SimulacaoCancelada:
+        db.session.rollback()
+        sim.status = "cancelled"
+        sim.mensagem_status = "Cancelada pelo usuário."
+        db.session.commit()
+        progresso.limpar()
+        return {"status": sim.status}
+    except Exception as exc:
+        db.session.rollback()
+        sim.status = "failed"
+        sim.mensagem_status = f"Falha no lote de interferência: {str(exc)[:200]}"
+        db.session.commit()
+        return {"status": sim.status, "detail": sim.mensagem_status}
+
+    db.session.refresh(sim)  # a rota pode ter cancelado durante o cálculo
+    if sim.status == "cancelled":
+        return {"status": sim.status}
+    erros = sum(1 for r in resultados if "erro" in r)
+    sim.resultado = {"modelo": MODELO, "resultados": resultados}
+    sim.status = "done"
+    sim.mensagem_status = f"{len(resultados) - erros} pares calculados, {erros} com erro."
+    db.session.commit()
+    return {"status": sim.status, "pares": len(resultados), "erros": erros}
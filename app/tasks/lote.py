@@ -0,0 +1,216 @@
+"""
+Viabilidade em lote (FM/TV): uma simulação-mãe `lote_fm`/`lote_tv` e uma simulação-filha
+por estação (`simulacoes.lote_id`), processadas em chunks por um chord Celery.
+
+Progresso agregado = contagem de filhas por status (uma consulta via índice em lote_id);
+o callback do chord grava o resultado consolidado na simulação-mãe.
+"""
+
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+import sqlalchemy as sa
+from celery import chord, shared_task
+from celery.exceptions import SoftTimeLimitExceeded
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import EstacaoFM, EstacaoTV, Simulacao
+from app.tasks.fm import avaliar_viabilidade_fm
+from app.tasks.submissao import chave_simulacao, escolher_fila, simulacao_ativa
+from app.tasks.tv import avaliar_viabilidade_tv
+
+_MODELOS = {"fm": EstacaoFM, "tv": EstacaoTV}
+_TASKS = {"fm": avaliar_viabilidade_fm, "tv": avaliar_viabilidade_tv}
+
+
+def resolver_estacoes(servico: str, estacao_ids: Optional[List[int]] = None, filtro: Optional[dict] = None) -> List[int]:
+    """
+    IDs das estações do lote: lista explícita ou filtro (uf, servico, tecnologia [TV], bbox xmin,ymin,xmax,ymax).
+    Levanta ValueError para bbox inválido.
+    """
+    model = _MODELOS[servico]
+    query = db.session.query(model.id).filter(model.geom != None)  # noqa: E711
+    if estacao_ids:
+        query = query.filter(model.id.in_(estacao_ids))
+    filtro = filtro or {}
+    if filtro.get("uf"):
+        query = query.filter(model.uf == str(filtro["uf"]).upper())
+    if filtro.get("servico"):
+        query = query.filter(model.servico == str(filtro["servico"]).upper())
+    if servico == "tv" and filtro.get("tecnologia"):
+        query = query.filter(model.tecnologia == str(filtro["tecnologia"]).lower())
+    if filtro.get("bbox"):
+        try:
+            xmin, ymin, xmax, ymax = [float(v) for v in str(filtro["bbox"]).split(",")]
+        except Exception:
+            raise ValueError("bbox inválido. Use xmin,ymin,xmax,ymax")
+        envelope = func.ST_MakeEnvelope(xmin, ymin, xmax, ymax, 4674)
+        query = query.filter(func.ST_Within(model.geom, envelope))
+    return [est_id for (est_id,) in query.order_by(model.id)]
+
+
+def criar_lote(servico: str, ids: List[int], params: dict) -> tuple[Simulacao, bool]:
+    """
+    Cria a simulação-mãe e insere as filhas em bulk (uma linha por estação).
+    Lote idêntico (mesmas estações e parâmetros) ainda em andamento é reutilizado: retorna (lote, novo).
+    """
+    chave = chave_simulacao(
+        f"lote_{servico}",
+        {"ids": sorted(ids), "time_percent": params.get("time_percent") or 50, "path": params.get("path") or "Land"},
+    )
+    existente = simulacao_ativa(chave)
+    if existente:
+        return existente, False
+    lote = Simulacao(tipo=f"lote_{servico}", params=params, status="queued", mensagem_status=None, chave_hash=chave)
+    db.session.add(lote)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        existente = simulacao_ativa(chave)
+        if existente is None:
+            raise
+        return existente, False
+    agora = datetime.utcnow()
+    filhas = [
+        {
+            "id": str(uuid.uuid4()),
+            "tipo": servico,
+            "params": {
+                "estacao_id": est_id,
+                "time_percent": params.get("time_percent"),
+                "path": params.get("path"),
+            },
+            "status": "queued",
+            "lote_id": lote.id,
+            "created_at": agora,
+            "updated_at": agora,
+        }
+        for est_id in ids
+    ]
+    if filhas:
+        db.session.execute(sa.insert(Simulacao), filhas)
+    db.session.commit()
+    return lote, True
+
+
+def progresso_lote(lote_id: str) -> dict:
+    """Contagem das filhas por status e percentual concluído."""
+    contagem = dict(
+        db.session.query(Simulacao.status, func.count())
+        .filter(Simulacao.lote_id == lote_id)
+        .group_by(Simulacao.status)
+        .all()
+    )
+    total = sum(contagem.values())
+    concluidas = contagem.get("done", 0) + contagem.get("failed", 0) + contagem.get("cancelled", 0)
+    return {
+        "total": total,
+        "por_status": contagem,
+        "concluidas": concluidas,
+        "percentual": round(100.0 * concluidas / total, 1) if total else 100.0,
+    }
+
+
+@shared_task(name="app.tasks.lote.chunk")
+def processar_chunk(servico: str, itens: List[list], time_percent: float | None = None, path: str | None = None) -> list:
+    """Executa a viabilidade de um chunk [(sim_id, estacao_id), ...] no mesmo worker."""
+    task = _TASKS[servico]
+    resultados = []
+    for pos, (sim_id, estacao_id) in enumerate(itens):
+        try:
+            res = task(sim_id, estacao_id, time_percent, path)
+        except SoftTimeLimitExceeded:
+            # limite de tempo do chunk: encerra as filhas restantes em vez de estourar o hard limit
+            db.session.rollback()
+            restantes = [s for s, _ in itens[pos:]]
+            db.session.query(Simulacao).filter(Simulacao.id.in_(restantes)).update(
+                {"status": "failed", "mensagem_status": "Tempo limite do chunk esgotado."}, synchronize_session=False
+            )
+            db.session.commit()
+            resultados.extend(
+                {"sim_id": s, "estacao_id": e, "status": "failed", "aprovado": None} for s, e in itens[pos:]
+            )
+            break
+        except Exception as exc:
+            db.session.rollback()
+            sim = Simulacao.query.get(sim_id)
+            if sim:
+                sim.status = "failed"
+                sim.mensagem_status = f"Erro na viabilidade: {str(exc)[:200]}"
+                db.session.commit()
+            res = {"status": "failed", "detail": str(exc)[:180]}
+        resultados.append(
+            {
+                "sim_id": sim_id,
+                "estacao_id": estacao_id,
+                "status": res.get("status"),
+                "aprovado": res.get("aprovado"),
+                "contorno_id": res.get("contorno_id"),
+                "dist_km_media": res.get("dist_km_media"),
+            }
+        )
+    return resultados
+
+
+@shared_task(name="app.tasks.lote.consolidar")
+def consolidar_lote(chunks: list, lote_id: str) -> dict:
+    """Callback do chord: grava o resultado consolidado na simulação-mãe."""
+    itens = [item for chunk in chunks for item in (chunk or [])]
+    resumo = {
+        "total": len(itens),
+        "aprovados": sum(1 for i in itens if i.get("aprovado") is True),
+        "reprovados": sum(1 for i in itens if i.get("aprovado") is False),
+        "falhas": sum(1 for i in itens if i.get("status") != "done"),
+    }
+    lote = Simulacao.query.get(lote_id)
+    if lote:
+        lote.resultado = {"resumo": resumo, "itens": itens}
+        if lote.status != "cancelled":
+            lote.status = "done"
+            lote.mensagem_status = (
+                f"{resumo['total']} estações: {resumo['aprovados']} aprovadas, "
+                f"{resumo['reprovados']} reprovadas, {resumo['falhas']} falhas."
+            )
+        db.session.commit()
+    return {"status": lote.status if lote else "done", **resumo}
+
+
+@shared_task(name="app.tasks.lote.viabilidade")
+def executar_lote_viabilidade(lote_id: str, servico: str) -> dict:
+    """Coordenador: divide as filhas em chunks e dispara o chord."""
+    lote = Simulacao.query.get(lote_id)
+    if not lote:
+        return {"status": "error", "detail": "simulação não encontrada"}
+    if lote.status == "cancelled":
+        return {"status": lote.status}
+    params = lote.params or {}
+    filhas = (
+        db.session.query(Simulacao.id, Simulacao.params)
+        .filter(Simulacao.lote_id == lote_id, Simulacao.status == "queued")
+        .order_by(Simulacao.created_at, Simulacao.id)
+        .all()
+    )
+    itens = [[sim_id, (p or {}).get("estacao_id")] for sim_id, p in filhas]
+    lote.status = "running"
+    lote.mensagem_status = f"{len(itens)} estações enfileiradas."
+    db.session.commit()
+
+    if not itens:
+        return consolidar_lote([], lote_id)
+
+    tamanho = max(1, int(current_app.config.get("VIABILIDADE_LOTE_CHUNK", 25)))
+    chunks = [itens[i : i + tamanho] for i in range(0, len(itens), tamanho)]
+    # lotes pequenos seguem na fila interativa; os demais na fila de lote
+    fila, prioridade = escolher_fila(len(itens))
+    chord(
+        processar_chunk.s(servico, chunk, params.get("time_percent"), params.get("path")).set(
+            queue=fila, priority=prioridade
+        )
+        for chunk in chunks
+    )(consolidar_lote.s(lote_id).set(queue=fila, priority=prioridade))
+    return {"status": "running", "itens": len(itens), "chunks": len(chunks)}
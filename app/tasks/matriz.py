@@ -0,0 +1,365 @@
+"""
+Matriz nacional de interferência FM/TV (pares desejado × interferente).
+
+- Poda espacial (ST_DWithin 300 km, mesmo raio da viabilidade) e de frequência
+  (FM: |Δf| ≤ 500 kHz; TV: apenas Δcanal com norma de proteção).
+- Job dividido em tiles geográficos de 1° (nome no padrão SRTM, ex.: S24W047) pela
+  posição da estação desejada; cada tile é uma task Celery (paralelo entre workers).
+- Checkpoint por tile em `matriz_interferencia_tiles`: reexecutar o job retoma apenas
+  os tiles pendentes/falhos.
+- Resultado esparso em `matriz_interferencia` (margem negativa = falha de C/I).
+- Um job por serviço de cada vez: linhas e checkpoints não guardam time_percent/path, então
+  dois jobs simultâneos (ou um `reiniciar` durante outro) escreveriam sobre as mesmas linhas.
+"""
+
+from datetime import datetime
+from typing import Iterable, List
+
+import sqlalchemy as sa
+from celery import chord, shared_task
+
+from app import db
+from app.models import MatrizInterferencia, MatrizInterferenciaTile, Simulacao
+from app.tasks.fm import _campo_interferente
+from app.tasks.submissao import chave_simulacao, criar_simulacao
+from app.tasks.tv import _campo_interferente_tv, _delta_label, _nivel_alvo_por_canal
+from app.utils.etl.srtm_downloader import tile_name
+from app.utils.normas.registro import RegistroNormas, registro_normas
+from app.utils.progresso import cancelamento_solicitado
+from app.utils.propagacao.parametros import obter_lote as obter_parametros_lote
+
+RAIO_MATRIZ_M = 300000  # mesmo raio de busca da viabilidade
+FM_DF_MAX_MHZ = 0.5
+NIVEL_PROTEGIDO_FM = 66.0
+DELTAS_CANAL_TV = range(-20, 21)
+
+SERVICOS = ("fm", "tv")
+
+_TABELAS = {"fm": "estacoes_fm", "tv": "estacoes_tv"}
+
+_SQL_PARES_FM = """
+    SELECT d.id AS desejado_id, d.freq_mhz AS d_freq,
+           ST_Y(d.geom) AS d_lat, ST_X(d.geom) AS d_lon,
+           i.id, i.freq_mhz, i.erp_max_kw, i.hnmt_m,
+           ST_Y(i.geom) AS lat, ST_X(i.geom) AS lon,
+           ST_DistanceSphere(d.geom, i.geom) / 1000.0 AS dist_km
+    FROM estacoes_fm d
+    JOIN estacoes_fm i
+      ON i.id != d.id
+     AND i.geom IS NOT NULL
+     AND i.freq_mhz BETWEEN d.freq_mhz - :df_mhz AND d.freq_mhz + :df_mhz
+     AND ST_DWithin(d.geom::geography, i.geom::geography, :raio_m)
+    WHERE d.geom IS NOT NULL
+      AND d.freq_mhz IS NOT NULL
+      AND ({filtro})
+"""
+
+_SQL_PARES_TV = """
+    SELECT d.id AS desejado_id, d.freq_mhz AS d_freq, d.canal AS d_canal,
+           ST_Y(d.geom) AS d_lat, ST_X(d.geom) AS d_lon,
+           i.id, i.canal, i.tecnologia, i.freq_mhz, i.erp_max_kw, i.hnmt_m,
+           ST_Y(i.geom) AS lat, ST_X(i.geom) AS lon,
+           ST_DistanceSphere(d.geom, i.geom) / 1000.0 AS dist_km
+    FROM estacoes_tv d
+    JOIN estacoes_tv i
+      ON i.id != d.id
+     AND i.geom IS NOT NULL
+     AND i.canal IS NOT NULL
+     AND (i.canal - d.canal) = ANY(:deltas)
+     AND ST_DWithin(d.geom::geography, i.geom::geography, :raio_m)
+    WHERE d.geom IS NOT NULL
+      AND d.canal IS NOT NULL
+      AND ({filtro})
+"""
+
+
+def _tile_origem(tile: str) -> tuple[int, int]:
+    """Canto SW (lat, lon) de um tile no padrão SRTM (inverso de `tile_name`)."""
+    lat = int(tile[1:3]) * (1 if tile[0] == "N" else -1)
+    lon = int(tile[4:7]) * (1 if tile[3] == "E" else -1)
+    return lat, lon
+
+
+def _listar_tiles(servico: str) -> List[str]:
+    tabela = _TABELAS[servico]
+    rows = db.session.execute(
+        sa.text(
+            f"""
+            SELECT DISTINCT floor(ST_Y(geom)) AS lat0, floor(ST_X(geom)) AS lon0
+            FROM {tabela}
+            WHERE geom IS NOT NULL
+            """
+        )
+    ).fetchall()
+    return sorted({tile_name(float(r.lat0), float(r.lon0)) for r in rows})
+
+
+def _deltas_tv(registro: RegistroNormas) -> List[int]:
+    labels = registro.labels_tv("digital")
+    return [d for d in DELTAS_CANAL_TV if _delta_label(d) in labels]
+
+
+def buscar_pares(servico: str, filtro: str, params: dict, registro: RegistroNormas):
+    """Pares candidatos (já podados) para as estações desejadas que satisfazem `filtro` (SQL sobre `d`/`i`)."""
+    params = dict(params, raio_m=RAIO_MATRIZ_M)
+    if servico == "fm":
+        sql = _SQL_PARES_FM.format(filtro=filtro)
+        params["df_mhz"] = FM_DF_MAX_MHZ
+    else:
+        deltas = _deltas_tv(registro)
+        if not deltas:
+            return []
+        sql = _SQL_PARES_TV.format(filtro=filtro)
+        params["deltas"] = deltas
+    return db.session.execute(sa.text(sql), params).fetchall()
+
+
+def avaliar_pares(servico: str, rows: Iterable, registro: RegistroNormas, time_percent: float, path: str) -> List[dict]:
+    """Calcula campo interferente, C/I requerida e margem para cada par candidato."""
+    agora = datetime.utcnow()
+    niveis: dict[int, float] = {}
+    pares: List[dict] = []
+    rows = list(rows)
+    params = obter_parametros_lote(servico, (r.id for r in rows))
+    for r in rows:
+        h_eff_intf = params[r.id].h_eff(0.0) if r.id in params else None
+        if servico == "fm":
+            delta = abs((r.freq_mhz or 0) - r.d_freq) * 1000.0
+            ci_req = registro.ci_fm(delta)
+            if ci_req is None:
+                continue
+            campo, modelo = _campo_interferente(r, r.d_lat, r.d_lon, r.d_freq, time_percent, path, h_eff_intf)
+            limite = NIVEL_PROTEGIDO_FM - ci_req
+        else:
+            delta = (r.canal or 0) - (r.d_canal or 0)
+            ci_req = registro.ci_tv(_delta_label(delta), "digital", (r.tecnologia or "").lower())
+            if ci_req is None:
+                continue
+            campo, modelo = _campo_interferente_tv(
+                r, r.d_lat, r.d_lon, r.d_freq or 600.0, time_percent, path, h_eff_intf
+            )
+            if r.d_canal not in niveis:
+                niveis[r.d_canal] = _nivel_alvo_por_canal(r.d_canal)
+            limite = niveis[r.d_canal] - ci_req
+        pares.append(
+            {
+                "servico": servico,
+                "desejado_id": r.desejado_id,
+                "interferente_id": r.id,
+                "dist_km": r.dist_km,
+                "delta": float(delta),
+                "campo_dbuv_m": campo,
+                "ci_requerida_db": ci_req,
+                "margem_db": limite - campo,
+                "modelo": modelo,
+                "atualizado_em": agora,
+            }
+        )
+    return pares
+
+
+def _marcar_tile(servico: str, tile: str, status: str, pares: int | None = None, mensagem: str | None = None) -> None:
+    ck = MatrizInterferenciaTile.query.get((servico, tile))
+    if not ck:
+        ck = MatrizInterferenciaTile(servico=servico, tile=tile)
+        db.session.add(ck)
+    ck.status = status
+    ck.pares = pares
+    ck.mensagem = mensagem[:250] if mensagem else None
+
+
+@shared_task(name="app.tasks.matriz.tile")
+def calcular_tile(
+    servico: str, tile: str, time_percent: float = 50, path: str = "Land", sim_id: str | None = None
+) -> dict:
+    """
+    Calcula e grava os pares cujas estações desejadas estão no tile (transação única com o checkpoint).
+    Se o job `sim_id` foi cancelado, não calcula: o tile fica pendente para uma próxima execução.
+    """
+    ck = MatrizInterferenciaTile.query.get((servico, tile))
+    if ck and ck.status == "done":
+        return {"tile": tile, "status": "done", "pares": ck.pares, "retomado": True}
+    if sim_id and cancelamento_solicitado(sim_id):
+        return {"tile": tile, "status": "cancelled"}
+
+    lat0, lon0 = _tile_origem(tile)
+    filtro = "floor(ST_Y(d.geom)) = :lat0 AND floor(ST_X(d.geom)) = :lon0"
+    try:
+        registro = registro_normas()
+        rows = buscar_pares(servico, filtro, {"lat0": lat0, "lon0": lon0}, registro)
+        pares = avaliar_pares(servico, rows, registro, time_percent, path)
+
+        tabela = _TABELAS[servico]
+        db.session.execute(
+            sa.text(
+                f"""
+                DELETE FROM matriz_interferencia m
+                USING {tabela} d
+                WHERE m.servico = :servico
+                  AND m.desejado_id = d.id
+                  AND floor(ST_Y(d.geom)) = :lat0 AND floor(ST_X(d.geom)) = :lon0
+                """
+            ),
+            {"servico": servico, "lat0": lat0, "lon0": lon0},
+        )
+        if pares:
+            db.session.execute(sa.insert(MatrizInterferencia), pares)
+        _marcar_tile(servico, tile, "done", pares=len(pares))
+        db.session.commit()
+        return {"tile": tile, "status": "done", "pares": len(pares)}
+    except Exception as exc:
+        # Não propaga: o chord precisa do callback para consolidar; o tile fica pendente para retomada.
+        db.session.rollback()
+        _marcar_tile(servico, tile, "failed", mensagem=str(exc))
+        db.session.commit()
+        return {"tile": tile, "status": "failed", "detail": str(exc)[:180]}
+
+
+@shared_task(name="app.tasks.matriz.finalizar")
+def finalizar_matriz(resultados: list, sim_id: str, servico: str) -> dict:
+    """Callback do chord: consolida contagem de tiles/pares na simulação."""
+    contagem = dict(
+        db.session.query(MatrizInterferenciaTile.status, sa.func.count())
+        .filter(MatrizInterferenciaTile.servico == servico)
+        .group_by(MatrizInterferenciaTile.status)
+        .all()
+    )
+    pares = db.session.scalar(
+        sa.select(sa.func.count()).select_from(MatrizInterferencia).where(MatrizInterferencia.servico == servico)
+    )
+    falhas = contagem.get("failed", 0)
+    cancelada = cancelamento_solicitado(sim_id)
+    sim = Simulacao.query.get(sim_id)
+    if sim:
+        sim.status = "cancelled" if cancelada else "done"
+        sim.mensagem_status = (
+            f"Matriz {servico.upper()}: {contagem.get('done', 0)} tiles, {pares} pares"
+            + (f"; {falhas} tiles com falha (reexecute para retomar)." if falhas else ".")
+            + (" Cancelada; tiles pendentes retomáveis." if cancelada else "")
+        )[:250]
+        db.session.commit()
+    return {"status": "cancelled" if cancelada else "done", "tiles": contagem, "pares": pares}
+
+
+def criar_simulacao_matriz(servico: str, payload: dict) -> tuple[Simulacao, str]:
+    """
+    Cria a simulação do job nacional, coalescendo por serviço (não por parâmetros).
+    Retorna (simulação, situação): "nova"; "deduplicada" (a ativa tem os mesmos parâmetros);
+    "conflito" (há job ativa ou cancelando com outros parâmetros — a nova não é criada).
+    """
+    tipo = f"matriz_{servico}"
+    params = {
+        "time_percent": payload.get("time_percent") or 50,
+        "path": payload.get("path") or "Land",
+        "reiniciar": bool(payload.get("reiniciar")),
+    }
+    # tiles de um job cancelado ainda podem estar gravando até o próximo ponto de verificação
+    cancelando = Simulacao.query.filter_by(tipo=tipo, status="cancelando").first()
+    if cancelando:
+        return cancelando, "conflito"
+    sim, nova = criar_simulacao(tipo, params, chave_simulacao(tipo, {}))
+    if nova:
+        return sim, "nova"
+    return sim, "deduplicada" if sim.params == params else "conflito"
+
+
+@shared_task(name="app.tasks.matriz.calcular")
+def calcular_matriz(
+    sim_id: str,
+    servico: str,
+    time_percent: float | None = None,
+    path: str | None = None,
+    reiniciar: bool = False,
+) -> dict:
+    """
+    Coordena o job nacional: registra os tiles, descarta checkpoints se `reiniciar`
+    e dispara um chord com os tiles pendentes.
+    """
+    sim = Simulacao.query.get(sim_id)
+    if not sim:
+        return {"status": "error", "detail": "simulação não encontrada"}
+    if sim.status == "cancelled":
+        return {"status": sim.status}
+    if servico not in SERVICOS:
+        sim.status = "failed"
+        sim.mensagem_status = f"Serviço inválido para matriz: {servico}"
+        db.session.commit()
+        return {"status": sim.status, "detail": sim.mensagem_status}
+
+    if reiniciar:
+        db.session.query(MatrizInterferenciaTile).filter_by(servico=servico).delete()
+        db.session.query(MatrizInterferencia).filter_by(servico=servico).delete()
+
+    tiles = _listar_tiles(servico)
+    feitos = {
+        t
+        for (t,) in db.session.query(MatrizInterferenciaTile.tile).filter_by(servico=servico, status="done")
+    }
+    pendentes = [t for t in tiles if t not in feitos]
+    for tile in pendentes:
+        _marcar_tile(servico, tile, "pending")
+    sim.status = "running"
+    sim.mensagem_status = f"Matriz {servico.upper()}: {len(pendentes)} de {len(tiles)} tiles pendentes."
+    db.session.commit()
+
+    tp = time_percent or 50
+    ph = path or "Land"
+    if not pendentes:
+        return finalizar_matriz([], sim_id, servico)
+
+    chord(calcular_tile.s(servico, tile, tp, ph, sim_id) for tile in pendentes)(finalizar_matriz.s(sim_id, servico))
+    return {"status": sim.status, "tiles": len(tiles), "pendentes": len(pendentes)}
+
+
+def pares_afetados(servico: str, ids: Iterable[int], registro: RegistroNormas) -> tuple[set, list]:
+    """
+    Índice de dependência de um conjunto de estações alteradas:
+    - pares já gravados em que alguma delas é desejada ou interferente (inclui vizinhos antigos após mudança de posição);
+    - pares candidatos na posição/frequência atuais, como desejada e como interferente (vizinhos novos).
+    Retorna (chaves gravadas a remover, linhas candidatas a recalcular), sem duplicar pares entre estações alteradas.
+    """
+    ids = sorted({int(i) for i in ids})
+    gravados = set(
+        db.session.query(MatrizInterferencia.desejado_id, MatrizInterferencia.interferente_id)
+        .filter(MatrizInterferencia.servico == servico)
+        .filter(
+            sa.or_(MatrizInterferencia.desejado_id.in_(ids), MatrizInterferencia.interferente_id.in_(ids))
+        )
+        .all()
+    )
+    candidatos = {}
+    for filtro in ("d.id = ANY(:ids)", "i.id = ANY(:ids)"):
+        for r in buscar_pares(servico, filtro, {"ids": ids}, registro):
+            candidatos[(r.desejado_id, r.id)] = r
+    return gravados, list(candidatos.values())
+
+
+def atualizar_pares_estacoes(
+    servico: str, ids: Iterable[int], time_percent: float = 50, path: str = "Land"
+) -> dict:
+    """Recalcula apenas os pares que tocam as estações `ids` e atualiza a matriz in place (transação única)."""
+    ids = sorted({int(i) for i in ids})
+    if not ids:
+        return {"removidos": 0, "gravados": 0}
+    registro = registro_normas()
+    gravados, candidatos = pares_afetados(servico, ids, registro)
+    pares = avaliar_pares(servico, candidatos, registro, time_percent, path)
+
+    db.session.query(MatrizInterferencia).filter(MatrizInterferencia.servico == servico).filter(
+        sa.or_(MatrizInterferencia.desejado_id.in_(ids), MatrizInterferencia.interferente_id.in_(ids))
+    ).delete(synchronize_session=False)
+    if pares:
+        db.session.execute(sa.insert(MatrizInterferencia), pares)
+    db.session.commit()
+    return {"removidos": len(gravados), "gravados": len(pares)}
+
+
+@shared_task(name="app.tasks.matriz.atualizar")
+def atualizar_matriz(
+    servico: str, estacao_ids: list[int], time_percent: float | None = None, path: str | None = None
+) -> dict:
+    """Manutenção incremental da matriz após alteração/inclusão/remoção de estações."""
+    if servico not in SERVICOS:
+        return {"status": "error", "detail": f"Serviço inválido para matriz: {servico}"}
+    res = atualizar_pares_estacoes(servico, estacao_ids, time_percent or 50, path or "Land")
+    return {"status": "done", "estacoes": len(set(estacao_ids)), **res}
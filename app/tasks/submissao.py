@@ -0,0 +1,126 @@
+"""
+Submissão de tarefas com roteamento por tamanho do job.
+
+Jobs pequenos (até CELERY_LIMIAR_INTERATIVO itens) vão para a fila interativa com prioridade alta;
+lotes vão para a fila de lote e jobs nacionais (sem lista de itens) com a prioridade mais baixa.
+Usa a instância Celery configurada por `make_celery` (filas, rotas, limites), criada sob demanda
+no processo web.
+
+Submissões idênticas (mesmo hash de tipo + parâmetros canônicos + versão da estação) são coalescidas:
+enquanto a primeira estiver queued/running, as seguintes recebem a mesma simulação. Uma simulação
+com cancelamento pedido (`cancelando`) não é mais ativa: a próxima submissão cria uma nova.
+"""
+
+import hashlib
+from typing import Optional, Sequence
+
+from celery import Celery
+from celery.result import AsyncResult
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from app import db, make_celery
+from app.models import Simulacao
+from app.utils.estacoes import canonico
+
+STATUS_ATIVOS = ("queued", "running")  # mesmo predicado do índice único parcial em chave_hash
+
+
+def celery_app() -> Celery:
+    """Instância Celery da app atual (a do worker ou uma criada uma vez no processo web)."""
+    return current_app.extensions.get("celery") or make_celery(current_app)
+
+
+def escolher_fila(itens: Optional[int]) -> tuple[str, int]:
+    """(fila, prioridade) para um job com `itens` estações/pares; None = job nacional."""
+    cfg = current_app.config
+    if itens is not None and itens <= cfg.get("CELERY_LIMIAR_INTERATIVO", 10):
+        return cfg.get("CELERY_FILA_INTERATIVA", "interativo"), cfg.get("CELERY_PRIORIDADE_INTERATIVA", 0)
+    prioridade = cfg.get("CELERY_PRIORIDADE_NACIONAL", 9) if itens is None else cfg.get("CELERY_PRIORIDADE_LOTE", 6)
+    return cfg.get("CELERY_FILA_LOTE", "lote"), prioridade
+
+
+def enfileirar(
+    nome_task: str, args: Sequence = (), itens: Optional[int] = 1, sim: Optional[Simulacao] = None
+) -> AsyncResult:
+    """
+    Envia a tarefa pelo nome, na fila/prioridade adequadas ao tamanho do job.
+    Com `sim`, grava o id da tarefa na simulação (permite revogar no cancelamento).
+    """
+    fila, prioridade = escolher_fila(itens)
+    current_app.logger.info("Enfileirando %s na fila %s (prioridade %s, itens=%s)", nome_task, fila, prioridade, itens)
+    resultado = celery_app().send_task(nome_task, args=tuple(args), queue=fila, priority=prioridade)
+    if sim is not None:
+        sim.task_id = resultado.id
+        db.session.commit()
+    return resultado
+
+
+def cancelar_simulacao(sim: Simulacao) -> str:
+    """
+    Cancela a simulação: queued -> cancelled na hora (tarefa revogada); running -> cancelando (gravado,
+    fora de STATUS_ATIVOS) e sinaliza o pedido, atendido pela tarefa no próximo ponto de verificação.
+    Lotes cancelam as filhas pendentes e sinalizam as em execução. Retorna o status resultante.
+    """
+    from app.utils.progresso import solicitar_cancelamento  # late import
+
+    solicitar_cancelamento(sim.id)
+    if sim.task_id:
+        try:
+            celery_app().control.revoke(sim.task_id)
+        except Exception:
+            current_app.logger.warning("Falha ao revogar tarefa %s", sim.task_id, exc_info=True)
+
+    if sim.tipo.startswith("lote_"):
+        db.session.query(Simulacao).filter(Simulacao.lote_id == sim.id, Simulacao.status == "queued").update(
+            {"status": "cancelled", "mensagem_status": "Lote cancelado."}, synchronize_session=False
+        )
+        filhas = db.session.query(Simulacao.id).filter(Simulacao.lote_id == sim.id, Simulacao.status == "running")
+        for (filha_id,) in filhas:
+            solicitar_cancelamento(filha_id)
+        filhas.update(
+            {"status": "cancelando", "mensagem_status": "Cancelamento solicitado."}, synchronize_session=False
+        )
+
+    if sim.status == "queued" or sim.tipo.startswith("lote_"):
+        sim.status = "cancelled"
+        sim.mensagem_status = "Cancelada pelo usuário."
+    elif sim.status == "running":
+        sim.status = "cancelando"
+        sim.mensagem_status = "Cancelamento solicitado."
+    db.session.commit()
+    return sim.status
+
+
+def chave_simulacao(tipo: str, params: dict, versao: Optional[str] = None) -> str:
+    """Hash canônico da submissão: tipo, parâmetros normalizados e versão técnica da(s) estação(ões)."""
+    return hashlib.sha256(canonico({"tipo": tipo, "params": params, "versao": versao}).encode()).hexdigest()
+
+
+def simulacao_ativa(chave_hash: str) -> Optional[Simulacao]:
+    return Simulacao.query.filter(
+        Simulacao.chave_hash == chave_hash, Simulacao.status.in_(STATUS_ATIVOS)
+    ).first()
+
+
+def criar_simulacao(tipo: str, params: dict, chave_hash: Optional[str] = None) -> tuple[Simulacao, bool]:
+    """
+    Cria a simulação (status queued) ou devolve a equivalente já em andamento.
+    Retorna (simulação, nova). Corridas entre requisições simultâneas são resolvidas pelo índice
+    único parcial em chave_hash: quem perde o INSERT reutiliza a simulação vencedora.
+    """
+    if chave_hash:
+        existente = simulacao_ativa(chave_hash)
+        if existente:
+            return existente, False
+    sim = Simulacao(tipo=tipo, params=params, status="queued", mensagem_status=None, chave_hash=chave_hash)
+    db.session.add(sim)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        existente = simulacao_ativa(chave_hash) if chave_hash else None
+        if existente is None:
+            raise
+        return existente, False
+    return sim, True
@@ -1,5 +1,7 @@
+import numpy as np
 import sqlalchemy as sa
 from celery import shared_task
+from celery.exceptions import SoftTimeLimitExceeded
 
 from app import db
 from app.models import (
@@ -11,19 +13,15 @@ from app.models import (
     ResultadoCobertura,
     Simulacao,
 )
-from app.utils.propagacao.p1546_curves import field_strength_p1546
+from app.utils.propagacao.p1546_curves import tabela_campo
 from app.utils.propagacao.terrain import destination_point, effective_height
 from app.utils.propagacao.p526 import field_strength_from_erp_dbuvm, path_loss_p526_db, sample_profile
+from app.utils.progresso import Progresso, SimulacaoCancelada
+from app.utils.propagacao.diagrama import aplicar_erp, diagrama_estacao
+from app.utils.propagacao.parametros import obter as parametros_estacao
+from app.utils.resultados import gravar_resultado_estacao
 
-
-def _erp_kw_por_radial(erp_kw: float, erp_por_radial: list[float] | None, angle: int) -> float:
-    """Ajusta ERP por radial se o diagrama estiver disponível (valores presumidos em dBd)."""
-    if not erp_por_radial or len(erp_por_radial) != 72:
-        return erp_kw
-    idx = angle // 5
-    ganho_db = erp_por_radial[idx] or 0.0
-    fator = 10 ** (ganho_db / 10.0)
-    return max(0.001, erp_kw * fator)
+RADIAIS_POR_BLOCO = 12  # radiais por bisseção vetorizada (e por checkpoint de progresso)
 
 
 def _altura_efetiva(est: EstacaoTV, angle: float) -> float:
@@ -36,42 +34,56 @@ def _altura_efetiva(est: EstacaoTV, angle: float) -> float:
             ).fetchone()
             if latlon and latlon.lat is not None and latlon.lon is not None:
                 return effective_height(latlon.lat, latlon.lon, angle, hnmt_fallback=est.hnmt_m or 30.0)
+    except SoftTimeLimitExceeded:
+        raise
     except Exception:
         pass
     return est.hnmt_m or 30.0
 
 
-def _nivel_alvo_dbuv(est: EstacaoTV) -> float:
+def _faixa_canal(canal: int) -> str:
+    if 2 <= canal <= 6:
+        return "vhf_baixo"
+    if 7 <= canal <= 13:
+        return "vhf_alto"
+    return "uhf"
+
+
+def _nivel_alvo_por_canal(canal: int) -> float:
     """
     Recupera nível de contorno protegido para TV conforme faixa/tecnologia.
     Fallback: 51 dBµV/m (apenas digital).
     """
     tecnologia = "digital"
-
-    def faixa_canal(canal: int) -> str:
-        if 2 <= canal <= 6:
-            return "vhf_baixo"
-        if 7 <= canal <= 13:
-            return "vhf_alto"
-        return "uhf"
-
-    faixa = faixa_canal(est.canal or 0)
+    faixa = _faixa_canal(canal)
     norma = NormasTVNivelContorno.query.filter_by(tecnologia=tecnologia, faixa_canal=faixa).first()
     if norma and norma.nivel_campo_dbuv_m:
         return norma.nivel_campo_dbuv_m
     return 51.0
 
 
-def _distancia_alvo_km(est: EstacaoTV, angle: int, time_percent: float, path: str) -> float:
+def _nivel_alvo_dbuv(est: EstacaoTV) -> float:
+    """Nível de contorno protegido da estação (ver `_nivel_alvo_por_canal`)."""
+    return _nivel_alvo_por_canal(est.canal or 0)
+
+
+def _distancias_alvo_km(
+    est: EstacaoTV,
+    time_percent: float,
+    path: str,
+    h_eff_m: np.ndarray,
+    erp_eff_kw: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
     """
-    Distância-alvo por radial:
+    Distância-alvo de vários radiais de uma vez (um elemento por radial em `h_eff_m`/`erp_eff_kw`):
     - Usa dist_max_contorno_protegido_km da norma como teto, se disponível;
-    - Busca distância que atinge o nível alvo via P.1546 simplificado;
+    - Busca distância que atinge o nível alvo via P.1546 (curvas de 1 kW escaladas para a ERP do radial);
     - Piso 5 km, teto 120 km.
+    A bisseção (12 passos) anda em todos os radiais juntos: cada passo é um lookup vetorizado nas
+    tabelas densas da frequência/tempo da estação (`tabela_campo`; no digital, E(50) e E(10)).
+    Retorna (distâncias km, campos dBµV/m nessas distâncias).
     """
     tecnologia = (est.tecnologia or "").lower()
-    erp_base = est.erp_max_kw or 1.0
-    erp_eff = _erp_kw_por_radial(erp_base, est.erp_por_radial, angle)
 
     dist_cap = None
     if est.classe:
@@ -83,41 +95,28 @@ def _distancia_alvo_km(est: EstacaoTV, angle: int, time_percent: float, path: st
             dist_cap = norma.dist_max_contorno_protegido_km
 
     nivel_alvo = _nivel_alvo_dbuv(est)
-    def field(dist_km: float) -> float:
-        if tecnologia == "digital":
-            e50 = field_strength_p1546(
-                freq_mhz=est.freq_mhz or 600.0,
-                dist_km=dist_km,
-                h_eff_m=_altura_efetiva(est, angle),
-                time_percent=time_percent if time_percent in (50, 10, 1) else 50,
-                path=path,
-            )
-            e10 = field_strength_p1546(
-                freq_mhz=est.freq_mhz or 600.0,
-                dist_km=dist_km,
-                h_eff_m=_altura_efetiva(est, angle),
-                time_percent=10,
-                path=path,
-            )
-            return 2 * e50 - e10  # E(50,90) derivado (aprox)
-        return field_strength_p1546(
-            freq_mhz=est.freq_mhz or 600.0,
-            dist_km=dist_km,
-            h_eff_m=_altura_efetiva(est, angle),
-            time_percent=time_percent if time_percent in (50, 10, 1) else 50,
-            path=path,
-        )
+    freq = est.freq_mhz or 600.0
+    tempo = time_percent if time_percent in (50, 10, 1) else 50
+
+    tabela = tabela_campo(freq, tempo, path)
+    tabela_10 = tabela_campo(freq, 10, path) if tecnologia == "digital" else None
+
+    def field(dist_km: np.ndarray) -> np.ndarray:
+        campo_1kw = tabela(dist_km, h_eff_m)
+        if tabela_10 is not None:
+            campo_1kw = 2 * campo_1kw - tabela_10(dist_km, h_eff_m)  # E(50,90) derivado (aprox)
+        return aplicar_erp(campo_1kw, erp_eff_kw)
 
-    target = nivel_alvo
-    lo, hi = 1.0, dist_cap or 120.0
+    lo = np.full(np.shape(h_eff_m), 1.0)
+    hi = np.full(np.shape(h_eff_m), float(dist_cap or 120.0))
     for _ in range(12):
         mid = 0.5 * (lo + hi)
-        if field(mid) > target:
-            lo = mid
-        else:
-            hi = mid
-    dist = hi
-    return max(5.0, dist if dist_cap is None else min(dist, dist_cap))
+        acima = field(mid) > nivel_alvo
+        lo = np.where(acima, mid, lo)
+        hi = np.where(acima, hi, mid)
+    dist = np.maximum(5.0, hi if dist_cap is None else np.minimum(hi, dist_cap))
+    return dist, field(dist)
+
 
 def _avaliar_limites_classe(est: EstacaoTV) -> tuple[bool, list[str]]:
     msgs: list[str] = []
@@ -161,9 +160,52 @@ def _norma_tv(delta: int, tec_desejado: str, tec_intf: str) -> NormasTVProtecao
     )
 
 
-def _avaliar_interferencias_tv(est: EstacaoTV, path: str, time_percent: float) -> tuple[bool, list[str], bool]:
+def _campo_interferente_tv(
+    r,
+    rx_lat: float,
+    rx_lon: float,
+    freq_ref: float,
+    time_percent: float,
+    path: str,
+    h_eff_intf: float | None = None,
+) -> tuple[float, str]:
+    """Campo do interferente `r` no receptor (P.526/Assis; fallback P.1546). Retorna (campo, modelo)."""
+    try:
+        profile_d, profile_h = sample_profile(r.lat, r.lon, rx_lat, rx_lon, samples=96)
+        h_tx_asl = (profile_h[0] if profile_h else 0.0) + (r.hnmt_m or 30.0)
+        h_rx_asl = (profile_h[-1] if profile_h else 0.0) + 10.0
+        pl_db = path_loss_p526_db(
+            profile_d,
+            profile_h,
+            freq_mhz=r.freq_mhz or freq_ref,
+            h_tx_asl_m=h_tx_asl,
+            h_rx_asl_m=h_rx_asl,
+        )
+        return field_strength_from_erp_dbuvm(r.erp_max_kw or 1.0, pl_db), "P.526/Assis"
+    except SoftTimeLimitExceeded:
+        raise
+    except Exception:
+        if h_eff_intf is None:
+            h_eff_intf = effective_height(r.lat, r.lon, 0.0, hnmt_fallback=r.hnmt_m or 30.0)
+        tempo = time_percent if time_percent in (50, 10, 1) else 50
+        campo = tabela_campo(r.freq_mhz or freq_ref, tempo, path)(r.dist_km or 1.0, h_eff_intf)
+        return float(aplicar_erp(campo, r.erp_max_kw or 1.0)), "P.1546"  # curvas de 1 kW
+
+
+def _avaliar_interferencias_tv(
+    est: EstacaoTV,
+    path: str,
+    time_percent: float,
+    progresso: Progresso | None = None,
+    detalhes: list[dict] | None = None,
+) -> tuple[bool, list[str], bool]:
+    """
+    Interferência ponto-a-ponto (CI) contra estações TV em até 300 km; `detalhes` recebe um dict por interferente.
+    Com `progresso`, retoma do checkpoint de interferentes e pode levantar SimulacaoCancelada entre blocos.
+    """
     msgs: list[str] = []
     aprovado = True
+    detalhes = detalhes if detalhes is not None else []
     tec_des = "digital"
     nivel_alvo = _nivel_alvo_dbuv(est)
     try:
@@ -188,53 +230,112 @@ def _avaliar_interferencias_tv(est: EstacaoTV, path: str, time_percent: float) -
             """
         )
         rows = db.session.execute(sql, {"id": est.id, "wkt": base_wkt}).fetchall()
-        for r in rows:
+
+        inicio = 0
+        estado = progresso.retomar("interferentes") if progresso else None
+        if estado:
+            inicio, aprovado = estado["feitos"], estado["aprovado"]
+            msgs.extend(estado["msgs"])
+            detalhes.extend(estado["detalhes"])
+
+        for n, r in enumerate(rows, start=1):
+            if n <= inicio:
+                continue  # já avaliado antes da interrupção
             delta = (r.canal or 0) - (est.canal or 0)
             norma = _norma_tv(delta, tec_des, (r.tecnologia or "").lower())
-            if not norma:
-                continue
-            ci_req = norma.ci_requerida_db
-            try:
-                profile_d, profile_h = sample_profile(r.lat, r.lon, base_latlon.lat, base_latlon.lon, samples=96)
-                h_tx_asl = (profile_h[0] if profile_h else 0.0) + (r.hnmt_m or 30.0)
-                h_rx_asl = (profile_h[-1] if profile_h else 0.0) + 10.0
-                pl_db = path_loss_p526_db(
-                    profile_d,
-                    profile_h,
-                    freq_mhz=r.freq_mhz or est.freq_mhz or 600.0,
-                    h_tx_asl_m=h_tx_asl,
-                    h_rx_asl_m=h_rx_asl,
+            if norma:
+                ci_req = norma.ci_requerida_db
+                campo_intf, modelo = _campo_interferente_tv(
+                    r, base_latlon.lat, base_latlon.lon, est.freq_mhz or 600.0, time_percent, path
                 )
-                campo_intf = field_strength_from_erp_dbuvm(r.erp_max_kw or 1.0, pl_db)
-            except Exception:
-                h_eff_intf = effective_height(r.lat, r.lon, 0.0, hnmt_fallback=r.hnmt_m or 30.0)
-                campo_intf = field_strength_p1546(
-                    freq_mhz=r.freq_mhz or est.freq_mhz or 600.0,
-                    dist_km=r.dist_km or 1.0,
-                    h_eff_m=h_eff_intf,
-                    time_percent=time_percent if time_percent in (50, 10, 1) else 50,
-                    path=path,
+                limite = nivel_alvo - ci_req
+                detalhes.append(
+                    {
+                        "id": r.id,
+                        "dist_km": r.dist_km,
+                        "delta": delta,
+                        "ci_requerida_db": ci_req,
+                        "campo_dbuv_m": campo_intf,
+                        "margem_db": limite - campo_intf,
+                        "modelo": modelo,
+                    }
                 )
-            limite = nivel_alvo - ci_req
-            if campo_intf > limite:
-                aprovado = False
-                msgs.append(
-                    f"Interf TV: est.{r.id} Δcanal={delta} CI_req={ci_req} dB "
-                    f"campo_intf={campo_intf:.1f} dBµV/m > limite {limite:.1f} dBµV/m (dist {r.dist_km:.1f} km, P.526/Assis)."
+                if campo_intf > limite:
+                    aprovado = False
+                    msgs.append(
+                        f"Interf TV: est.{r.id} Δcanal={delta} CI_req={ci_req} dB "
+                        f"campo_intf={campo_intf:.1f} dBµV/m > limite {limite:.1f} dBµV/m (dist {r.dist_km:.1f} km, P.526/Assis)."
+                    )
+            if progresso:
+                progresso.interferentes(
+                    n, len(rows), {"feitos": n, "aprovado": aprovado, "msgs": msgs, "detalhes": detalhes}
                 )
         return aprovado, msgs, True
+    except (SoftTimeLimitExceeded, SimulacaoCancelada):
+        raise
     except Exception as exc:
         db.session.rollback()
         msgs.append(f"Interferência não avaliada (erro: {str(exc)[:180]})")
         return aprovado, msgs, False
 
 
+def _gerar_contorno_geom_tv(est: EstacaoTV, time_percent: float, path: str, progresso: Progresso | None = None):
+    """
+    Contorno protegido por radiais (10°). Retorna (geom SQL ou None, radiais) com listas por radial:
+    azimute, dist_km, h_eff_m, erp_kw, campo_dbuv_m.
+    Com `progresso`, retoma do checkpoint de radiais e pode levantar SimulacaoCancelada entre blocos.
+    """
+    angles = list(range(0, 360, 10))
+    radiais: dict[str, list[float]] = (progresso.retomar("radiais") if progresso else None) or {
+        k: [] for k in ("azimute", "dist_km", "h_eff_m", "erp_kw", "campo_dbuv_m")
+    }
+    params = parametros_estacao("tv", est)  # pré-calculados (estacoes_propagacao), se vigentes
+    erps = diagrama_estacao("tv", est).erp_kw(est.erp_max_kw, angles)  # todos os radiais de uma vez
+    pendentes = list(range(len(radiais["dist_km"]), len(angles)))  # retomada do checkpoint
+    for k in range(0, len(pendentes), RADIAIS_POR_BLOCO):
+        bloco = pendentes[k : k + RADIAIS_POR_BLOCO]
+        h_effs = np.array([params.h_eff(angles[i]) if params else _altura_efetiva(est, angles[i]) for i in bloco])
+        try:
+            dists, campos = _distancias_alvo_km(est, time_percent, path, h_effs, erps[bloco])
+        except SoftTimeLimitExceeded:
+            raise
+        except Exception:
+            dists, campos = np.full(len(bloco), 10.0), np.full(len(bloco), np.nan)
+        for n, i in enumerate(bloco):
+            radiais["azimute"].append(angles[i])
+            radiais["dist_km"].append(float(dists[n]))
+            radiais["h_eff_m"].append(float(h_effs[n]))
+            radiais["erp_kw"].append(float(erps[i]))
+            radiais["campo_dbuv_m"].append(float(campos[n]))
+        if progresso:
+            progresso.radiais(bloco[-1] + 1, len(angles), radiais)
+
+    latlon = db.session.execute(
+        sa.text("SELECT ST_Y(geom) AS lat, ST_X(geom) AS lon FROM estacoes_tv WHERE id=:id"),
+        {"id": est.id},
+    ).fetchone()
+    if not latlon:
+        return None, radiais
+    coords = []
+    for angle, dist_km in zip(angles, radiais["dist_km"]):
+        plat, plon = destination_point(latlon.lat, latlon.lon, angle, dist_km * 1000.0)
+        coords.append((plon, plat))
+    if coords:
+        coords.append(coords[0])
+    if len(coords) < 4:
+        return None, radiais
+    pts = ", ".join(f"{lon} {lat}" for lon, lat in coords)
+    return sa.func.ST_GeomFromText(f"POLYGON(({pts}))", 4674), radiais
+
+
 @shared_task(name="app.tasks.tv.contorno")
 def gerar_contorno_tv(sim_id: str, estacao_id: int, time_percent: float | None = None, path: str | None = None) -> dict:
     """Gera contorno protegido TV/RTV simplificado (polígono radial)."""
     sim = Simulacao.query.get(sim_id)
     if not sim:
         return {"status": "error", "detail": "simulação não encontrada"}
+    if sim.status == "cancelled":
+        return {"status": sim.status}
 
     est = EstacaoTV.query.get(estacao_id)
     if not est or not est.geom:
@@ -243,35 +344,35 @@ def gerar_contorno_tv(sim_id: str, estacao_id: int, time_percent: float | None =
         db.session.commit()
         return {"status": sim.status, "detail": sim.mensagem_status}
 
-    angles = list(range(0, 360, 10))
-    dists_km = []
-    for angle in angles:
-        try:
-            dists_km.append(_distancia_alvo_km(est, angle, time_percent or 50, path or "Land"))
-        except Exception:
-            dists_km.append(10.0)
+    progresso = Progresso(sim.id)
+    sim.status = "running"
+    db.session.commit()
 
-    latlon = db.session.execute(
-        sa.text("SELECT ST_Y(geom) AS lat, ST_X(geom) AS lon FROM estacoes_tv WHERE id=:id"),
-        {"id": est.id},
-    ).fetchone()
-    poly = None
-    if latlon:
-        coords = []
-        for angle, dist_km in zip(angles, dists_km):
-            plat, plon = destination_point(latlon.lat, latlon.lon, angle, dist_km * 1000.0)
-            coords.append((plon, plat))
-        if coords:
-            coords.append(coords[0])
-        if len(coords) >= 4:
-            pts = ", ".join(f"{lon} {lat}" for lon, lat in coords)
-            wkt = f"POLYGON(({pts}))"
-            poly = sa.func.ST_GeomFromText(wkt, 4674)
-
-    if not poly:
+    tp = time_percent or 50
+    ph = path or "Land"
+    try:
+        with progresso.etapa("contorno"):
+            poly, radiais = _gerar_contorno_geom_tv(est, tp, ph, progresso)
+    except SoftTimeLimitExceeded:
+        db.session.rollback()
+        sim.status = "failed"
+        sim.mensagem_status = "Tempo limite da tarefa excedido."
+        db.session.commit()
+        raise
+    except SimulacaoCancelada:
+        db.session.rollback()
+        sim.status = "cancelled"
+        sim.mensagem_status = "Cancelada pelo usuário."
+        db.session.commit()
+        progresso.limpar()
+        return {"status": sim.status}
+    dists_km = radiais["dist_km"]
+
+    if poly is None:
         sim.status = "failed"
         sim.mensagem_status = "Falha ao gerar contorno."
         db.session.commit()
+        progresso.limpar()
         return {"status": sim.status, "detail": sim.mensagem_status}
 
     contorno = ResultadoCobertura(
@@ -283,9 +384,27 @@ def gerar_contorno_tv(sim_id: str, estacao_id: int, time_percent: float | None =
     db.session.add(contorno)
     sim.status = "done"
     sim.mensagem_status = "Contorno TV gerado (radiais 5°, P.1546 simplificado)."
+    gravar_resultado_estacao(
+        sim.id,
+        {
+            "servico": "tv",
+            "estacao_id": est.id,
+            "time_percent": tp,
+            "path": ph,
+            "nivel_alvo_dbuv_m": contorno.nivel_campo_dbuv_m,
+            "tempos_s": progresso.tempos,
+        },
+        radiais,
+    )
     db.session.commit()
+    progresso.limpar()
 
-    return {"status": sim.status, "contorno_id": contorno.id, "dist_km_media": sum(dists_km) / len(dists_km)}
+    return {
+        "status": sim.status,
+        "contorno_id": contorno.id,
+        "dist_km_media": sum(dists_km) / len(dists_km),
+        "tempos_s": progresso.tempos,
+    }
 
 
 @shared_task(name="app.tasks.tv.viabilidade")
@@ -299,6 +418,8 @@ def avaliar_viabilidade_tv(sim_id: str, estacao_id: int, time_percent: float | N
     sim = Simulacao.query.get(sim_id)
     if not sim:
         return {"status": "error", "detail": "simulação não encontrada"}
+    if sim.status == "cancelled":
+        return {"status": sim.status}
 
     est = EstacaoTV.query.get(estacao_id)
     if not est or not est.geom:
@@ -310,46 +431,47 @@ def avaliar_viabilidade_tv(sim_id: str, estacao_id: int, time_percent: float | N
     tp = time_percent or 50
     ph = path or "Land"
 
+    progresso = Progresso(sim.id)
+    sim.status = "running"
+    db.session.commit()
+
     aprovado = True
     msgs: list[str] = []
 
-    ok_lim, msgs_lim = _avaliar_limites_classe(est)
-    aprovado = aprovado and ok_lim
-    msgs.extend(msgs_lim)
-
-    inter_ok, inter_msgs, ci_eval = _avaliar_interferencias_tv(est, ph, tp)
-    aprovado = aprovado and inter_ok
-    msgs.extend(inter_msgs)
-
-    angles = list(range(0, 360, 10))
-    dists_km = []
-    for angle in angles:
-        try:
-            dists_km.append(_distancia_alvo_km(est, angle, tp, ph))
-        except Exception:
-            dists_km.append(10.0)
-
-    latlon = db.session.execute(
-        sa.text("SELECT ST_Y(geom) AS lat, ST_X(geom) AS lon FROM estacoes_tv WHERE id=:id"),
-        {"id": est.id},
-    ).fetchone()
-    poly_geom = None
-    if latlon:
-        coords = []
-        for angle, dist_km in zip(angles, dists_km):
-            plat, plon = destination_point(latlon.lat, latlon.lon, angle, dist_km * 1000.0)
-            coords.append((plon, plat))
-        if coords:
-            coords.append(coords[0])
-        if len(coords) >= 4:
-            pts = ", ".join(f"{lon} {lat}" for lon, lat in coords)
-            wkt = f"POLYGON(({pts}))"
-            poly_geom = sa.func.ST_GeomFromText(wkt, 4674)
+    try:
+        with progresso.etapa("limites"):
+            ok_lim, msgs_lim = _avaliar_limites_classe(est)
+        aprovado = aprovado and ok_lim
+        msgs.extend(msgs_lim)
+
+        interferentes: list[dict] = []
+        with progresso.etapa("interferencia"):
+            inter_ok, inter_msgs, ci_eval = _avaliar_interferencias_tv(est, ph, tp, progresso, interferentes)
+        aprovado = aprovado and inter_ok
+        msgs.extend(inter_msgs)
+
+        with progresso.etapa("contorno"):
+            poly_geom, radiais = _gerar_contorno_geom_tv(est, tp, ph, progresso)
+    except SoftTimeLimitExceeded:
+        db.session.rollback()
+        sim.status = "failed"
+        sim.mensagem_status = "Tempo limite da tarefa excedido."
+        db.session.commit()
+        raise
+    except SimulacaoCancelada:
+        db.session.rollback()
+        sim.status = "cancelled"
+        sim.mensagem_status = "Cancelada pelo usuário."
+        db.session.commit()
+        progresso.limpar()
+        return {"status": sim.status}
+    dists_km = radiais["dist_km"]
 
     if poly_geom is None:
         sim.status = "failed"
         sim.mensagem_status = "Falha ao gerar contorno."
         db.session.commit()
+        progresso.limpar()
         return {"status": sim.status, "detail": sim.mensagem_status}
 
     contorno = ResultadoCobertura(
@@ -363,7 +485,24 @@ def avaliar_viabilidade_tv(sim_id: str, estacao_id: int, time_percent: float | N
     sim.status = "done"
     mensagem = ("Aprovado" if aprovado else "Reprovado") + (": " + "; ".join(msgs) if msgs else "")
     sim.mensagem_status = mensagem[:250]
+    gravar_resultado_estacao(
+        sim.id,
+        {
+            "servico": "tv",
+            "estacao_id": est.id,
+            "time_percent": tp,
+            "path": ph,
+            "nivel_alvo_dbuv_m": contorno.nivel_campo_dbuv_m,
+            "aprovado": aprovado,
+            "ci_avaliada": ci_eval,
+            "mensagens": msgs,
+            "tempos_s": progresso.tempos,
+        },
+        radiais,
+        interferentes if ci_eval else None,
+    )
     db.session.commit()
+    progresso.limpar()
 
     return {
         "status": sim.status,
@@ -372,4 +511,5 @@ def avaliar_viabilidade_tv(sim_id: str, estacao_id: int, time_percent: float | N
         "dist_km_media": sum(dists_km) / len(dists_km),
         "mensagens": msgs,
         "ci_avaliada": ci_eval,
+        "tempos_s": progresso.tempos,
     }
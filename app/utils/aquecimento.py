@@ -0,0 +1,119 @@
+"""
+Aquecimento (warm start) dos processos web e worker antes do fork.
+
+- `aquecer(app)` roda no processo pai (gunicorn com `preload_app`, ver gunicorn.conf.py; Celery em
+  `worker_init`, ver celery_worker.py) e deixa em memória, compartilhados copy-on-write com os
+  filhos: curvas P.1546 compiladas, snapshot das normas de proteção, tiles .hgt das regiões com mais
+  estações e a grade de população.
+- Cada etapa é independente: uma falha fica registrada no estado, sem impedir a subida.
+- No fim o pool do engine é descartado (conexões não atravessam o fork); nos filhos,
+  `reiniciar_conexoes` descarta o pool herdado sem fechar as conexões do pai.
+- `estado()` alimenta `GET /ready` (503 até o processo aquecer); com AQUECIMENTO_ARQUIVO_PRONTO,
+  o arquivo é criado ao final (healthcheck de container dos workers).
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+
+import sqlalchemy as sa
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+_estado: dict = {"pronto": False, "etapas": {}}
+_lock = threading.Lock()
+
+# tiles 1° x 1° com mais estações FM/TV (canto SW)
+SQL_TILES_QUENTES = sa.text(
+    """
+    SELECT floor(ST_Y(geom)) AS lat, floor(ST_X(geom)) AS lon, count(*) AS n
+    FROM (SELECT geom FROM estacoes_fm UNION ALL SELECT geom FROM estacoes_tv) e
+    WHERE geom IS NOT NULL
+    GROUP BY 1, 2
+    ORDER BY n DESC
+    LIMIT :limite
+    """
+)
+
+
+def _curvas(app) -> str:
+    from app.utils.propagacao.p1546_curves import _arrays, load_curves
+
+    datasets = load_curves()
+    for ds in datasets:
+        _arrays(ds)
+    return f"{len(datasets)} curvas"
+
+
+def _normas(app) -> str:
+    from app.utils.normas.registro import registro_normas
+
+    registro = registro_normas()
+    return f"{len(registro.fm_protecao)} FM, {len(registro.tv_protecao)} TV"
+
+
+def _terreno(app) -> str:
+    from app.utils.propagacao.terrain import _tiles, carregar_tiles
+
+    limite = min(app.config.get("AQUECIMENTO_TILES_MAX", 64), _tiles.max_itens)
+    rows = db.session.execute(SQL_TILES_QUENTES, {"limite": limite}).fetchall()
+    return f"{carregar_tiles((r.lat, r.lon) for r in rows)} tiles"
+
+
+def _populacao(app) -> str:
+    from app.utils.populacao import carregar_grade
+
+    grade = carregar_grade()
+    return "grade ausente" if grade is None else f"grade {grade[0].shape[0]}x{grade[0].shape[1]}"
+
+
+ETAPAS = {"curvas": _curvas, "normas": _normas, "terreno": _terreno, "populacao": _populacao}
+
+
+def estado() -> dict:
+    """Cópia do estado do aquecimento deste processo (pronto, etapas, segundos, pid)."""
+    with _lock:
+        return copy.deepcopy(_estado)
+
+
+def aquecer(app) -> dict:
+    """Executa as etapas (uma vez por processo) e marca o processo como pronto."""
+    with _lock:
+        if _estado["pronto"]:
+            return copy.deepcopy(_estado)
+        arquivo = app.config.get("AQUECIMENTO_ARQUIVO_PRONTO")
+        if arquivo and os.path.exists(arquivo):
+            os.remove(arquivo)  # sinal de uma subida anterior
+        t0 = time.perf_counter()
+        with app.app_context():
+            for nome, etapa in ETAPAS.items():
+                inicio = time.perf_counter()
+                try:
+                    detalhe, ok = etapa(app), True
+                except Exception as exc:
+                    db.session.rollback()
+                    detalhe, ok = f"erro: {str(exc)[:180]}", False
+                _estado["etapas"][nome] = {
+                    "ok": ok,
+                    "detalhe": detalhe,
+                    "segundos": round(time.perf_counter() - inicio, 3),
+                }
+            db.session.remove()
+            db.engine.dispose()
+        _estado.update(pronto=True, segundos=round(time.perf_counter() - t0, 3), pid=os.getpid())
+        if arquivo:
+            with open(arquivo, "w", encoding="utf-8") as fh:
+                json.dump(_estado, fh)
+        logger.info("Aquecimento concluído em %.1fs: %s", _estado["segundos"], _estado["etapas"])
+        return copy.deepcopy(_estado)
+
+
+def reiniciar_conexoes(app) -> None:
+    """No processo filho, logo após o fork: descarta o pool herdado sem fechar as conexões do pai."""
+    with app.app_context():
+        db.engine.dispose(close=False)
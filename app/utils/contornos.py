@@ -0,0 +1,103 @@
+"""
+GeoJSON de contornos (`resultados_cobertura`) simplificado e quantizado no PostGIS.
+
+- `tolerance` (graus) ou `zoom` (tolerância de ~1 pixel de tile 256 px naquele zoom) aplicados com
+  ST_SimplifyPreserveTopology; `precision` = casas decimais de ST_AsGeoJSON (quantização).
+- Contornos são imutáveis depois de gravados: a resposta gzip de cada (contorno, tolerância,
+  precisão) fica num LRU em processo e sai com ETag/Cache-Control imutável.
+- Contornos de uma simulação só são cacheados quando a simulação está em status final.
+"""
+
+import json
+import math
+from typing import Optional
+
+import sqlalchemy as sa
+
+from app import db
+from app.utils.http import comprimir
+from app.utils.lru import LRU
+
+PRECISAO_PADRAO = 6  # ~0,1 m
+TOLERANCIA_MAX = 0.1  # graus
+
+_cache = LRU()
+
+
+def parametros_simplificacao(args) -> tuple[float, int]:
+    """
+    (tolerância em graus, casas decimais) a partir de `tolerance`/`zoom`/`precision`.
+    Sem parâmetros: geometria original com PRECISAO_PADRAO casas. Levanta ValueError.
+    """
+    tolerancia = 0.0
+    precisao = PRECISAO_PADRAO
+    if args.get("zoom") not in (None, ""):
+        zoom = int(args["zoom"])
+        if not 0 <= zoom <= 22:
+            raise ValueError("zoom fora de 0..22")
+        grau_por_pixel = 360.0 / (256 * 2**zoom)
+        tolerancia = grau_por_pixel
+        # uma casa além do tamanho do pixel
+        precisao = min(PRECISAO_PADRAO, max(1, math.ceil(-math.log10(grau_por_pixel)) + 1))
+    if args.get("tolerance") not in (None, ""):
+        tolerancia = float(args["tolerance"])
+        if not 0 <= tolerancia <= TOLERANCIA_MAX:
+            raise ValueError(f"tolerance deve estar entre 0 e {TOLERANCIA_MAX} graus")
+    if args.get("precision") not in (None, ""):
+        precisao = int(args["precision"])
+        if not 0 <= precisao <= 15:
+            raise ValueError("precision fora de 0..15")
+    return float(f"{tolerancia:.8g}"), precisao
+
+
+def _features(filtro: str, valor, tolerancia: float, precisao: int) -> list[str]:
+    geom = "ST_SimplifyPreserveTopology(geom, :tol)" if tolerancia > 0 else "geom"
+    sql = sa.text(
+        f"""
+        SELECT id, simulacao_id, tipo_contorno, nivel_campo_dbuv_m, ST_AsGeoJSON({geom}, :prec) AS gj
+        FROM resultados_cobertura
+        WHERE {filtro} = :valor
+        ORDER BY id
+        """
+    )
+    features = []
+    for row in db.session.execute(sql, {"valor": valor, "tol": tolerancia, "prec": precisao}):
+        if not row.gj:
+            continue
+        props = json.dumps(
+            {
+                "id": row.id,
+                "simulacao_id": row.simulacao_id,
+                "tipo_contorno": row.tipo_contorno,
+                "nivel_campo_dbuv_m": row.nivel_campo_dbuv_m,
+            },
+            ensure_ascii=False,
+        )
+        # geometria já serializada pelo PostGIS
+        features.append(f'{{"type":"Feature","geometry":{row.gj},"properties":{props}}}')
+    return features
+
+
+def contorno_gzip(contorno_id: int, tolerancia: float, precisao: int) -> Optional[bytes]:
+    """Feature GeoJSON do contorno, em gzip (None se não existir)."""
+    chave = ("contorno", contorno_id, tolerancia, precisao)
+    corpo = _cache.get(chave)
+    if corpo is None:
+        features = _features("id", contorno_id, tolerancia, precisao)
+        if not features:
+            return None
+        corpo = comprimir(features[0].encode())
+        _cache.set(chave, corpo)
+    return corpo
+
+
+def contornos_simulacao_gzip(sim_id: str, tolerancia: float, precisao: int, final: bool) -> bytes:
+    """FeatureCollection dos contornos da simulação, em gzip; cacheada só se `final`."""
+    chave = ("simulacao", sim_id, tolerancia, precisao)
+    corpo = _cache.get(chave) if final else None
+    if corpo is None:
+        features = _features("simulacao_id", sim_id, tolerancia, precisao)
+        corpo = comprimir(('{"type":"FeatureCollection","features":[' + ",".join(features) + "]}").encode())
+        if final:
+            _cache.set(chave, corpo)
+    return corpo
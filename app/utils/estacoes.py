@@ -0,0 +1,45 @@
+"""
+Versão técnica das estações FM/TV: hash dos campos que afetam cálculos de propagação/interferência.
+
+Usado para identificar submissões equivalentes (mesma estação, mesmos parâmetros técnicos) e,
+por extensão, qualquer cache ou resultado derivado de uma estação. Também gravado em
+`estacoes_*.hash_tecnico` pela carga dos planos, que compara hashes para recarregar só o que mudou.
+"""
+
+import hashlib
+import json
+from typing import Any, Optional
+
+from geoalchemy2.shape import to_shape
+
+CAMPOS_TECNICOS = {
+    "fm": ("servico", "canal", "classe", "freq_mhz", "erp_max_kw", "hnmt_m", "erp_por_radial", "antena_id"),
+    "tv": ("servico", "tecnologia", "canal", "classe", "freq_mhz", "erp_max_kw", "hnmt_m", "erp_por_radial"),
+}
+
+
+def canonico(valor: Any) -> str:
+    """JSON canônico (chaves ordenadas, sem espaços) para hashing estável."""
+    return json.dumps(valor, sort_keys=True, separators=(",", ":"), default=str, ensure_ascii=False)
+
+
+def hash_tecnico(valores: dict) -> str:
+    return hashlib.sha1(canonico(valores).encode()).hexdigest()
+
+
+def hash_valores(servico: str, valores: dict, lon: Optional[float], lat: Optional[float]) -> str:
+    """Hash técnico a partir dos valores das colunas (ex.: linha de carga) e das coordenadas."""
+    tecnicos = {campo: valores.get(campo) for campo in CAMPOS_TECNICOS[servico]}
+    tecnicos["geom"] = None if lon is None or lat is None else [round(lon, 7), round(lat, 7)]
+    return hash_tecnico(tecnicos)
+
+
+def hash_estacao(servico: str, est: Any) -> Optional[str]:
+    """Hash técnico de uma estação (None se a estação não existir); usa o gravado na carga, se houver."""
+    if est is None:
+        return None
+    if getattr(est, "hash_tecnico", None):
+        return est.hash_tecnico
+    valores = {campo: getattr(est, campo, None) for campo in CAMPOS_TECNICOS[servico]}
+    ponto = to_shape(est.geom) if est.geom is not None else None
+    return hash_valores(servico, valores, ponto.x if ponto else None, ponto.y if ponto else None)
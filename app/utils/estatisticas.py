@@ -0,0 +1,151 @@
+"""
+Estatísticas de contornos persistidas (`estatisticas_contorno`).
+
+- Cálculo exato no PostGIS sobre `setores_subdivididos` (pedaços inteiramente dentro do contorno
+  entram com a área pré-calculada), com quebra por município (`setores_censitarios.cod_municipio`).
+- Agendado em background (tarefa `app.tasks.estatisticas.contorno`) logo após o commit de cada
+  `ResultadoCobertura`, via listener de sessão — vale para todos os tasks que gravam contornos.
+- Válidas enquanto a versão do censo (`versoes_dados.censo`) não mudar; leitura de estatística
+  desatualizada reagenda o cálculo.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+import sqlalchemy as sa
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import EstatisticaContorno, ResultadoCobertura
+from app.utils.kvstore import get_store
+from app.utils.versoes import versao
+
+AGENDAMENTO_TTL_S = 600
+
+SQL_POR_MUNICIPIO = sa.text(
+    """
+    WITH poly AS (SELECT geom AS g FROM resultados_cobertura WHERE id = :contorno_id),
+    pecas AS (
+      SELECT
+        p.setor_id,
+        p.area_km2,
+        p.fracao_setor,
+        CASE WHEN ST_Within(p.geom, poly.g) THEN p.area_km2
+             ELSE ST_Area(ST_Intersection(p.geom, poly.g)::geography)/1e6 END AS area_int_km2
+      FROM setores_subdivididos p
+      CROSS JOIN poly
+      WHERE ST_Intersects(p.geom, poly.g)
+    )
+    SELECT
+      s.cod_municipio,
+      min(s.municipio) AS municipio,
+      COALESCE(SUM(pc.area_int_km2),0) AS area_km2,
+      SUM(CASE WHEN s.pop_total IS NULL THEN NULL
+               WHEN pc.area_km2 > 0 THEN s.pop_total * pc.fracao_setor * (pc.area_int_km2 / pc.area_km2)
+               ELSE NULL END) AS pop_estimada,
+      COUNT(DISTINCT pc.setor_id) AS setores
+    FROM pecas pc
+    JOIN setores_censitarios s ON s.id = pc.setor_id
+    WHERE pc.area_int_km2 > 0
+    GROUP BY 1
+    ORDER BY 4 DESC NULLS LAST
+    """
+)
+
+
+def calcular(contorno_id: int) -> EstatisticaContorno:
+    """Calcula (exato) e grava na sessão atual; o commit fica com o chamador."""
+    versao_censo = versao("censo")
+    municipios = []
+    for row in db.session.execute(SQL_POR_MUNICIPIO, {"contorno_id": contorno_id}):
+        municipios.append(
+            {
+                "cod_municipio": row.cod_municipio,
+                "municipio": row.municipio,
+                "area_km2": float(row.area_km2 or 0.0),
+                "pop_estimada": float(row.pop_estimada) if row.pop_estimada is not None else None,
+                "setores": int(row.setores or 0),
+            }
+        )
+    pops = [m["pop_estimada"] for m in municipios if m["pop_estimada"] is not None]
+    est = EstatisticaContorno.query.get(contorno_id)
+    if est is None:
+        est = EstatisticaContorno(contorno_id=contorno_id)
+        db.session.add(est)
+    est.versao_censo = versao_censo
+    est.area_km2 = sum(m["area_km2"] for m in municipios)
+    est.pop_estimada = sum(pops) if pops else None
+    est.setores_intersect = sum(m["setores"] for m in municipios)
+    est.por_municipio = municipios
+    est.calculado_em = datetime.utcnow()
+    return est
+
+
+def vigente(contorno_id: int) -> Optional[EstatisticaContorno]:
+    """Estatística gravada, se calculada com a versão atual do censo."""
+    est = EstatisticaContorno.query.get(contorno_id)
+    if est is None or est.versao_censo != versao("censo"):
+        return None
+    return est
+
+
+def para_dict(est: EstatisticaContorno) -> dict:
+    return {
+        "contorno_id": est.contorno_id,
+        "area_km2": est.area_km2,
+        "pop_estimada": est.pop_estimada,
+        "setores_intersect": est.setores_intersect,
+        "por_municipio": est.por_municipio or [],
+        "versao_censo": est.versao_censo,
+        "calculado_em": est.calculado_em.isoformat() if est.calculado_em else None,
+    }
+
+
+def agendar(contorno_id: int) -> bool:
+    """Enfileira o cálculo em background (no máximo um agendamento por contorno a cada AGENDAMENTO_TTL_S)."""
+    from app.tasks.submissao import enfileirar  # late import (tasks importam utils)
+
+    chave = f"estatisticas:{contorno_id}:agendado"
+    try:
+        if not get_store().set(chave, "1", ex=AGENDAMENTO_TTL_S, nx=True):
+            return False
+    except Exception:
+        current_app.logger.warning("kvstore indisponível ao agendar estatísticas", exc_info=True)
+    try:
+        # itens=None: fila de lote, prioridade mais baixa (não disputa com simulações)
+        enfileirar("app.tasks.estatisticas.contorno", (contorno_id,), itens=None)
+        return True
+    except Exception:
+        current_app.logger.warning("Falha ao agendar estatísticas do contorno %s", contorno_id, exc_info=True)
+        try:
+            get_store().delete(chave)
+        except Exception:
+            pass
+        return False
+
+
+def _coletar_contornos(session: Session, flush_context) -> None:
+    # em after_flush, session.new ainda lista os inseridos e os ids já foram atribuídos
+    novos = [obj.id for obj in session.new if isinstance(obj, ResultadoCobertura) and obj.id is not None]
+    if novos:
+        session.info.setdefault("_contornos_novos", []).extend(novos)
+
+
+def _agendar_contornos(session: Session) -> None:
+    for contorno_id in session.info.pop("_contornos_novos", []):
+        agendar(contorno_id)
+
+
+def _descartar_contornos(session: Session) -> None:
+    session.info.pop("_contornos_novos", None)
+
+
+def registrar_agendamento() -> None:
+    """Agenda as estatísticas de cada contorno novo após o commit (todas as tasks, sem chamadas explícitas)."""
+    if event.contains(Session, "after_flush", _coletar_contornos):
+        return
+    event.listen(Session, "after_flush", _coletar_contornos)
+    event.listen(Session, "after_commit", _agendar_contornos)
+    event.listen(Session, "after_rollback", _descartar_contornos)
@@ -0,0 +1,137 @@
+"""
+Pré-calcula `estacoes_propagacao` (altitude, altura efetiva por radial, diagrama e ERP por grau)
+para as estações FM/TV cujo hash técnico ou versão do terreno mudou desde o último cálculo.
+
+O trabalho é dividido em blocos de estações calculados em paralelo (processos, cada um com seu
+app/conexão); o processo principal grava cada bloco por COPY e faz commit por bloco, então uma
+execução interrompida continua de onde parou. `load_tvfm_xml` chama ao final de cada carga.
+
+Uso:
+  docker-compose exec web python -m app.utils.etl.build_estacoes_propagacao [--workers N] [--todas]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional
+
+import sqlalchemy as sa
+
+from app import create_app, db
+from app.utils.estacoes import CAMPOS_TECNICOS, hash_valores
+from app.utils.etl.bulk import copy_linhas
+from app.utils.propagacao.parametros import calcular, empacotar_parametros
+from app.utils.versoes import versao
+
+COLUNAS = (
+    "servico", "estacao_id", "hash_tecnico", "versao_terreno", "altitude_m", "layout", "dados", "calculado_em",
+)
+TAMANHO_BLOCO = 200
+
+_app = None
+
+
+def _iniciar_worker() -> None:
+    """Cada processo cria o próprio app (engine/conexões próprias) para amostrar o terreno."""
+    global _app
+    _app = create_app()
+    _app.app_context().push()
+
+
+def _calcular_bloco(servico: str, versao_terreno: int, estacoes: List[dict]) -> List[tuple]:
+    linhas = []
+    for e in estacoes:
+        p = calcular(e["lat"], e["lon"], e["hnmt_m"], e["erp_max_kw"], e["erp_por_radial"])
+        row = empacotar_parametros(servico, e["id"], e["hash_tecnico"], versao_terreno, p)
+        linhas.append(tuple(row[c] for c in COLUNAS))
+    db.session.remove()
+    return linhas
+
+
+def _pendentes(servico: str, versao_terreno: int, todas: bool) -> List[dict]:
+    tabela = f"estacoes_{servico}"
+    tecnicos = ", ".join(f"e.{c}" for c in CAMPOS_TECNICOS[servico])
+    filtro = "" if todas else (
+        "AND (p.estacao_id IS NULL OR p.versao_terreno <> :terreno OR p.hash_tecnico IS DISTINCT FROM e.hash_tecnico)"
+    )
+    rows = db.session.execute(
+        sa.text(
+            f"""
+            SELECT e.id, ST_Y(e.geom) AS lat, ST_X(e.geom) AS lon, e.hash_tecnico, {tecnicos}
+            FROM {tabela} e
+            LEFT JOIN estacoes_propagacao p ON p.servico = :servico AND p.estacao_id = e.id
+            WHERE e.geom IS NOT NULL {filtro}
+            ORDER BY e.id
+            """
+        ),
+        {"servico": servico, "terreno": versao_terreno},
+    ).mappings()
+    pendentes = []
+    for r in rows:
+        e = dict(r)
+        e["hash_tecnico"] = e["hash_tecnico"] or hash_valores(servico, e, e["lon"], e["lat"])
+        pendentes.append(e)
+    return pendentes
+
+
+def build(workers: Optional[int] = None, todas: bool = False, tamanho_bloco: int = TAMANHO_BLOCO) -> dict:
+    versao_terreno = versao("terreno")
+    conn = db.session.connection()
+    # estações removidas (IDs nunca são reutilizados, mas as linhas ficariam órfãs)
+    for servico in ("fm", "tv"):
+        conn.execute(
+            sa.text(
+                f"""
+                DELETE FROM estacoes_propagacao p
+                WHERE p.servico = :servico
+                  AND NOT EXISTS (SELECT 1 FROM estacoes_{servico} e WHERE e.id = p.estacao_id)
+                """
+            ),
+            {"servico": servico},
+        )
+    blocos = []
+    for servico in ("fm", "tv"):
+        pendentes = _pendentes(servico, versao_terreno, todas)
+        blocos += [(servico, pendentes[i : i + tamanho_bloco]) for i in range(0, len(pendentes), tamanho_bloco)]
+    db.session.commit()
+    total = sum(len(b) for _, b in blocos)
+    resumo = {"fm": 0, "tv": 0}
+    if not total:
+        print("estacoes_propagacao: nada a recalcular.")
+        return resumo
+
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    print(f"Calculando parâmetros de {total} estações ({len(blocos)} blocos, {workers} processos) ...")
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker) as pool:
+        futuros = {pool.submit(_calcular_bloco, servico, versao_terreno, bloco): servico for servico, bloco in blocos}
+        for futuro in as_completed(futuros):
+            servico = futuros[futuro]
+            linhas = futuro.result()
+            conn = db.session.connection()
+            conn.execute(
+                sa.text("DELETE FROM estacoes_propagacao WHERE servico = :servico AND estacao_id = ANY(:ids)"),
+                {"servico": servico, "ids": [linha[1] for linha in linhas]},
+            )
+            copy_linhas(conn, "estacoes_propagacao", COLUNAS, linhas)
+            db.session.commit()
+            resumo[servico] += len(linhas)
+            feitos = resumo["fm"] + resumo["tv"]
+            print(f"{feitos}/{total} estações ({feitos / max(time.perf_counter() - t0, 1e-6):.1f}/s)")
+    return resumo
+
+
+def run(workers: Optional[int] = None, todas: bool = False) -> None:
+    resumo = build(workers=workers, todas=todas)
+    print(f"estacoes_propagacao: {resumo['fm']} FM, {resumo['tv']} TV recalculadas.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pré-cálculo dos parâmetros de propagação por estação")
+    parser.add_argument("--workers", type=int, default=None, help="processos de cálculo (default: CPUs - 1)")
+    parser.add_argument("--todas", action="store_true", help="recalcula todas as estações")
+    args = parser.parse_args()
+    app = create_app()
+    with app.app_context():
+        run(args.workers, args.todas)
@@ -0,0 +1,111 @@
+"""
+Rasteriza a população dos setores censitários numa grade nacional (float32, habitantes por célula).
+
+Rodar depois de `distribute_pop_municipal` (usa setores_censitarios.pop_total):
+  docker-compose exec web python -m app.utils.etl.build_pop_grid
+
+Algoritmo (no PostGIS, uma passada sobre `setores_subdivididos`):
+  - ST_SquareGrid(res, pedaço) gera as células que tocam cada pedaço de setor; índices (i, j) são
+    globais (célula i cobre [i*res, (i+1)*res)), então não há reprojeção nem alinhamento a fazer.
+  - A população do pedaço (pop_total do setor × fracao_setor) é dividida igualmente entre as
+    células cujo centro cai no pedaço; pedaços menores que uma célula vão inteiros para a célula
+    do seu ST_PointOnSurface.
+Saída: POP_GRADE_DIR/pop_grid.npy (linha = latitude a partir de ymin) + pop_grid.json (origem,
+resolução, versão do censo). Arquivos gravados em temporários e trocados atomicamente.
+"""
+
+import json
+import math
+import os
+from datetime import datetime
+
+import numpy as np
+import sqlalchemy as sa
+from flask import current_app
+
+from app import create_app, db
+from app.utils.populacao import ARQUIVO_GRADE, ARQUIVO_META, diretorio_grade
+from app.utils.versoes import versao
+
+# Extensão do Brasil (SIRGAS 2000), com folga.
+BBOX_BRASIL = (-74.0, -34.0, -28.5, 5.5)
+
+SQL_CELULAS = sa.text(
+    """
+    WITH p AS (
+      SELECT sd.id, s.pop_total * sd.fracao_setor AS pop, sd.geom
+      FROM setores_subdivididos sd
+      JOIN setores_censitarios s ON s.id = sd.setor_id
+      WHERE s.pop_total > 0 AND sd.fracao_setor > 0
+    ),
+    c AS (
+      SELECT p.id, g.i, g.j
+      FROM p
+      CROSS JOIN LATERAL ST_SquareGrid(:res, p.geom) AS g
+      WHERE ST_Intersects(p.geom, ST_Centroid(g.geom))
+    ),
+    n AS (SELECT id, count(*) AS n FROM c GROUP BY id)
+    SELECT c.i, c.j, SUM(p.pop / n.n) AS pop
+    FROM c JOIN n USING (id) JOIN p USING (id)
+    GROUP BY c.i, c.j
+    UNION ALL
+    SELECT floor(ST_X(q.g) / :res)::int, floor(ST_Y(q.g) / :res)::int, p.pop
+    FROM p CROSS JOIN LATERAL (SELECT ST_PointOnSurface(p.geom) AS g) AS q
+    WHERE NOT EXISTS (SELECT 1 FROM n WHERE n.id = p.id)
+    """
+)
+
+
+def build(diretorio: str, res: float) -> dict:
+    xmin, ymin, xmax, ymax = BBOX_BRASIL
+    i0, j0 = int(math.floor(xmin / res)), int(math.floor(ymin / res))
+    ncol = int(math.ceil(xmax / res)) - i0
+    nlin = int(math.ceil(ymax / res)) - j0
+    os.makedirs(diretorio, exist_ok=True)
+    tmp_npy = os.path.join(diretorio, f".{ARQUIVO_GRADE}.tmp")
+    grade = np.lib.format.open_memmap(tmp_npy, mode="w+", dtype=np.float32, shape=(nlin, ncol))
+    grade[:] = 0.0
+    print(f"Grade {nlin}x{ncol} células de {res:.6f}° ...")
+
+    fora = 0
+    with db.engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(SQL_CELULAS, {"res": res})
+        for parte in result.partitions(200_000):
+            arr = np.asarray(parte, dtype=np.float64)
+            cols = arr[:, 0].astype(np.int64) - i0
+            lins = arr[:, 1].astype(np.int64) - j0
+            dentro = (cols >= 0) & (cols < ncol) & (lins >= 0) & (lins < nlin)
+            fora += int((~dentro).sum())
+            np.add.at(grade, (lins[dentro], cols[dentro]), arr[dentro, 2].astype(np.float32))
+    grade.flush()
+    pop_total = float(grade.sum(dtype=np.float64))
+    del grade
+
+    meta = {
+        "xmin": i0 * res,
+        "ymin": j0 * res,
+        "res": res,
+        "linhas": nlin,
+        "colunas": ncol,
+        "pop_total": round(pop_total),
+        "versao_censo": versao("censo"),
+        "gerado_em": datetime.utcnow().isoformat(),
+    }
+    tmp_meta = os.path.join(diretorio, f".{ARQUIVO_META}.tmp")
+    with open(tmp_meta, "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    # a grade em uso é recarregada quando o .npy muda: troca os metadados antes
+    os.replace(tmp_meta, os.path.join(diretorio, ARQUIVO_META))
+    os.replace(tmp_npy, os.path.join(diretorio, ARQUIVO_GRADE))
+    print(f"Grade gravada: {round(pop_total)} habitantes; {fora} células fora do bbox ignoradas.")
+    return meta
+
+
+def run() -> None:
+    build(diretorio_grade(), current_app.config.get("POP_GRADE_RES_GRAUS", 1 / 120))
+
+
+if __name__ == "__main__":
+    app = create_app()
+    with app.app_context():
+        run()
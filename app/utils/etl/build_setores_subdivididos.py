@@ -0,0 +1,63 @@
+"""
+Gera `setores_subdivididos`: setores censitários quebrados com ST_Subdivide (no máximo
+SUBDIVIDE_MAX_VERTICES vértices por pedaço), com área geodésica e fração da área do setor
+pré-calculadas. A área total de cada setor (soma dos pedaços) é gravada em
+`setores_censitarios.area_km2`.
+
+Setores rurais enormes viram pedaços pequenos e compactos: o índice GiST filtra melhor e
+ST_Intersection/ST_Area trabalham sobre poucos vértices (pedaços inteiramente dentro do contorno
+nem precisam de interseção). Regerar após recarregar os setores (load_setores_ibge já chama):
+  docker-compose exec web python -m app.utils.etl.build_setores_subdivididos
+"""
+
+import sqlalchemy as sa
+
+from app import create_app, db
+
+SUBDIVIDE_MAX_VERTICES = 256
+
+SQL_SUBDIVIDIR = sa.text(
+    """
+    INSERT INTO setores_subdivididos (setor_id, area_km2, fracao_setor, geom)
+    SELECT setor_id,
+           area_km2,
+           CASE WHEN SUM(area_km2) OVER w > 0 THEN area_km2 / SUM(area_km2) OVER w ELSE 0 END,
+           geom
+    FROM (
+      SELECT s.id AS setor_id, d.geom, ST_Area(d.geom::geography) / 1e6 AS area_km2
+      FROM setores_censitarios s
+      CROSS JOIN LATERAL ST_Subdivide(s.geom, :max_vertices) AS d(geom)
+    ) pecas
+    WINDOW w AS (PARTITION BY setor_id)
+    """
+)
+
+SQL_AREA_SETORES = sa.text(
+    """
+    UPDATE setores_censitarios s
+    SET area_km2 = a.area_km2
+    FROM (SELECT setor_id, SUM(area_km2) AS area_km2 FROM setores_subdivididos GROUP BY setor_id) a
+    WHERE s.id = a.setor_id
+    """
+)
+
+
+def build(conn) -> int:
+    """Recria a tabela derivada na conexão/transação dada; retorna o número de pedaços."""
+    conn.execute(sa.text("TRUNCATE TABLE setores_subdivididos RESTART IDENTITY"))
+    conn.execute(SQL_SUBDIVIDIR, {"max_vertices": SUBDIVIDE_MAX_VERTICES})
+    conn.execute(sa.text("ANALYZE setores_subdivididos"))
+    conn.execute(SQL_AREA_SETORES)
+    return int(conn.execute(sa.text("SELECT count(*) FROM setores_subdivididos")).scalar() or 0)
+
+
+def run() -> None:
+    with db.engine.begin() as conn:
+        pecas = build(conn)
+    print(f"setores_subdivididos: {pecas} pedaços.")
+
+
+if __name__ == "__main__":
+    app = create_app()
+    with app.app_context():
+        run()
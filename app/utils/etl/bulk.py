@@ -0,0 +1,104 @@
+"""
+Carga em massa via `COPY ... FROM STDIN` (formato texto do PostgreSQL), sem objetos ORM.
+
+- `ewkb_ponto`: geometria já em EWKB hexadecimal (entrada nativa do tipo geometry no COPY).
+- `linha_copy`: tupla Python -> linha do formato texto (escapes, NULL = \\N, JSON serializado).
+- `copy_linhas`/`copy_texto`: envia tuplas (ou linhas já formatadas) por COPY em streaming
+  (memória constante), usando a conexão/transação corrente da sessão.
+"""
+
+import io
+import json
+import struct
+from typing import Iterable, Iterator, Optional, Sequence
+
+_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+_WKB_PONTO_SRID = 0x20000001  # Point com flag de SRID (EWKB)
+
+
+def ewkb_ponto(lon: Optional[float], lat: Optional[float], srid: int = 4674) -> Optional[str]:
+    """EWKB (little-endian, hex) de um ponto; None se faltar coordenada."""
+    if lon is None or lat is None:
+        return None
+    return struct.pack("<BIIdd", 1, _WKB_PONTO_SRID, srid, lon, lat).hex()
+
+
+def _campo(valor) -> str:
+    if valor is None:
+        return "\\N"
+    if isinstance(valor, (dict, list)):
+        valor = json.dumps(valor)
+    elif isinstance(valor, bool):
+        valor = "t" if valor else "f"
+    elif isinstance(valor, (bytes, bytearray, memoryview)):
+        return "\\\\x" + bytes(valor).hex()
+    return str(valor).translate(_ESCAPES)
+
+
+def linha_copy(valores: Sequence) -> str:
+    return "\t".join(_campo(v) for v in valores) + "\n"
+
+
+class _Stream(io.RawIOBase):
+    """Arquivo somente leitura sobre um gerador de linhas (para copy_expert)."""
+
+    def __init__(self, linhas: Iterator[str]):
+        self._linhas = linhas
+        self._resto = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        tamanho = len(buffer)
+        partes = [self._resto]
+        total = len(self._resto)
+        while total < tamanho:
+            linha = next(self._linhas, None)
+            if linha is None:
+                break
+            dados = linha.encode()
+            partes.append(dados)
+            total += len(dados)
+        dados = b"".join(partes)
+        n = min(tamanho, len(dados))
+        buffer[:n] = dados[:n]
+        self._resto = dados[n:]
+        return n
+
+
+def copy_texto(conn, tabela: str, colunas: Sequence[str], linhas: Iterable[str]) -> None:
+    """COPY de linhas já no formato texto (`linha_copy`), em streaming, na conexão SQLAlchemy `conn`."""
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {tabela} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT text)",
+            io.BufferedReader(_Stream(iter(linhas)), buffer_size=1 << 16),
+        )
+    finally:
+        cursor.close()
+
+
+def copy_linhas(conn, tabela: str, colunas: Sequence[str], linhas: Iterable[Sequence]) -> int:
+    """
+    COPY das tuplas para `tabela(colunas)` na conexão SQLAlchemy `conn` (mesma transação).
+    Retorna o número de linhas enviadas.
+    """
+    contador = [0]
+
+    def gerar() -> Iterator[str]:
+        for valores in linhas:
+            contador[0] += 1
+            yield linha_copy(valores)
+
+    copy_texto(conn, tabela, colunas, gerar())
+    return contador[0]
+
+
+def copy_arquivo(conn, tabela: str, colunas: Sequence[str], arquivo) -> None:
+    """COPY de um arquivo já no formato texto (ex.: temporário gerado por `linha_copy`)."""
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {tabela} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT text)", arquivo)
+    finally:
+        cursor.close()
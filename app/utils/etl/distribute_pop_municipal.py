@@ -5,8 +5,10 @@ Entrada: arquivo Excel com população total por município (sheet 'Municípios'
          data/CD2022_Populacao_Coletada_Imputada_e_Total_Municipio_e_UF_20231222.xlsx
 Algoritmo:
   - Lê população total por município (UF + código do município) => pop_total_mun.
-  - Calcula área de cada setor (geografia) e soma por município.
-  - Define pop_total do setor = pop_total_mun * (area_setor / area_mun).
+  - Área de cada setor = `setores_censitarios.area_km2` (soma dos pedaços de `setores_subdivididos`,
+    gravada na carga), somada por município (`cod_municipio`, indexado).
+  - Define pop_total do setor = pop_total_mun * (area_setor / area_mun), num único UPDATE com join
+    por código de município; a população municipal chega ao banco por COPY.
 
 Uso:
   docker-compose exec web python -m app.utils.etl.distribute_pop_municipal
@@ -17,6 +19,9 @@ import sqlalchemy as sa
 from flask import current_app
 
 from app import create_app, db
+from app.utils.etl.build_setores_subdivididos import build as build_setores_subdivididos
+from app.utils.etl.bulk import copy_linhas
+from app.utils.versoes import incrementar
 
 
 def load_pop_municipal(xlsx_path: str):
@@ -27,39 +32,42 @@ def load_pop_municipal(xlsx_path: str):
     df["cod_uf_num"] = pd.to_numeric(df["cod_uf"], errors="coerce")
     df["cod_mun5_num"] = pd.to_numeric(df["cod_mun5"], errors="coerce")
     df = df[df["cod_uf_num"].notna() & df["cod_mun5_num"].notna()]
-    df["cod_mun"] = df.apply(
-        lambda r: str(int(r["cod_uf_num"])).zfill(2) + str(int(r["cod_mun5_num"])).zfill(5), axis=1
+    df["cod_mun"] = (
+        df["cod_uf_num"].astype("int64").astype(str).str.zfill(2)
+        + df["cod_mun5_num"].astype("int64").astype(str).str.zfill(5)
     )
     return df[["cod_mun", "pop_total"]]
 
 
 def distribute(xlsx_path: str):
     df = load_pop_municipal(xlsx_path)
-    # Tabela temporária com população municipal
     with db.engine.begin() as conn:
         conn.execute(sa.text("DROP TABLE IF EXISTS tmp_pop_mun"))
         conn.execute(sa.text("CREATE TEMP TABLE tmp_pop_mun(cod_mun text primary key, pop_total numeric)"))
-        conn.execute(sa.text("INSERT INTO tmp_pop_mun(cod_mun, pop_total) VALUES (:cod_mun, :pop_total)"), df.to_dict(orient="records"))
+        copy_linhas(conn, "tmp_pop_mun", ("cod_mun", "pop_total"), df.itertuples(index=False, name=None))
+        conn.execute(sa.text("ANALYZE tmp_pop_mun"))
 
-        # Atualiza pop_total dos setores proporcional à área
+        # Áreas dos setores são gravadas junto com setores_subdivididos; gera se ainda faltarem.
+        if conn.execute(sa.text("SELECT EXISTS (SELECT 1 FROM setores_censitarios WHERE area_km2 IS NULL)")).scalar():
+            build_setores_subdivididos(conn)
         sql = sa.text(
             """
             WITH area_mun AS (
-              SELECT substring(id from 1 for 7) AS cod_mun,
-                     SUM(ST_Area(geom::geography)/1e6) AS area_sum_km2
+              SELECT cod_municipio, SUM(area_km2) AS area_sum_km2
               FROM setores_censitarios
-              GROUP BY 1
+              GROUP BY cod_municipio
             )
             UPDATE setores_censitarios s
-            SET pop_total = pm.pop_total * (ST_Area(s.geom::geography)/1e6) / am.area_sum_km2
+            SET pop_total = pm.pop_total * s.area_km2 / am.area_sum_km2
             FROM tmp_pop_mun pm
-            JOIN area_mun am ON am.cod_mun = pm.cod_mun
-            WHERE substring(s.id from 1 for 7) = pm.cod_mun
+            JOIN area_mun am ON am.cod_municipio = pm.cod_mun
+            WHERE s.cod_municipio = pm.cod_mun
               AND am.area_sum_km2 > 0;
             """
         )
         conn.execute(sql)
-    print("Distribuição concluída.")
+        incrementar("censo", conn)
+    print("Distribuição concluída. Regere a grade de população: python -m app.utils.etl.build_pop_grid")
 
 
 def main():
@@ -16,6 +16,7 @@ from app.models import (
     NormasTVFMCompatibilidade,
     NormasTVNivelContorno,
 )
+from app.utils.versoes import incrementar
 
 DATA_DIR = os.path.join("data", "normas")
 
@@ -32,6 +33,7 @@ def load_table(model, rows: Sequence[dict], mapper: Callable[[dict], dict]) -> N
     db.session.query(model).delete()
     objs = [model(**mapper(row)) for row in rows]
     db.session.add_all(objs)
+    incrementar("normas")  # snapshots em processo (registro_normas) são recarregados
     db.session.commit()
 
 
@@ -1,72 +1,151 @@
-import json
+"""
+Carga dos setores censitários IBGE (shapefile) em `setores_censitarios`.
+
+- O shapefile é dividido em faixas de registros, codificadas em paralelo (processos): cada worker
+  lê sua faixa com pyshp, gera EWKB (shapely, vetorizado) e grava as linhas no formato COPY num
+  arquivo temporário.
+- O processo principal envia as faixas, na ordem em que ficam prontas, por um único
+  `COPY ... FROM STDIN`, descartando ids repetidos.
+- Índices secundários da tabela são removidos durante a carga e recriados no fim; progresso e
+  throughput são impressos a cada faixa.
+
+Uso:
+  docker-compose exec web python -m app.utils.etl.load_setores_ibge [--workers N]
+"""
+
+import argparse
 import os
-from typing import List
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, List
 
+import numpy as np
 import shapefile  # pyshp
+import shapely
 import sqlalchemy as sa
+from shapely.geometry import shape
 
 from app import create_app, db
+from app.utils.etl.bulk import copy_texto, linha_copy
+from app.utils.etl.build_setores_subdivididos import build as build_setores_subdivididos
+from app.utils.versoes import incrementar
 
+COLUNAS = ("id", "cod_municipio", "municipio", "tipo", "geom")
+TAMANHO_FAIXA = 20_000
 
-def load_setores(shp_path: str, batch_size: int = 500) -> None:
-    if not os.path.exists(shp_path):
-        raise FileNotFoundError(f"Shapefile não encontrado: {shp_path}")
-
-    insert_sql = sa.text(
-        """
-        INSERT INTO setores_censitarios (id, municipio, tipo, pop_total, geom)
-        VALUES (:id, :municipio, :tipo, NULL, ST_SetSRID(ST_GeomFromGeoJSON(:geom), 4674))
-        ON CONFLICT (id) DO NOTHING
-        """
-    )
-
-    # Limpa tabela antes de carregar
-    db.session.execute(sa.text("TRUNCATE TABLE setores_censitarios RESTART IDENTITY CASCADE"))
-    db.session.commit()
 
+def _codificar_faixa(shp_path: str, inicio: int, fim: int, diretorio: str) -> tuple[str, int, int]:
+    """Worker: registros [inicio, fim) -> arquivo COPY; retorna (caminho, linhas, erros de geometria)."""
     reader = shapefile.Reader(shp_path)
-    total = reader.numRecords
-    print(f"Carregando {total} setores de {shp_path} ...")
-
-    params_batch: List[dict] = []
-    error_count = 0
-
-    for idx, (rec, shp) in enumerate(zip(reader.iterRecords(), reader.iterShapes()), start=1):
-        attrs = rec.as_dict()
-        geom_geojson = shp.__geo_interface__
-        if not geom_geojson or not geom_geojson.get("coordinates"):
-            error_count += 1
+    atributos = []
+    geoms = []
+    erros = 0
+    for idx in range(inicio, fim):
+        try:
+            geo = reader.shape(idx).__geo_interface__
+            if not geo or not geo.get("coordinates"):
+                raise ValueError("geometria vazia")
+            geoms.append(shape(geo))
+        except Exception:
+            erros += 1
             continue
-
-        params_batch.append(
-            {
-                "id": attrs.get("CD_SETOR"),
-                "municipio": attrs.get("NM_MUN"),
-                "tipo": (attrs.get("SITUACAO") or "").lower(),
-                "geom": json.dumps(geom_geojson),
-            }
+        rec = reader.record(idx).as_dict()
+        atributos.append((rec.get("CD_SETOR"), rec.get("NM_MUN"), (rec.get("SITUACAO") or "").lower()))
+    reader.close()
+
+    wkbs = shapely.to_wkb(shapely.set_srid(np.array(geoms, dtype=object), 4674), hex=True, include_srid=True)
+    fd, caminho = tempfile.mkstemp(prefix=f"setores_{inicio}_", suffix=".copy", dir=diretorio)
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        for (cd_setor, municipio, tipo), wkb in zip(atributos, wkbs):
+            fh.write(linha_copy((cd_setor, cd_setor[:7] if cd_setor else None, municipio, tipo, wkb)))
+    return caminho, len(atributos), erros
+
+
+def _indices_secundarios(conn) -> List[tuple]:
+    """(nome, definição) dos índices de setores_censitarios exceto a chave primária."""
+    rows = conn.execute(
+        sa.text(
+            """
+            SELECT i.indexname, i.indexdef
+            FROM pg_indexes i
+            JOIN pg_class c ON c.relname = i.indexname
+            JOIN pg_index x ON x.indexrelid = c.oid
+            WHERE i.tablename = 'setores_censitarios' AND NOT x.indisprimary
+            """
         )
+    )
+    return [(r.indexname, r.indexdef) for r in rows]
 
-        if len(params_batch) >= batch_size:
-            db.session.execute(insert_sql, params_batch)
-            db.session.commit()
-            params_batch.clear()
-            if idx % 5000 == 0:
-                print(f"{idx} registros carregados...")
 
-    if params_batch:
-        db.session.execute(insert_sql, params_batch)
-        db.session.commit()
+def load_setores(shp_path: str, workers: int | None = None, tamanho_faixa: int = TAMANHO_FAIXA) -> None:
+    if not os.path.exists(shp_path):
+        raise FileNotFoundError(f"Shapefile não encontrado: {shp_path}")
+
+    total = shapefile.Reader(shp_path).numRecords
+    faixas = [(i, min(i + tamanho_faixa, total)) for i in range(0, total, tamanho_faixa)]
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    print(f"Carregando {total} setores de {shp_path} ({len(faixas)} faixas, {workers} processos) ...")
+
+    conn = db.session.connection()
+    conn.execute(sa.text("TRUNCATE TABLE setores_censitarios RESTART IDENTITY CASCADE"))
+    indices = _indices_secundarios(conn)
+    for nome, _ in indices:
+        conn.execute(sa.text(f'DROP INDEX IF EXISTS "{nome}"'))
+
+    vistos: set = set()
+    carregados = 0
+    erros = 0
+    t0 = time.perf_counter()
+
+    def sem_repetidos(caminho: str) -> Iterator[str]:
+        with open(caminho, encoding="utf-8") as fh:
+            for linha in fh:
+                cd_setor = linha.split("\t", 1)[0]
+                if cd_setor in vistos:
+                    continue
+                vistos.add(cd_setor)
+                yield linha
+
+    with tempfile.TemporaryDirectory(prefix="setores_") as diretorio:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futuros = [pool.submit(_codificar_faixa, shp_path, ini, fim, diretorio) for ini, fim in faixas]
+            for futuro in as_completed(futuros):
+                caminho, _, erros_faixa = futuro.result()
+                antes = len(vistos)
+                copy_texto(conn, "setores_censitarios", COLUNAS, sem_repetidos(caminho))
+                os.remove(caminho)
+                carregados += len(vistos) - antes
+                erros += erros_faixa
+                decorrido = time.perf_counter() - t0
+                print(f"{carregados}/{total} setores ({carregados / max(decorrido, 1e-6):.0f}/s)")
+
+    print(f"Recriando {len(indices)} índices ...")
+    for _, definicao in indices:
+        conn.execute(sa.text(definicao))
+    conn.execute(sa.text("ANALYZE setores_censitarios"))
+    db.session.commit()
+    print(
+        f"Carga de setores concluída em {time.perf_counter() - t0:.0f}s. Erros de geometria: {erros}"
+    )
 
-    print(f"Carga de setores concluída. Erros de geometria: {error_count}")
+    print("Subdividindo setores (setores_subdivididos) ...")
+    pecas = build_setores_subdivididos(db.session.connection())
+    # estatísticas e grade de população derivadas dos setores ficam desatualizadas
+    incrementar("censo")
+    db.session.commit()
+    print(f"{pecas} pedaços gerados.")
 
 
-def run() -> None:
+def run(workers: int | None = None) -> None:
     shp_path = os.path.join("data", "BR_setores_CD2022.shp")
-    load_setores(shp_path)
+    load_setores(shp_path, workers=workers)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga dos setores censitários IBGE")
+    parser.add_argument("--workers", type=int, default=None, help="processos de codificação (default: CPUs - 1)")
+    args = parser.parse_args()
     app = create_app()
     with app.app_context():
-        run()
+        run(args.workers)
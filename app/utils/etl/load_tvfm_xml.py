@@ -1,12 +1,17 @@
+import argparse
 import os
+import tempfile
+import time
 import xml.etree.ElementTree as ET
-from typing import Iterable, List, Optional, Set
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Set
 
 import sqlalchemy as sa
-from geoalchemy2.elements import WKTElement
 
 from app import create_app, db
-from app.models import EstacaoFM, EstacaoTV
+from app.utils.estacoes import CAMPOS_TECNICOS, hash_valores
+from app.utils.etl.build_estacoes_propagacao import build as build_estacoes_propagacao
+from app.utils.etl.bulk import copy_arquivo, ewkb_ponto, linha_copy
+from app.utils.versoes import incrementar
 
 
 def parse_float(value: Optional[str]) -> Optional[float]:
@@ -25,15 +30,6 @@ def parse_int(value: Optional[str]) -> Optional[int]:
         return None
 
 
-def make_point(lat_str: Optional[str], lon_str: Optional[str]) -> Optional[WKTElement]:
-    lat = parse_float(lat_str)
-    lon = parse_float(lon_str)
-    if lat is None or lon is None:
-        return None
-    # PostGIS expects lon/lat order (x,y).
-    return WKTElement(f"POINT({lon} {lat})", srid=4674)
-
-
 def parse_diagrama(diagrama_str: Optional[str]) -> Optional[List[Optional[float]]]:
     """Converte string 'a|b|c' em lista de floats (ou None)."""
     if not diagrama_str:
@@ -70,129 +66,280 @@ def tecnologia_from_attrs(attrs: dict) -> str:
     return "analogica"
 
 
-def load_files(file_paths: Iterable[str], truncate: bool = True) -> None:
-    if truncate:
-        db.session.execute(sa.text("TRUNCATE TABLE estacoes_tv RESTART IDENTITY CASCADE"))
-        db.session.execute(sa.text("TRUNCATE TABLE estacoes_fm RESTART IDENTITY CASCADE"))
-        db.session.commit()
+COLUNAS_FM = (
+    "id_mosaico", "id_plano", "uf", "cod_municipio", "municipio", "servico", "canal", "classe",
+    "freq_mhz", "erp_max_kw", "hnmt_m", "erp_por_radial", "geom", "antena_id", "categoria", "status",
+    "entidade", "cnpj", "carater", "finalidade", "fistel", "observacoes", "hash_tecnico",
+)
+COLUNAS_TV = (
+    "id_plano", "uf", "cod_municipio", "municipio", "servico", "tecnologia", "canal", "classe",
+    "freq_mhz", "erp_max_kw", "hnmt_m", "erp_por_radial", "geom", "categoria", "status", "entidade",
+    "cnpj", "carater", "finalidade", "fistel", "fistel_geradora", "observacoes", "hash_tecnico",
+)
+TABELAS = {"fm": ("estacoes_fm", COLUNAS_FM), "tv": ("estacoes_tv", COLUNAS_TV)}
+# Chave da estação no plano (mesma usada para descartar repetidas na leitura do XML).
+CHAVES = {"fm": "COALESCE({a}id_plano, {a}id_mosaico)", "tv": "{a}id_plano"}
 
-    existing_tv_ids: Set[str] = set()
-    existing_fm_ids: Set[str] = set()
 
-    batch = []
-    batch_size = 1000
+def iter_rows(path: str) -> Iterator[dict]:
+    """Atributos de cada <row> do XML, em streaming (elementos liberados após o uso)."""
+    contexto = ET.iterparse(path, events=("start", "end"))
+    _, raiz = next(contexto)
+    for evento, elem in contexto:
+        if evento == "end" and elem.tag == "row":
+            yield dict(elem.attrib)
+            elem.clear()
+            raiz.clear()  # solta as referências acumuladas na raiz
 
+
+def _escrever_linhas(file_paths: Iterable[str], destinos: Dict[str, IO[str]]) -> Dict[str, int]:
+    """Uma passada pelos XMLs gravando as linhas COPY de cada serviço no arquivo temporário dele."""
+    vistos: Dict[str, Set[str]] = {"fm": set(), "tv": set()}
+    contagem = {"fm": 0, "tv": 0}
     for path in file_paths:
         if not os.path.exists(path):
             print(f"Arquivo não encontrado: {path}")
             continue
         print(f"Lendo {path} ...")
-        tree = ET.parse(path)
-        root = tree.getroot()
-
-        for row in root.findall(".//row"):
-            attrs = row.attrib
+        for attrs in iter_rows(path):
             servico = (attrs.get("Servico") or "").upper()
             if servico == "TV":
-                est = build_tv(attrs)
-                id_plano = est.id_plano
-                if id_plano and id_plano in existing_tv_ids:
-                    continue
-                if id_plano:
-                    existing_tv_ids.add(id_plano)
-                batch.append(est)
+                chave, linha = "tv", linha_tv(attrs)
+                id_plano = attrs.get("IdtPlanoBasico") or None
             elif servico == "FM":
-                est = build_fm(attrs)
-                id_plano = est.id_plano or est.id_mosaico
-                if id_plano and id_plano in existing_fm_ids:
-                    continue
-                if id_plano:
-                    existing_fm_ids.add(id_plano)
-                batch.append(est)
+                chave, linha = "fm", linha_fm(attrs)
+                id_plano = attrs.get("IdtPlanoBasico") or attrs.get("id") or None
             else:
                 continue
+            if id_plano:
+                if id_plano in vistos[chave]:
+                    continue
+                vistos[chave].add(id_plano)
+            destinos[chave].write(linha_copy(linha))
+            contagem[chave] += 1
+    return contagem
+
+
+def _diff_tabela(conn, servico: str) -> Dict[str, List[int]]:
+    """
+    Aplica `stg_<tabela>` sobre a tabela final comparando pela chave do plano:
+    remove as estações que sumiram, atualiza as que mudaram (técnica: hash diferente; cadastral:
+    demais colunas) e inclui as novas. Estações sem chave são sempre removidas e reincluídas.
+    """
+    tabela, colunas = TABELAS[servico]
+    staging = f"stg_{tabela}"
+    chave_t, chave_s = CHAVES[servico].format(a="t."), CHAVES[servico].format(a="s.")
+    tecnicas = [c for c in CAMPOS_TECNICOS[servico] if c in colunas]
+    cadastrais = [c for c in colunas if c not in tecnicas and c not in ("geom", "hash_tecnico")]
+    # linhas antigas sem hash (antes da coluna existir) caem na comparação coluna a coluna e
+    # recebem o hash nesta carga (contadas como "cadastrais" se nada técnico mudou)
+    diff_tecnico = (
+        "COALESCE(t.hash_tecnico <> s.hash_tecnico, "
+        f"({', '.join('t.' + c for c in tecnicas)}, ST_AsEWKB(t.geom)) IS DISTINCT FROM "
+        f"({', '.join('s.' + c for c in tecnicas)}, ST_AsEWKB(s.geom)))"
+    )
+    diff_cadastral = (
+        f"({', '.join('t.' + c for c in cadastrais)}) IS DISTINCT FROM ({', '.join('s.' + c for c in cadastrais)})"
+    )
+
+    conn.execute(sa.text(f"CREATE INDEX ON {staging} (({CHAVES[servico].format(a='')}))"))
+    conn.execute(sa.text(f"ANALYZE {staging}"))
 
-            if len(batch) >= batch_size:
-                db.session.add_all(batch)
-                db.session.commit()
-                batch.clear()
+    removidas = conn.execute(
+        sa.text(
+            f"""
+            DELETE FROM {tabela} t
+            WHERE {chave_t} IS NULL
+               OR NOT EXISTS (SELECT 1 FROM {staging} s WHERE {chave_s} = {chave_t})
+            RETURNING t.id
+            """
+        )
+    ).scalars().all()
 
-    if batch:
-        db.session.add_all(batch)
+    atribuicoes = ", ".join(f"{c} = d.{c}" for c in colunas)
+    alteradas: List[int] = []
+    cadastrais_ids: List[int] = []
+    for row in conn.execute(
+        sa.text(
+            f"""
+            UPDATE {tabela} t SET {atribuicoes}
+            FROM (
+              SELECT s.*, t.id AS alvo_id, t.hash_tecnico IS NULL AS sem_hash,
+                     {diff_tecnico} AS tecnica, {diff_cadastral} AS cadastral
+              FROM {staging} s
+              JOIN {tabela} t ON {chave_t} = {chave_s}
+            ) d
+            WHERE t.id = d.alvo_id AND (d.tecnica OR d.cadastral OR d.sem_hash)
+            RETURNING t.id, d.tecnica
+            """
+        )
+    ):
+        (alteradas if row.tecnica else cadastrais_ids).append(row.id)
+
+    lista = ", ".join(colunas)
+    inseridas = conn.execute(
+        sa.text(
+            f"""
+            INSERT INTO {tabela} ({lista})
+            SELECT {lista} FROM {staging} s
+            WHERE {chave_s} IS NULL
+               OR NOT EXISTS (SELECT 1 FROM {tabela} t WHERE {chave_t} = {chave_s})
+            RETURNING id
+            """
+        )
+    ).scalars().all()
+    return {"inseridas": list(inseridas), "alteradas": alteradas, "cadastrais": cadastrais_ids, "removidas": list(removidas)}
+
+
+def load_files(file_paths: Iterable[str], completa: bool = False) -> Dict[str, Dict[str, List[int]]]:
+    """
+    Carrega os planos (XML) em estacoes_fm/estacoes_tv e retorna a lista de alterações por serviço:
+    {"fm": {"inseridas": [ids], "alteradas": [ids], "cadastrais": [ids], "removidas": [ids]}, "tv": ...}
+    ("alteradas" = mudança técnica, que invalida propagação/interferência; "cadastrais" = só as demais colunas).
+
+    Linhas vão para arquivos temporários (formato COPY) numa única passada em streaming, depois por
+    COPY para tabelas de staging e daí para as tabelas finais numa única transação. Por padrão aplica
+    só a diferença (IDs das estações mantidas não mudam) e atualiza na matriz os pares das estações
+    alteradas; com `completa`, TRUNCATE + INSERT (IDs reiniciam e a matriz é zerada). Em seguida
+    recalcula `estacoes_propagacao` das estações novas/alteradas.
+    """
+    t0 = time.perf_counter()
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as tmp_fm, tempfile.TemporaryFile(
+        "w+", encoding="utf-8"
+    ) as tmp_tv:
+        arquivos = {"fm": tmp_fm, "tv": tmp_tv}
+        contagem = _escrever_linhas(file_paths, arquivos)
+        print(f"XML lido em {time.perf_counter() - t0:.1f}s: {contagem['fm']} FM, {contagem['tv']} TV.")
+
+        conn = db.session.connection()
+        for servico, (tabela, colunas) in TABELAS.items():
+            staging = f"stg_{tabela}"
+            lista = ", ".join(colunas)
+            conn.execute(
+                sa.text(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {lista} FROM {tabela} WITH NO DATA")
+            )
+            arquivo = arquivos[servico]
+            arquivo.seek(0)
+            copy_arquivo(conn, staging, colunas, arquivo)
+
+        alteracoes: Dict[str, Dict[str, List[int]]] = {}
+        if completa:
+            conn.execute(sa.text("TRUNCATE TABLE estacoes_tv RESTART IDENTITY CASCADE"))
+            conn.execute(sa.text("TRUNCATE TABLE estacoes_fm RESTART IDENTITY CASCADE"))
+            # IDs reiniciam: a matriz de interferência deixa de valer e precisa do job nacional.
+            conn.execute(
+                sa.text("TRUNCATE TABLE matriz_interferencia, matriz_interferencia_tiles, estacoes_propagacao")
+            )
+            for servico, (tabela, colunas) in TABELAS.items():
+                lista = ", ".join(colunas)
+                ids = conn.execute(
+                    sa.text(f"INSERT INTO {tabela} ({lista}) SELECT {lista} FROM stg_{tabela} RETURNING id")
+                ).scalars()
+                alteracoes[servico] = {"inseridas": list(ids), "alteradas": [], "cadastrais": [], "removidas": []}
+        else:
+            for servico in TABELAS:
+                alteracoes[servico] = _diff_tabela(conn, servico)
+        for servico, mudancas in alteracoes.items():
+            # invalida tiles e demais caches derivados das estações (só se algo mudou)
+            if any(mudancas.values()):
+                incrementar(f"estacoes_{servico}")
+            print(f"{servico.upper()}: " + ", ".join(f"{len(ids)} {tipo}" for tipo, ids in mudancas.items()))
         db.session.commit()
-        batch.clear()
-    print("Carga concluída.")
-
-
-def build_tv(attrs: dict) -> EstacaoTV:
-    obs = attrs.get("Observacoes")
-    tecnologia = tecnologia_from_attrs(attrs)
-    ponto = make_point(attrs.get("Latitude"), attrs.get("Longitude"))
-
-    return EstacaoTV(
-        id_plano=attrs.get("IdtPlanoBasico") or None,
-        uf=attrs.get("UF"),
-        cod_municipio=attrs.get("CodMunicipio"),
-        municipio=attrs.get("Municipio"),
-        servico=attrs.get("Servico") or "TV",
-        tecnologia=tecnologia,
-        canal=parse_int(attrs.get("Canal")) or 0,
-        classe=attrs.get("Classe"),
-        freq_mhz=parse_float(attrs.get("Frequencia")),
-        erp_max_kw=parse_float(attrs.get("ERP")),
-        hnmt_m=parse_float(attrs.get("Altura")),
-        erp_por_radial=parse_diagrama(attrs.get("PadraoAntena_dBd")),
-        geom=ponto,
-        categoria=attrs.get("categoriaEstacao") or attrs.get("Carater"),
-        status=attrs.get("Status"),
-        entidade=attrs.get("Entidade"),
-        cnpj=attrs.get("CNPJ"),
-        carater=attrs.get("Carater"),
-        finalidade=attrs.get("Finalidade"),
-        fistel=attrs.get("Fistel"),
-        fistel_geradora=attrs.get("FistelGeradora"),
-        observacoes=obs,
+    print(f"Carga concluída em {time.perf_counter() - t0:.1f}s.")
+
+    # Parâmetros de propagação das estações novas/alteradas (usados também pela matriz abaixo).
+    build_estacoes_propagacao()
+
+    if not completa:
+        # Matriz: só os pares que tocam estações incluídas, alteradas tecnicamente ou removidas.
+        from app.tasks.matriz import atualizar_pares_estacoes
+
+        for servico, mudancas in alteracoes.items():
+            ids = mudancas["inseridas"] + mudancas["alteradas"] + mudancas["removidas"]
+            if ids:
+                res = atualizar_pares_estacoes(servico, ids)
+                print(f"Matriz {servico.upper()} atualizada: {res}")
+    return alteracoes
+
+
+def _com_hash(servico: str, linha: tuple, lon: Optional[float], lat: Optional[float]) -> tuple:
+    colunas = TABELAS[servico][1]
+    return linha + (hash_valores(servico, dict(zip(colunas, linha)), lon, lat),)
+
+
+def linha_tv(attrs: dict) -> tuple:
+    """Tupla na ordem de COLUNAS_TV."""
+    lon, lat = parse_float(attrs.get("Longitude")), parse_float(attrs.get("Latitude"))
+    linha = (
+        attrs.get("IdtPlanoBasico") or None,
+        attrs.get("UF"),
+        attrs.get("CodMunicipio"),
+        attrs.get("Municipio"),
+        attrs.get("Servico") or "TV",
+        tecnologia_from_attrs(attrs),
+        parse_int(attrs.get("Canal")) or 0,
+        attrs.get("Classe"),
+        parse_float(attrs.get("Frequencia")),
+        parse_float(attrs.get("ERP")),
+        parse_float(attrs.get("Altura")),
+        parse_diagrama(attrs.get("PadraoAntena_dBd")),
+        ewkb_ponto(lon, lat),
+        attrs.get("categoriaEstacao") or attrs.get("Carater"),
+        attrs.get("Status"),
+        attrs.get("Entidade"),
+        attrs.get("CNPJ"),
+        attrs.get("Carater"),
+        attrs.get("Finalidade"),
+        attrs.get("Fistel"),
+        attrs.get("FistelGeradora"),
+        attrs.get("Observacoes"),
     )
+    return _com_hash("tv", linha, lon, lat)
 
 
-def build_fm(attrs: dict) -> EstacaoFM:
-    ponto = make_point(attrs.get("Latitude"), attrs.get("Longitude"))
-    return EstacaoFM(
-        id_mosaico=attrs.get("id") or None,
-        id_plano=attrs.get("IdtPlanoBasico") or None,
-        uf=attrs.get("UF"),
-        cod_municipio=attrs.get("CodMunicipio"),
-        municipio=attrs.get("Municipio"),
-        servico=attrs.get("Servico") or "FM",
-        canal=parse_int(attrs.get("Canal")) or 0,
-        classe=attrs.get("Classe"),
-        freq_mhz=parse_float(attrs.get("Frequencia")),
-        erp_max_kw=parse_float(attrs.get("ERP")),
-        hnmt_m=parse_float(attrs.get("Altura")),
-        erp_por_radial=parse_diagrama(attrs.get("PadraoAntena_dBd")),
-        geom=ponto,
-        antena_id=None,
-        categoria=attrs.get("categoriaEstacao") or attrs.get("Carater"),
-        status=attrs.get("Status"),
-        entidade=attrs.get("Entidade"),
-        cnpj=attrs.get("CNPJ"),
-        carater=attrs.get("Carater"),
-        finalidade=attrs.get("Finalidade"),
-        fistel=attrs.get("Fistel"),
-        observacoes=attrs.get("Observacoes"),
+def linha_fm(attrs: dict) -> tuple:
+    """Tupla na ordem de COLUNAS_FM."""
+    lon, lat = parse_float(attrs.get("Longitude")), parse_float(attrs.get("Latitude"))
+    linha = (
+        attrs.get("id") or None,
+        attrs.get("IdtPlanoBasico") or None,
+        attrs.get("UF"),
+        attrs.get("CodMunicipio"),
+        attrs.get("Municipio"),
+        attrs.get("Servico") or "FM",
+        parse_int(attrs.get("Canal")) or 0,
+        attrs.get("Classe"),
+        parse_float(attrs.get("Frequencia")),
+        parse_float(attrs.get("ERP")),
+        parse_float(attrs.get("Altura")),
+        parse_diagrama(attrs.get("PadraoAntena_dBd")),
+        ewkb_ponto(lon, lat),
+        None,
+        attrs.get("categoriaEstacao") or attrs.get("Carater"),
+        attrs.get("Status"),
+        attrs.get("Entidade"),
+        attrs.get("CNPJ"),
+        attrs.get("Carater"),
+        attrs.get("Finalidade"),
+        attrs.get("Fistel"),
+        attrs.get("Observacoes"),
     )
+    return _com_hash("fm", linha, lon, lat)
 
 
-def run() -> None:
+def run(completa: bool = False) -> None:
     file_paths = [
         os.path.join("data", "plano_basicoTVFM.xml"),
         os.path.join("data", "secudariosTVFM.xml"),
         os.path.join("data", "solicitacoesTVFM.xml"),
     ]
-    load_files(file_paths)
+    load_files(file_paths, completa=completa)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga dos planos básicos TV/FM (XML)")
+    parser.add_argument("--completa", action="store_true", help="TRUNCATE + carga completa (IDs reiniciam)")
+    args = parser.parse_args()
     flask_app = create_app()
     with flask_app.app_context():
-        run()
+        run(args.completa)
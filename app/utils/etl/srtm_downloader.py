@@ -8,7 +8,9 @@ Configurações via env (em config.py):
 
 Uso típico:
   python -m app.utils.etl.srtm_downloader --lat -9.7 --lon -36.6 --load
-Isso baixa o tile correspondente e tenta carregar em PostGIS via raster2pgsql (se disponível no PATH).
+Isso baixa o tile correspondente e carrega no PostGIS em blocos (SRTM_RASTER_BLOCO), com overviews.
+  python -m app.utils.etl.srtm_downloader --todos
+Carrega em blocos todos os .hgt já baixados (converte tiles carregados inteiros pelo loader antigo).
 """
 
 import argparse
@@ -25,6 +27,7 @@ import sqlalchemy as sa
 from flask import current_app
 
 from app import create_app, db
+from app.utils.versoes import incrementar
 
 
 def tile_name(lat: float, lon: float) -> str:
@@ -37,6 +40,8 @@ def download_tile(base_url: str, download_dir: Path, name: str) -> Path:
     """
     Mapzen/Skadi estrutura: <base>/<lat_band>/<name>.hgt.gz
     Ex.: https://s3.amazonaws.com/elevation-tiles-prod/skadi/N41/N41W124.hgt.gz
+    Incrementa a versão "terreno": o .hgt novo passa a ser usado por `sample_heights` (fallback
+    local), então parâmetros pré-calculados sem ele ficam desatualizados.
     """
     download_dir.mkdir(parents=True, exist_ok=True)
     lat_band = name[:3]  # ex: N41
@@ -56,35 +61,99 @@ def download_tile(base_url: str, download_dir: Path, name: str) -> Path:
     with gzip.open(out_gz, "rb") as f_in, open(hgt_path, "wb") as f_out:
         shutil.copyfileobj(f_in, f_out)
     print("Descompactado.")
+    with db.engine.begin() as conn:
+        incrementar("terreno", conn)
     return hgt_path
 
 
-def load_hgt_postgis(hgt_path: Path, table: str, column: str = "rast"):
-    """Carrega o arquivo .hgt para PostGIS usando ST_FromGDALRaster."""
-    data = hgt_path.read_bytes()
+def _preparar_tabela(conn, table: str, column: str) -> None:
+    """Tabela de blocos (vários por tile .hgt) com índice GiST no envelope de cada bloco."""
+    conn.execute(
+        sa.text(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+              id serial primary key,
+              name text,
+              {column} raster
+            );
+            """
+        )
+    )
+    # tabelas antigas (um raster inteiro por tile) tinham name UNIQUE
+    conn.execute(sa.text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_name_key"))
+    conn.execute(sa.text(f"CREATE INDEX IF NOT EXISTS {table}_name_idx ON {table} (name)"))
+    conn.execute(
+        sa.text(f"CREATE INDEX IF NOT EXISTS {table}_{column}_gist ON {table} USING gist (ST_ConvexHull({column}))")
+    )
+
+
+def load_hgt_postgis(hgt_path: Path, table: str, column: str = "rast", substituir: bool = False) -> bool:
+    """
+    Carrega o .hgt no PostGIS em blocos de SRTM_RASTER_BLOCO px (ST_Tile), com índice GiST em
+    ST_ConvexHull: ST_Value/ST_Intersects do terreno viram buscas no índice sobre blocos pequenos.
+    Também gera overviews (`o_<fator>_<tabela>`, convenção do raster2pgsql) para consultas em
+    resolução reduzida. Tiles já carregados em blocos são ignorados (exceto com `substituir`);
+    carregados inteiros (loader antigo) são recarregados. Retorna True se carregou.
+    """
+    cfg = current_app.config
+    bloco = int(cfg.get("SRTM_RASTER_BLOCO", 100))
+    fatores = tuple(cfg.get("SRTM_RASTER_OVERVIEWS", (4, 16)))
+    name = hgt_path.stem
     with db.engine.begin() as conn:
-        conn.execute(
-            sa.text(
-                f"""
-                CREATE TABLE IF NOT EXISTS {table} (
-                  id serial primary key,
-                  name text UNIQUE,
-                  {column} raster
-                );
-                """
+        _preparar_tabela(conn, table, column)
+        for fator in fatores:
+            _preparar_tabela(conn, f"o_{fator}_{table}", column)
+        if not substituir:
+            conn.execute(
+                sa.text(f"DELETE FROM {table} WHERE name = :name AND ST_Width({column}) > :bloco"),
+                {"name": name, "bloco": bloco},
             )
-        )
+            if conn.execute(sa.text(f"SELECT EXISTS (SELECT 1 FROM {table} WHERE name = :name)"), {"name": name}).scalar():
+                return False
+        for alvo in (table, *(f"o_{fator}_{table}" for fator in fatores)):
+            conn.execute(sa.text(f"DELETE FROM {alvo} WHERE name = :name"), {"name": name})
+
         conn.execute(
+            sa.text("CREATE TEMP TABLE _hgt ON COMMIT DROP AS SELECT ST_SetSRID(ST_FromGDALRaster(:data), 4326) AS r"),
+            {"data": hgt_path.read_bytes()},
+        )
+        blocos = conn.execute(
             sa.text(
                 f"""
                 INSERT INTO {table}(name, {column})
-                VALUES (:name, ST_SetSRID(ST_FromGDALRaster(:data), 4326))
-                ON CONFLICT (name) DO NOTHING;
+                SELECT :name, ST_Tile(r, :bloco, :bloco) FROM _hgt
                 """
             ),
-            {"name": hgt_path.stem, "data": data},
-        )
-    print(f"Carga raster concluída em {table} para {hgt_path.name}")
+            {"name": name, "bloco": bloco},
+        ).rowcount
+        for fator in fatores:
+            conn.execute(
+                sa.text(
+                    f"""
+                    INSERT INTO o_{fator}_{table}(name, {column})
+                    SELECT :name, ST_Tile(ST_Rescale(r, ST_ScaleX(r) * :fator, ST_ScaleY(r) * :fator, 'Bilinear'), :bloco, :bloco)
+                    FROM _hgt
+                    """
+                ),
+                {"name": name, "fator": fator, "bloco": bloco},
+            )
+        # amostras de terreno em cache (perfis, parâmetros por estação) ficam desatualizadas
+        incrementar("terreno", conn)
+    print(f"Carga raster concluída em {table} para {hgt_path.name}: {blocos} blocos de {bloco}x{bloco}")
+    return True
+
+
+def load_dir(download_dir: Path, table: str, column: str = "rast", substituir: bool = False) -> int:
+    """Carrega (ou converte para blocos) todos os .hgt do diretório; retorna quantos foram carregados."""
+    carregados = 0
+    for hgt_path in sorted(download_dir.glob("*.hgt")):
+        carregados += int(load_hgt_postgis(hgt_path, table, column, substituir=substituir))
+    for fator in (None, *current_app.config.get("SRTM_RASTER_OVERVIEWS", (4, 16))):
+        alvo = table if fator is None else f"o_{fator}_{table}"
+        with db.engine.begin() as conn:
+            conn.execute(sa.text(f"ANALYZE {alvo}"))
+    print(f"{carregados} tiles carregados de {download_dir}")
+    return carregados
 
 
 def ensure_tile_loaded(lat: float, lon: float, load: bool = True, download: bool = True) -> Path:
@@ -107,9 +176,16 @@ def ensure_tile_loaded(lat: float, lon: float, load: bool = True, download: bool
         return hgt_path
 
 
-def main(lat: float, lon: float, load: bool):
+def main(lat: Optional[float], lon: Optional[float], load: bool, todos: bool = False):
     app = create_app()
     with app.app_context():
+        if todos:
+            load_dir(
+                Path(current_app.config.get("SRTM_DOWNLOAD_DIR", "data/srtm")),
+                current_app.config.get("PROPAGATION_RASTER_TABLE", "srtm_raster"),
+                current_app.config.get("PROPAGATION_RASTER_COLUMN", "rast"),
+            )
+            return
         base_url = current_app.config.get("SRTM_BASE_URL")
         download_dir = Path(current_app.config.get("SRTM_DOWNLOAD_DIR", "data/srtm"))
         name = tile_name(lat, lon)
@@ -122,8 +198,13 @@ def main(lat: float, lon: float, load: bool):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Baixa tile SRTM e (opcionalmente) carrega em PostGIS.")
-    parser.add_argument("--lat", type=float, required=True, help="latitude (decimal)")
-    parser.add_argument("--lon", type=float, required=True, help="longitude (decimal)")
-    parser.add_argument("--load", action="store_true", help="carregar em PostGIS usando raster2pgsql + psql")
+    parser.add_argument("--lat", type=float, help="latitude (decimal)")
+    parser.add_argument("--lon", type=float, help="longitude (decimal)")
+    parser.add_argument("--load", action="store_true", help="carregar em PostGIS (blocos + overviews)")
+    parser.add_argument(
+        "--todos", action="store_true", help="carregar em blocos todos os .hgt já baixados (converte cargas antigas)"
+    )
     args = parser.parse_args()
-    main(args.lat, args.lon, args.load)
+    if not args.todos and (args.lat is None or args.lon is None):
+        parser.error("--lat e --lon são obrigatórios (exceto com --todos)")
+    main(args.lat, args.lon, args.load, args.todos)
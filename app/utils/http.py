@@ -0,0 +1,55 @@
+"""
+Utilitários de resposta HTTP compartilhados pelos blueprints (compressão gzip, ETag).
+"""
+
+import gzip
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from flask import Response, request
+
+NIVEL_GZIP = 6
+
+
+def aceita_gzip() -> bool:
+    """True se o cliente aceita `Content-Encoding: gzip`."""
+    return request.accept_encodings["gzip"] > 0
+
+
+def comprimir(dados: bytes) -> bytes:
+    return gzip.compress(dados, compresslevel=NIVEL_GZIP)
+
+
+def comprimir_stream(partes: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Comprime um stream em gzip incrementalmente. Cada parte termina com Z_SYNC_FLUSH, então o
+    cliente consegue descomprimir o que já chegou sem esperar o fim da resposta.
+    """
+    comp = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for parte in partes:
+        saida = comp.compress(parte) + comp.flush(zlib.Z_SYNC_FLUSH)
+        if saida:
+            yield saida
+    yield comp.flush()
+
+
+def resposta_gzip(
+    corpo_gzip: bytes, mimetype: str, etag: Optional[str] = None, cache_control: Optional[str] = None
+) -> Response:
+    """
+    Resposta a partir de um corpo já comprimido (ex.: vindo de cache): envia como está se o cliente
+    aceita gzip, senão descomprime. Com `etag`, responde 304 a If-None-Match correspondente.
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    if etag and request.if_none_match.contains(etag):
+        resp = Response(status=304, headers=headers)
+    elif aceita_gzip():
+        headers["Content-Encoding"] = "gzip"
+        resp = Response(corpo_gzip, mimetype=mimetype, headers=headers)
+    else:
+        resp = Response(gzip.decompress(corpo_gzip), mimetype=mimetype, headers=headers)
+    if etag:
+        resp.set_etag(etag)
+    return resp
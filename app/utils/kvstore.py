@@ -0,0 +1,130 @@
+"""
+Estado efêmero compartilhado entre web e workers (progresso, flags, caches) no Redis.
+
+KVSTORE_URL (default REDIS_URL) escolhe o backend; "memory://" usa um stand-in em processo
+com o subconjunto da API do redis-py usado pela aplicação (testes e dev sem Redis).
+"""
+
+import fnmatch
+import queue
+import threading
+import time
+from typing import Dict, Optional
+
+from flask import current_app
+
+
+class _MemoryPubSub:
+    def __init__(self, store: "MemoryStore"):
+        self._store = store
+        self._fila: "queue.Queue[dict]" = queue.Queue()
+        self._canais: set = set()
+
+    def subscribe(self, *canais: str) -> None:
+        for canal in canais:
+            self._canais.add(canal)
+            self._store._assinar(canal, self._fila)
+
+    def get_message(self, ignore_subscribe_messages: bool = True, timeout: float = 0.0) -> Optional[dict]:
+        try:
+            return self._fila.get(timeout=timeout) if timeout else self._fila.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        for canal in self._canais:
+            self._store._cancelar(canal, self._fila)
+        self._canais.clear()
+
+
+class MemoryStore:
+    """Stand-in em processo para Redis (get/set/delete/incr/exists/keys/publish/pubsub)."""
+
+    def __init__(self):
+        self._dados: Dict[str, tuple] = {}
+        self._assinantes: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def _vivo(self, chave: str):
+        item = self._dados.get(chave)
+        if item is None:
+            return None
+        valor, expira = item
+        if expira is not None and expira < time.monotonic():
+            self._dados.pop(chave, None)
+            return None
+        return valor
+
+    def get(self, chave: str):
+        with self._lock:
+            return self._vivo(chave)
+
+    def set(self, chave: str, valor, ex: Optional[int] = None, nx: bool = False):
+        with self._lock:
+            if nx and self._vivo(chave) is not None:
+                return None
+            if isinstance(valor, str):
+                valor = valor.encode()
+            self._dados[chave] = (valor, time.monotonic() + ex if ex else None)
+            return True
+
+    def delete(self, *chaves: str) -> int:
+        with self._lock:
+            return sum(1 for c in chaves if self._dados.pop(c, None) is not None)
+
+    def exists(self, chave: str) -> int:
+        with self._lock:
+            return int(self._vivo(chave) is not None)
+
+    def incr(self, chave: str) -> int:
+        with self._lock:
+            valor = int(self._vivo(chave) or 0) + 1
+            expira = self._dados.get(chave, (None, None))[1]
+            self._dados[chave] = (str(valor).encode(), expira)
+            return valor
+
+    def keys(self, padrao: str = "*") -> list:
+        with self._lock:
+            return [c.encode() for c in list(self._dados) if fnmatch.fnmatch(c, padrao) and self._vivo(c) is not None]
+
+    def publish(self, canal: str, mensagem) -> int:
+        if isinstance(mensagem, str):
+            mensagem = mensagem.encode()
+        with self._lock:
+            filas = list(self._assinantes.get(canal, []))
+        for fila in filas:
+            fila.put({"type": "message", "channel": canal.encode(), "data": mensagem})
+        return len(filas)
+
+    def pubsub(self, ignore_subscribe_messages: bool = True) -> _MemoryPubSub:
+        return _MemoryPubSub(self)
+
+    def _assinar(self, canal: str, fila) -> None:
+        with self._lock:
+            self._assinantes.setdefault(canal, []).append(fila)
+
+    def _cancelar(self, canal: str, fila) -> None:
+        with self._lock:
+            filas = self._assinantes.get(canal, [])
+            if fila in filas:
+                filas.remove(fila)
+
+
+_stores: Dict[str, object] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    """Cliente Redis (ou MemoryStore) para o KVSTORE_URL da app atual, um por processo."""
+    url = current_app.config.get("KVSTORE_URL") or "memory://"
+    with _stores_lock:
+        store = _stores.get(url)
+        if store is None:
+            if url.startswith("memory://"):
+                store = MemoryStore()
+            else:
+                import redis
+
+                store = redis.Redis.from_url(url, socket_connect_timeout=2, health_check_interval=30)
+            _stores[url] = store
+        return store
@@ -0,0 +1,117 @@
+"""
+Listagens de estações com paginação keyset e resposta em streaming.
+
+- Cursor = último `id` recebido (`?cursor=`); cada página é `id > cursor ORDER BY id LIMIT n`,
+  custo constante independentemente da profundidade (sem OFFSET).
+- Geometrias saem prontas do banco (`ST_AsGeoJSON`) e são inseridas no JSON como texto,
+  sem passar por shapely.
+- `?formato=ndjson` gera uma estação por linha; o padrão é um objeto JSON
+  `{"results": [...], "count": n, "next_cursor": id|null}` escrito em chunks.
+- `?limit=0` (ou `all`) lista tudo; o banco é lido em blocos de LOTE_LEITURA, com memória constante.
+- Com `Accept-Encoding: gzip` o stream é comprimido incrementalmente.
+"""
+
+import json
+from typing import Dict, Iterator, Optional
+
+from flask import Response, request, stream_with_context
+from sqlalchemy import func
+
+from app.utils.http import aceita_gzip, comprimir_stream
+
+LOTE_LEITURA = 1000
+LIMITE_PADRAO = 100
+
+
+def parametros_paginacao(args) -> tuple[Optional[int], Optional[int]]:
+    """(cursor, limit) a partir da query string; limit None = sem limite. Levanta ValueError."""
+    cursor = args.get("cursor")
+    cursor = int(cursor) if cursor not in (None, "") else None
+    limit = str(args.get("limit", LIMITE_PADRAO)).strip().lower()
+    if limit in ("0", "all"):
+        return cursor, None
+    limit = int(limit)
+    if limit < 0:
+        raise ValueError("limit negativo")
+    return cursor, limit
+
+
+def _linhas(query, model, colunas: Dict, geometrias: Dict, cursor, limit) -> Iterator[tuple]:
+    """(id, json da linha) em ordem de id, lendo blocos keyset de até LOTE_LEITURA linhas."""
+    nomes = list(colunas)
+    nomes_geom = list(geometrias)
+    entidades = [model.id] + list(colunas.values())
+    entidades += [func.ST_AsGeoJSON(col).label(f"_geo_{nome}") for nome, col in geometrias.items()]
+    base = query.with_entities(*entidades).order_by(model.id)
+    emitidas = 0
+    while limit is None or emitidas < limit:
+        bloco = LOTE_LEITURA if limit is None else min(LOTE_LEITURA, limit - emitidas)
+        pagina = base.filter(model.id > cursor) if cursor is not None else base
+        rows = pagina.limit(bloco).all()
+        for row in rows:
+            props = dict(zip(nomes, row[1 : 1 + len(nomes)]))
+            texto = json.dumps({"id": row[0], **props}, default=str, ensure_ascii=False, separators=(",", ":"))
+            # GeoJSON já serializado pelo PostGIS: concatena sem decodificar
+            geos = ",".join(
+                f'"{nome}":{geo or "null"}' for nome, geo in zip(nomes_geom, row[1 + len(nomes) :])
+            )
+            if geos:
+                texto = f"{texto[:-1]},{geos}}}"
+            yield row[0], texto
+        emitidas += len(rows)
+        if len(rows) < bloco:
+            return
+        cursor = rows[-1][0]
+
+
+def resposta_listagem(query, model, colunas: Dict, geometrias: Dict, cursor, limit, formato: str = "json") -> Response:
+    """
+    Resposta em streaming para `query` (já filtrada). `colunas` = nome -> coluna do modelo,
+    `geometrias` = nome -> coluna geométrica (serializada por ST_AsGeoJSON).
+    """
+    linhas = _linhas(query, model, colunas, geometrias, cursor, limit)
+
+    def ndjson() -> Iterator[bytes]:
+        buffer = []
+        for _, texto in linhas:
+            buffer.append(texto)
+            if len(buffer) >= LOTE_LEITURA:
+                yield ("\n".join(buffer) + "\n").encode()
+                buffer = []
+        if buffer:
+            yield ("\n".join(buffer) + "\n").encode()
+
+    def array_json() -> Iterator[bytes]:
+        yield b'{"results":['
+        n, ultimo, buffer = 0, None, []
+        for est_id, texto in linhas:
+            buffer.append(texto if n == 0 else "," + texto)
+            n, ultimo = n + 1, est_id
+            if len(buffer) >= LOTE_LEITURA:
+                yield "".join(buffer).encode()
+                buffer = []
+        # página cheia: o cliente continua a partir do último id
+        proximo = ultimo if limit is not None and n == limit and n > 0 else None
+        yield ("".join(buffer) + f'],"count":{n},"next_cursor":{json.dumps(proximo)}}}').encode()
+
+    if formato == "ndjson":
+        corpo, mimetype = ndjson(), "application/x-ndjson"
+    else:
+        corpo, mimetype = array_json(), "application/json"
+    headers = {"Vary": "Accept-Encoding", "X-Accel-Buffering": "no"}
+    if aceita_gzip():
+        corpo = comprimir_stream(corpo)
+        headers["Content-Encoding"] = "gzip"
+    return Response(stream_with_context(corpo), mimetype=mimetype, headers=headers)
+
+
+def listar(query, model, colunas: Dict, geometrias: Dict):
+    """Lê cursor/limit/formato de `request.args` e devolve a resposta (ou erro 400)."""
+    try:
+        cursor, limit = parametros_paginacao(request.args)
+    except ValueError:
+        return {"error": "cursor/limit inválidos"}, 400
+    formato = (request.args.get("formato") or "json").lower()
+    if formato not in ("json", "ndjson"):
+        return {"error": "formato deve ser json ou ndjson"}, 400
+    return resposta_listagem(query, model, colunas, geometrias, cursor, limit, formato)
@@ -0,0 +1,36 @@
+"""Cache LRU em processo, limitado por número de itens (respostas gzip, diagramas, tabelas de campo)."""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRU:
+    """Cache LRU simples e thread-safe (chave -> valor)."""
+
+    def __init__(self, max_itens: int = 512):
+        self.max_itens = max_itens
+        self._itens: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave: Hashable) -> Optional[Any]:
+        with self._lock:
+            valor = self._itens.get(chave)
+            if valor is not None:
+                self._itens.move_to_end(chave)
+            return valor
+
+    def set(self, chave: Hashable, valor: Any) -> None:
+        with self._lock:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def __contains__(self, chave: Hashable) -> bool:
+        """Presença da chave, sem alterar a ordem de uso."""
+        with self._lock:
+            return chave in self._itens
+
+    def __len__(self) -> int:
+        return len(self._itens)
@@ -0,0 +1,178 @@
+"""
+Tiles vetoriais (Mapbox Vector Tile) gerados no PostGIS com ST_AsMVT/ST_AsMVTGeom.
+
+- Camadas: estações FM/TV/RadCom (pontos) e contornos (`resultados_cobertura`, polígonos).
+- Atributos por zoom: zooms baixos levam só o essencial; os demais entram a partir de `zoom_min`.
+- Pontos abaixo de MVT_ZOOM_AGRUPAMENTO são agrupados numa grade de GRADE_AGRUPAMENTO² células por
+  tile (atributo `n` = estações na célula), então o tamanho do tile não cresce com o número de estações.
+- Polígonos são simplificados (ST_SimplifyPreserveTopology) com tolerância de uma unidade do tile.
+- Cache no kvstore (gzip), chave com a versão dos dados (`app.utils.versoes`); cargas novas
+  invalidam os tiles sem varredura de chaves.
+"""
+
+import hashlib
+from typing import Dict
+
+import sqlalchemy as sa
+from flask import current_app
+
+from app import db
+from app.models import ResultadoCobertura, Simulacao
+from app.utils.estacoes import canonico
+from app.utils.http import comprimir
+from app.utils.kvstore import get_store
+from app.utils.versoes import versao
+
+EXTENT = 4096
+BUFFER = 64
+GRADE_AGRUPAMENTO = 64
+CIRCUNFERENCIA_M = 40075016.685578488  # largura do mundo em EPSG:3857
+
+CAMADAS: Dict[str, dict] = {
+    "estacoes_fm": {
+        "tabela": "estacoes_fm",
+        "tipo": "ponto",
+        "atributos": (
+            (0, ("id", "servico", "classe")),
+            (8, ("canal", "freq_mhz", "erp_max_kw", "uf", "municipio", "entidade", "status")),
+        ),
+        "filtros": {"uf": str.upper, "servico": str.upper},
+    },
+    "estacoes_tv": {
+        "tabela": "estacoes_tv",
+        "tipo": "ponto",
+        "atributos": (
+            (0, ("id", "servico", "tecnologia", "classe")),
+            (8, ("canal", "freq_mhz", "erp_max_kw", "uf", "municipio", "entidade", "status")),
+        ),
+        "filtros": {"uf": str.upper, "servico": str.upper, "tecnologia": str.lower},
+    },
+    "estacoes_radcom": {
+        "tabela": "estacoes_radcom",
+        "tipo": "ponto",
+        "atributos": ((0, ("id",)), (8, ("canal", "erp_w", "altura_sistema_m", "municipio_outorga"))),
+        "filtros": {},
+    },
+    "resultados_cobertura": {
+        "tabela": "resultados_cobertura",
+        "tipo": "poligono",
+        "atributos": ((0, ("id", "simulacao_id", "tipo_contorno", "nivel_campo_dbuv_m")),),
+        "filtros": {"simulacao_id": str, "tipo_contorno": str},
+    },
+}
+
+
+def tile_valido(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= 22 and 0 <= x < 2**z and 0 <= y < 2**z
+
+
+def normalizar_filtros(camada: str, args) -> Dict[str, str]:
+    """Filtros aceitos pela camada (demais parâmetros são ignorados)."""
+    conversores = CAMADAS[camada]["filtros"]
+    return {nome: conv(args[nome]) for nome, conv in conversores.items() if args.get(nome)}
+
+
+def _atributos(camada: str, z: int) -> list:
+    return [col for zoom_min, cols in CAMADAS[camada]["atributos"] if z >= zoom_min for col in cols]
+
+
+def versao_camada(camada: str, filtros: Dict[str, str]) -> str:
+    """
+    Versão dos dados da camada. Estações: contador em `versoes_dados` (incrementado pelas cargas).
+    RadCom não tem carga que incremente o contador: entram também contagem e maior id da tabela.
+    Contornos são imutáveis: por simulação vale o `updated_at` da simulação; sem filtro, o maior id.
+    """
+    if camada == "estacoes_radcom":
+        total, maior = db.session.execute(sa.text("SELECT count(*), max(id) FROM estacoes_radcom")).one()
+        return f"{versao(camada)}-{total}-{maior or 0}"
+    if camada != "resultados_cobertura":
+        return str(versao(camada))
+    if filtros.get("simulacao_id"):
+        sim = Simulacao.query.get(filtros["simulacao_id"])
+        return sim.updated_at.isoformat() if sim and sim.updated_at else "0"
+    return str(db.session.query(sa.func.max(ResultadoCobertura.id)).scalar() or 0)
+
+
+def _sql_tile(camada: str, z: int, filtros: Dict[str, str]) -> str:
+    conf = CAMADAS[camada]
+    cols = _atributos(camada, z)
+    where = ["t.geom && ST_Transform(env.m_buffer, 4674)"]
+    where += [f"t.{nome} = :f_{nome}" for nome in filtros]
+    where_sql = " AND ".join(where)
+    env = (
+        "SELECT ST_TileEnvelope(:z, :x, :y) AS m, "
+        f"ST_TileEnvelope(:z, :x, :y, margin => {BUFFER / EXTENT}) AS m_buffer"
+    )
+    if conf["tipo"] == "ponto" and z < current_app.config.get("MVT_ZOOM_AGRUPAMENTO", 8):
+        # um ponto por célula da grade; `id` = menor id da célula
+        return f"""
+            WITH env AS ({env}),
+            pts AS (
+                SELECT ST_Transform(t.geom, 3857) AS g, t.id
+                FROM {conf['tabela']} t, env WHERE {where_sql}
+            ),
+            q AS (
+                SELECT ST_AsMVTGeom(
+                           ST_Centroid(ST_Collect(pts.g)), (SELECT m FROM env), {EXTENT}, {BUFFER}, true
+                       ) AS geom,
+                       count(*) AS n, min(pts.id) AS id
+                FROM pts
+                GROUP BY ST_SnapToGrid(pts.g, :celula)
+            )
+            SELECT ST_AsMVT(q, :camada, {EXTENT}, 'geom') FROM q WHERE q.geom IS NOT NULL
+        """
+    geom = "ST_Transform(t.geom, 3857)"
+    if conf["tipo"] == "poligono":
+        geom = f"ST_SimplifyPreserveTopology({geom}, :tolerancia)"
+    atributos = ", ".join(f"t.{c}" for c in cols)
+    return f"""
+        WITH env AS ({env}),
+        q AS (
+            SELECT ST_AsMVTGeom({geom}, env.m, {EXTENT}, {BUFFER}, true) AS geom, {atributos}
+            FROM {conf['tabela']} t, env WHERE {where_sql}
+        )
+        SELECT ST_AsMVT(q, :camada, {EXTENT}, 'geom') FROM q WHERE q.geom IS NOT NULL
+    """
+
+
+def renderizar(camada: str, z: int, x: int, y: int, filtros: Dict[str, str]) -> bytes:
+    """Tile MVT (sem compressão) direto do PostGIS."""
+    largura_m = CIRCUNFERENCIA_M / 2**z
+    params = {
+        "z": z,
+        "x": x,
+        "y": y,
+        "camada": camada,
+        "celula": largura_m / GRADE_AGRUPAMENTO,
+        "tolerancia": largura_m / EXTENT,
+        **{f"f_{nome}": valor for nome, valor in filtros.items()},
+    }
+    dados = db.session.execute(sa.text(_sql_tile(camada, z, filtros)), params).scalar()
+    return bytes(dados or b"")
+
+
+def chave_cache(camada: str, versao_dados: str, filtros: Dict[str, str], z: int, x: int, y: int) -> str:
+    sufixo = hashlib.sha1(canonico(filtros).encode()).hexdigest()[:12] if filtros else "-"
+    return f"mvt:{camada}:{versao_dados}:{sufixo}:{z}/{x}/{y}"
+
+
+def tile_gzip(camada: str, z: int, x: int, y: int, filtros: Dict[str, str]) -> tuple[bytes, str]:
+    """(tile comprimido em gzip, chave de cache); usa o cache quando disponível."""
+    chave = chave_cache(camada, versao_camada(camada, filtros), filtros, z, x, y)
+    store = None
+    try:
+        store = get_store()
+        em_cache = store.get(chave)
+        if em_cache is not None:
+            return bytes(em_cache), chave
+    except Exception:
+        current_app.logger.warning("Cache de tiles indisponível", exc_info=True)
+    dados = comprimir(renderizar(camada, z, x, y, filtros))
+    if store is not None:
+        try:
+            store.set(chave, dados, ex=current_app.config.get("MVT_CACHE_TTL_S", 86400))
+        except Exception:
+            current_app.logger.warning("Falha ao gravar tile %s no cache", chave, exc_info=True)
+    return dados, chave
+
+
@@ -0,0 +1,63 @@
+"""
+Registro em memória das tabelas de proteção (C/I) usadas nos cálculos de interferência.
+
+Os tasks de viabilidade consultam a norma par a par via ORM; jobs em lote (matriz de
+interferência) usam um snapshot único e resolvem C/I sem ida ao banco. `registro_normas` mantém o
+snapshot em processo (carregado no aquecimento, antes do fork) e o recarrega quando a versão
+"normas" muda (`load_normas`).
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from app.models import NormasFMProtecao, NormasTVProtecao
+from app.utils.versoes import versao
+
+_snapshot: dict = {}
+_snapshot_lock = threading.Lock()
+
+
+class RegistroNormas:
+    def __init__(
+        self,
+        fm_protecao: List[Tuple[Optional[float], float]],
+        tv_protecao: Dict[Tuple[str, str, str], float],
+    ):
+        self.fm_protecao = fm_protecao  # [(delta_f_khz, ci_requerida_db)]
+        self.tv_protecao = tv_protecao  # {(tec_desejado, tec_interferente, delta_canal): ci_requerida_db}
+
+    def ci_fm(self, df_khz: float) -> Optional[float]:
+        """C/I da norma com delta_f mais próximo (mesma regra de `_norma_por_delta`, nulos por último)."""
+        if not self.fm_protecao:
+            return None
+        _, ci = min(
+            self.fm_protecao,
+            key=lambda item: (item[0] is None, abs(item[0] - df_khz) if item[0] is not None else 0.0),
+        )
+        return ci
+
+    def ci_tv(self, delta_label: str, tec_desejado: str, tec_intf: str) -> Optional[float]:
+        return self.tv_protecao.get((tec_desejado, tec_intf, delta_label))
+
+    def labels_tv(self, tec_desejado: str) -> set[str]:
+        """Rótulos de Δcanal com norma para a tecnologia desejada (poda de pares por canal)."""
+        return {lbl for (tec_des, _, lbl) in self.tv_protecao if tec_des == tec_desejado}
+
+
+def carregar_registro() -> RegistroNormas:
+    """Snapshot das normas de proteção FM/TV."""
+    fm = [(n.delta_f_khz, n.ci_requerida_db) for n in NormasFMProtecao.query.order_by(NormasFMProtecao.id)]
+    tv: Dict[Tuple[str, str, str], float] = {}
+    for n in NormasTVProtecao.query.order_by(NormasTVProtecao.id):
+        # primeira linha por chave prevalece (igual a `_norma_tv`, ordenado por id)
+        tv.setdefault((n.tecnologia_desejado, n.tecnologia_interferente, n.delta_canal), n.ci_requerida_db)
+    return RegistroNormas(fm, tv)
+
+
+def registro_normas() -> RegistroNormas:
+    """Snapshot em processo das normas de proteção, recarregado se a versão "normas" mudou."""
+    atual = versao("normas")
+    with _snapshot_lock:
+        if _snapshot.get("versao") != atual:
+            _snapshot.update(versao=atual, registro=carregar_registro())
+        return _snapshot["registro"]
@@ -0,0 +1,92 @@
+"""
+Estimativa de população por grade nacional pré-calculada (ver `app.utils.etl.build_pop_grid`).
+
+A grade (float32, habitantes por célula de POP_GRADE_RES_GRAUS) é lida por memmap; a estimativa de
+um contorno soma as células cujo centro está dentro do polígono (`shapely.contains_xy` vetorizado
+sobre o recorte do bbox). Erro limitado às células de borda; o caminho exato (PostGIS) continua
+disponível em `/contornos/<id>/stats?modo=exato`.
+"""
+
+import json
+import math
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+import shapely
+from flask import current_app
+
+RAIO_TERRA_KM = 6371.0088
+ARQUIVO_GRADE = "pop_grid.npy"
+ARQUIVO_META = "pop_grid.json"
+
+_grade: dict = {}
+_grade_lock = threading.Lock()
+
+
+def diretorio_grade() -> str:
+    return current_app.config.get("POP_GRADE_DIR", "data/pop_grid")
+
+
+def carregar_grade(diretorio: Optional[str] = None) -> Optional[tuple[np.ndarray, dict]]:
+    """(array memmap [linha, coluna], metadados) ou None se a grade não foi gerada; recarrega se o arquivo mudar."""
+    diretorio = diretorio or diretorio_grade()
+    caminho = os.path.join(diretorio, ARQUIVO_GRADE)
+    try:
+        mtime = os.path.getmtime(caminho)
+    except OSError:
+        return None
+    with _grade_lock:
+        if _grade.get("chave") != (caminho, mtime):
+            with open(os.path.join(diretorio, ARQUIVO_META), encoding="utf-8") as fh:
+                meta = json.load(fh)
+            _grade.update(chave=(caminho, mtime), dados=np.load(caminho, mmap_mode="r"), meta=meta)
+        return _grade["dados"], _grade["meta"]
+
+
+def _area_anel_km2(coords) -> float:
+    """Área de um anel lon/lat na esfera (aproximação de Chamberlain & Duquette)."""
+    arr = np.radians(np.asarray(coords, dtype=np.float64)[:, :2])
+    if len(arr) < 3:
+        return 0.0
+    lon, lat = arr[:, 0], arr[:, 1]
+    soma = np.sum((np.roll(lon, -1) - lon) * (2 + np.sin(lat) + np.sin(np.roll(lat, -1))))
+    return abs(float(soma)) * RAIO_TERRA_KM**2 / 2.0
+
+
+def area_km2(geom) -> float:
+    """Área geodésica aproximada (esfera) de um Polygon/MultiPolygon em graus."""
+    total = 0.0
+    for poligono in getattr(geom, "geoms", [geom]):
+        total += _area_anel_km2(poligono.exterior.coords)
+        total -= sum(_area_anel_km2(anel.coords) for anel in poligono.interiors)
+    return total
+
+
+def estimar_grade(geom, grade: tuple[np.ndarray, dict]) -> dict:
+    """Área e população dentro de `geom` (shapely, SRID 4674) somando as células da grade."""
+    dados, meta = grade
+    xmin, ymin, res = meta["xmin"], meta["ymin"], meta["res"]
+    nlin, ncol = dados.shape
+    minx, miny, maxx, maxy = geom.bounds
+    c0 = max(0, int(math.floor((minx - xmin) / res)))
+    c1 = min(ncol, int(math.ceil((maxx - xmin) / res)))
+    l0 = max(0, int(math.floor((miny - ymin) / res)))
+    l1 = min(nlin, int(math.ceil((maxy - ymin) / res)))
+    pop = 0.0
+    celulas = 0
+    if c1 > c0 and l1 > l0:
+        xs = xmin + (np.arange(c0, c1) + 0.5) * res
+        ys = ymin + (np.arange(l0, l1) + 0.5) * res
+        xx, yy = np.meshgrid(xs, ys)
+        shapely.prepare(geom)
+        mascara = shapely.contains_xy(geom, xx, yy)
+        pop = float(np.asarray(dados[l0:l1, c0:c1])[mascara].sum(dtype=np.float64))
+        celulas = int(mascara.sum())
+    return {
+        "area_km2": area_km2(geom),
+        "pop_estimada": pop,
+        "celulas": celulas,
+        "versao_censo": meta.get("versao_censo"),
+    }
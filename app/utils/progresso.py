@@ -0,0 +1,199 @@
+"""
+Eventos de progresso das simulações via Redis pub/sub (ver `app.utils.kvstore`).
+
+- Canal `simulacao:<id>:eventos`: eventos JSON publicados pelos tasks (radiais, interferentes,
+  tempos por etapa) e pelas mudanças de status gravadas no banco.
+- Chave `simulacao:<id>:ultimo`: último evento, para quem conecta depois (SSE/status).
+- Chave `simulacao:<id>:cancelar`: pedido de cancelamento, verificado pelos tasks a cada bloco.
+- Chaves `simulacao:<id>:checkpoint:<nome>`: estado parcial (radiais, interferentes) para retomada
+  quando a mensagem é reentregue a outro worker (acks_late).
+Publicação nunca derruba o cálculo: falhas de Redis são apenas registradas em log.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, attributes
+
+from app.utils.kvstore import get_store
+
+TTL_S = 86400
+STATUS_FINAIS = ("done", "failed", "cancelled")
+
+
+class SimulacaoCancelada(Exception):
+    """Levantada num ponto de verificação quando o cancelamento da simulação foi solicitado."""
+
+
+def _canal(sim_id: str) -> str:
+    return f"simulacao:{sim_id}:eventos"
+
+
+def _chave_ultimo(sim_id: str) -> str:
+    return f"simulacao:{sim_id}:ultimo"
+
+
+def _chave_cancelar(sim_id: str) -> str:
+    return f"simulacao:{sim_id}:cancelar"
+
+
+def _chave_checkpoint(sim_id: str, nome: str) -> str:
+    return f"simulacao:{sim_id}:checkpoint:{nome}"
+
+
+def publicar(sim_id: str, evento: str, **dados) -> None:
+    """Publica um evento de progresso (e guarda como último evento da simulação)."""
+    payload = json.dumps({"sim_id": sim_id, "evento": evento, "ts": time.time(), **dados}, default=str)
+    try:
+        store = get_store()
+        store.set(_chave_ultimo(sim_id), payload, ex=TTL_S)
+        store.publish(_canal(sim_id), payload)
+    except Exception:
+        current_app.logger.warning("Falha ao publicar progresso da simulação %s", sim_id, exc_info=True)
+
+
+def ultimo_evento(sim_id: str) -> Optional[dict]:
+    try:
+        raw = get_store().get(_chave_ultimo(sim_id))
+    except Exception:
+        return None
+    return json.loads(raw) if raw else None
+
+
+def solicitar_cancelamento(sim_id: str) -> None:
+    get_store().set(_chave_cancelar(sim_id), "1", ex=TTL_S)
+
+
+def cancelamento_solicitado(sim_id: str) -> bool:
+    try:
+        return bool(get_store().exists(_chave_cancelar(sim_id)))
+    except Exception:
+        current_app.logger.warning("Falha ao consultar cancelamento da simulação %s", sim_id, exc_info=True)
+        return False
+
+
+def eventos(sim_id: str, heartbeat_s: float = 15.0, max_s: float = 600.0) -> Iterator[Optional[dict]]:
+    """
+    Gera eventos da simulação: primeiro o último conhecido, depois os publicados.
+    Gera None a cada `heartbeat_s` sem eventos; encerra em status final ou após `max_s`.
+    """
+    store = get_store()
+    pubsub = store.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(_canal(sim_id))
+    try:
+        # Assina antes de ler o último evento para não perder nada entre as duas operações.
+        ultimo = ultimo_evento(sim_id)
+        if ultimo:
+            yield ultimo
+            if ultimo.get("evento") == "status" and ultimo.get("status") in STATUS_FINAIS:
+                return
+        inicio = time.monotonic()
+        ultimo_envio = inicio
+        while time.monotonic() - inicio < max_s:
+            msg = pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if msg and msg.get("type") == "message":
+                dados = json.loads(msg["data"])
+                ultimo_envio = time.monotonic()
+                yield dados
+                if dados.get("evento") == "status" and dados.get("status") in STATUS_FINAIS:
+                    return
+            elif time.monotonic() - ultimo_envio >= heartbeat_s:
+                ultimo_envio = time.monotonic()
+                yield None
+    finally:
+        pubsub.close()
+
+
+class Progresso:
+    """
+    Publicador de progresso de um task (contadores e tempos por etapa). A cada bloco de `passo`
+    itens também grava o checkpoint do estado parcial e verifica o pedido de cancelamento.
+    """
+
+    def __init__(self, sim_id: str, passo: int = 10):
+        self.sim_id = sim_id
+        self.passo = passo  # publica contadores a cada `passo` itens (e no último)
+        self.tempos: dict = {}
+        self._checkpoints: set = set()
+
+    def verificar_cancelamento(self) -> None:
+        if cancelamento_solicitado(self.sim_id):
+            raise SimulacaoCancelada(self.sim_id)
+
+    def checkpoint(self, nome: str, estado: dict) -> None:
+        self._checkpoints.add(nome)
+        try:
+            get_store().set(_chave_checkpoint(self.sim_id, nome), json.dumps(estado, default=str), ex=TTL_S)
+        except Exception:
+            current_app.logger.warning("Falha ao gravar checkpoint %s da simulação %s", nome, self.sim_id, exc_info=True)
+
+    def retomar(self, nome: str) -> Optional[dict]:
+        """Estado parcial gravado por uma execução anterior interrompida (ou None)."""
+        self._checkpoints.add(nome)
+        try:
+            raw = get_store().get(_chave_checkpoint(self.sim_id, nome))
+        except Exception:
+            return None
+        return json.loads(raw) if raw else None
+
+    def limpar(self) -> None:
+        """Remove checkpoints e pedido de cancelamento (fim da simulação)."""
+        try:
+            get_store().delete(
+                _chave_cancelar(self.sim_id), *(_chave_checkpoint(self.sim_id, n) for n in self._checkpoints)
+            )
+        except Exception:
+            current_app.logger.warning("Falha ao limpar checkpoints da simulação %s", self.sim_id, exc_info=True)
+
+    @contextmanager
+    def etapa(self, nome: str):
+        t0 = time.perf_counter()
+        publicar(self.sim_id, "etapa_inicio", etapa=nome)
+        try:
+            yield
+        finally:
+            self.tempos[nome] = round(time.perf_counter() - t0, 3)
+            publicar(self.sim_id, "etapa_fim", etapa=nome, duracao_s=self.tempos[nome])
+
+    def _contador(self, evento: str, feitos: int, total: int, estado: Optional[dict]) -> None:
+        if feitos == total or feitos % self.passo == 0:
+            publicar(self.sim_id, evento, feitos=feitos, total=total)
+            if estado is not None:
+                self.checkpoint(evento, estado)
+            self.verificar_cancelamento()
+
+    def radiais(self, feitos: int, total: int, estado: Optional[dict] = None) -> None:
+        self._contador("radiais", feitos, total, estado)
+
+    def interferentes(self, feitos: int, total: int, estado: Optional[dict] = None) -> None:
+        self._contador("interferentes", feitos, total, estado)
+
+
+def _coletar_status(session: Session, flush_context) -> None:
+    from app.models import Simulacao  # late import (modelos importam a app)
+
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Simulacao) and attributes.get_history(obj, "status").has_changes():
+            session.info.setdefault("_sim_status", {})[obj.id] = (obj.status, obj.mensagem_status)
+
+
+def _publicar_status(session: Session) -> None:
+    for sim_id, (status, mensagem) in session.info.pop("_sim_status", {}).items():
+        publicar(sim_id, "status", status=status, mensagem=mensagem)
+
+
+def _descartar_status(session: Session) -> None:
+    session.info.pop("_sim_status", None)
+
+
+def registrar_eventos_status() -> None:
+    """Publica mudanças de `Simulacao.status` após o commit (todas as tasks, sem chamadas explícitas)."""
+    if event.contains(Session, "after_flush", _coletar_status):
+        return
+    event.listen(Session, "after_flush", _coletar_status)
+    event.listen(Session, "after_commit", _publicar_status)
+    event.listen(Session, "after_rollback", _descartar_status)
@@ -0,0 +1,67 @@
+"""
+Diagramas de antena (`erp_por_radial`: 72 radiais de 5°, ganho relativo em dBd) e ERP por azimute.
+
+- `decodificar` converte a lista do banco num array float uma vez; `diagrama_estacao` mantém os
+  diagramas decodificados num LRU por hash técnico da estação.
+- `Diagrama.ganho_db`/`erp_kw` interpolam (linear em dB, circular) para qualquer conjunto de
+  azimutes numa única chamada vetorizada — inclusive radiais adaptativos fora da grade de 5°.
+- `aplicar_erp` escala campos de 1 kW (curvas P.1546) para a ERP de cada radial.
+"""
+
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from app.utils.estacoes import hash_estacao
+from app.utils.lru import LRU
+
+PASSO_GRAUS = 5
+AZIMUTES_BASE = np.arange(0, 360, PASSO_GRAUS, dtype=float)
+ERP_MIN_KW = 0.001
+
+Azimutes = Union[float, Sequence[float], np.ndarray]
+
+_cache = LRU(max_itens=4096)
+
+
+class Diagrama:
+    def __init__(self, ganhos_db: Optional[np.ndarray] = None):
+        self.ganhos_db = ganhos_db  # None = omnidirecional
+
+    @property
+    def omnidirecional(self) -> bool:
+        return self.ganhos_db is None
+
+    def ganho_db(self, azimutes: Azimutes) -> np.ndarray:
+        az = np.mod(np.asarray(azimutes, dtype=float), 360.0)
+        if self.ganhos_db is None:
+            return np.zeros(az.shape)
+        return np.interp(az, AZIMUTES_BASE, self.ganhos_db, period=360.0)
+
+    def erp_kw(self, erp_max_kw: Optional[float], azimutes: Azimutes) -> np.ndarray:
+        """ERP (kW) em cada azimute: ERP máxima × ganho relativo do diagrama (piso ERP_MIN_KW)."""
+        return np.maximum(ERP_MIN_KW, (erp_max_kw or 1.0) * 10 ** (self.ganho_db(azimutes) / 10.0))
+
+
+def decodificar(erp_por_radial: Optional[list]) -> Diagrama:
+    """Lista de 72 ganhos (None = 0 dB) -> Diagrama; qualquer outro formato é tratado como omnidirecional."""
+    if not erp_por_radial or len(erp_por_radial) != len(AZIMUTES_BASE):
+        return Diagrama()
+    return Diagrama(np.array([g or 0.0 for g in erp_por_radial], dtype=float))
+
+
+def diagrama_estacao(servico: str, est) -> Diagrama:
+    """Diagrama decodificado da estação, em cache por hash técnico (muda junto com `erp_por_radial`)."""
+    chave = hash_estacao(servico, est)
+    if chave is None:
+        return decodificar(getattr(est, "erp_por_radial", None))
+    diagrama = _cache.get(chave)
+    if diagrama is None:
+        diagrama = decodificar(est.erp_por_radial)
+        _cache.set(chave, diagrama)
+    return diagrama
+
+
+def aplicar_erp(campo_1kw_dbuv_m: Union[float, np.ndarray], erp_kw: Union[float, np.ndarray]) -> np.ndarray:
+    """Campo (dBµV/m) para a ERP dada a partir do campo de referência de 1 kW."""
+    return np.asarray(campo_1kw_dbuv_m, dtype=float) + 10.0 * np.log10(np.maximum(ERP_MIN_KW, erp_kw))
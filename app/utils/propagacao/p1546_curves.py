@@ -4,15 +4,21 @@ Fonte: data/Tabulated field strength values P1546.xls
 
 Suporta interpolação em distância, altura efetiva e frequência (linear no log10 da frequência).
 Os tempos disponíveis são 50%, 10% e 1%; escolhemos o tempo mais próximo solicitado.
+`campos_p1546` avalia arrays de distância/altura para vários tempos numa passada.
+`tabela_campo` devolve, por (freq, tempo, path), uma grade densa já interpolada em frequência
+(LRU em processo): cada avaliação vira um lookup bilinear num array contíguo.
 """
 
 import math
 import os
 from functools import lru_cache
-from typing import Dict, List, Tuple
+from typing import Dict, List, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
+from app.utils.lru import LRU
+
 CURVES_XLS = os.path.join("data", "Tabulated field strength values P1546.xls")
 
 
@@ -152,8 +158,8 @@ def _interp_dataset(ds: CurveDataset, dist_km: float, h_eff_m: float) -> float:
     return v0 + (v1 - v0) * td
 
 
-def field_strength_p1546(freq_mhz: float, dist_km: float, h_eff_m: float, time_percent: float = 50.0, path: str = "Land") -> float:
-    """Interpolação da intensidade de campo (dBµV/m) a partir das curvas tabuladas."""
+def _selecionar(freq_mhz: float, time_percent: float, path: str) -> Tuple[CurveDataset, CurveDataset, float]:
+    """(dataset f0, dataset f1, peso log-frequência) para o path e o tempo tabulado mais próximo."""
     datasets = load_curves()
     
     if not datasets:
@@ -197,18 +203,148 @@ def field_strength_p1546(freq_mhz: float, dist_km: float, h_eff_m: float, time_p
     # Nota: Assume-se que só há um dataset por (freq, time, path)
     d0 = [d for d in ds_time if d.freq_mhz == f0][0]
     d1 = [d for d in ds_time if d.freq_mhz == f1][0]
+    if f0 == f1:
+        return d0, d1, 0.0
+    # Interpolação linear no logaritmo da frequência
+    w = (math.log10(freq_mhz) - math.log10(f0)) / (math.log10(f1) - math.log10(f0))
+    return d0, d1, w
+
 
+def field_strength_p1546(freq_mhz: float, dist_km: float, h_eff_m: float, time_percent: float = 50.0, path: str = "Land") -> float:
+    """Interpolação da intensidade de campo (dBµV/m) a partir das curvas tabuladas."""
+    d0, d1, w = _selecionar(freq_mhz, time_percent, path)
     v0 = _interp_dataset(d0, dist_km, h_eff_m)
-    
-    if f0 == f1:
+    if d1 is d0:
         return v0
-        
     v1 = _interp_dataset(d1, dist_km, h_eff_m)
-    
-    # Interpolação linear no logaritmo da frequência
-    w = (math.log10(freq_mhz) - math.log10(f0)) / (math.log10(f1) - math.log10(f0))
     return v0 + (v1 - v0) * w
 
+
+# --- Avaliação vetorizada (vários tempos numa passada) ---
+
+
+def _arrays(ds: CurveDataset) -> Tuple[np.ndarray, np.ndarray, np.ndarray, tuple]:
+    """Tabela do dataset como arrays numpy (compilada uma vez) + chave da grade distância × altura."""
+    compilado = getattr(ds, "_compilado", None)
+    if compilado is None:
+        compilado = (
+            np.asarray(ds.distances, dtype=float),
+            np.asarray(ds.heights, dtype=float),
+            np.asarray(ds.fields, dtype=float),
+            (tuple(ds.distances), tuple(ds.heights)),
+        )
+        ds._compilado = compilado
+    return compilado
+
+
+def _bracketing(values: np.ndarray, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Versão vetorizada de `_find_bracketing`: (índice inferior, fração), saturando nas pontas."""
+    if len(values) < 2:
+        return np.zeros(x.shape, dtype=int), np.zeros(x.shape)
+    i = np.clip(np.searchsorted(values, x, side="left") - 1, 0, len(values) - 2)
+    t = np.clip((x - values[i]) / (values[i + 1] - values[i]), 0.0, 1.0)
+    return i, t
+
+
+def _interp_arrays(ds: CurveDataset, bracket: tuple) -> np.ndarray:
+    _, _, campos, _ = _arrays(ds)
+    (i, td), (j, th) = bracket
+    j1 = np.minimum(j + 1, campos.shape[1] - 1)
+    i1 = np.minimum(i + 1, campos.shape[0] - 1)
+    v0 = campos[i, j] + (campos[i, j1] - campos[i, j]) * th
+    v1 = campos[i1, j] + (campos[i1, j1] - campos[i1, j]) * th
+    return v0 + (v1 - v0) * td
+
+
+def campos_p1546(
+    freq_mhz: float,
+    dist_km,
+    h_eff_m,
+    tempos: Sequence[float] = (50.0,),
+    path: str = "Land",
+) -> Dict[float, np.ndarray]:
+    """
+    Campos (dBµV/m, 1 kW) para vários percentuais de tempo numa única passada vetorizada:
+    `dist_km`/`h_eff_m` são escalares ou arrays (broadcast); o bracketing em distância/altura é
+    feito uma vez por grade e compartilhado por todos os tempos/frequências.
+    Retorna {tempo: array}.
+    """
+    dist, h = np.broadcast_arrays(np.asarray(dist_km, dtype=float), np.asarray(h_eff_m, dtype=float))
+    brackets: Dict[tuple, tuple] = {}
+    saida: Dict[float, np.ndarray] = {}
+    for tempo in tempos:
+        d0, d1, w = _selecionar(freq_mhz, tempo, path)
+        valores = []
+        for ds in (d0,) if d1 is d0 else (d0, d1):
+            dists, alturas, _, grade = _arrays(ds)
+            if grade not in brackets:
+                brackets[grade] = (_bracketing(dists, dist), _bracketing(alturas, h))
+            valores.append(_interp_arrays(ds, brackets[grade]))
+        saida[tempo] = valores[0] if len(valores) == 1 else valores[0] + (valores[1] - valores[0]) * w
+    return saida
+
+
+# --- Tabela densa por (freq, tempo, path) ---
+
+PONTOS_DISTANCIA = 512  # grade uniforme em log10(distância), do 1º ao último km tabulado
+PONTOS_ALTURA = 128  # grade uniforme em log10(altura efetiva), da 1ª à última altura tabulada
+
+_tabelas = LRU(max_itens=64)  # ~0,5 MB por tabela
+
+
+class TabelaCampo:
+    """
+    Campo (dBµV/m, 1 kW) de um (freq, tempo, path) amostrado numa grade log-distância × log-altura.
+    A interpolação em frequência (pesos fixos para a estação) é feita uma vez, na construção;
+    fora da faixa tabulada os valores saturam nas bordas, como em `field_strength_p1546`.
+    """
+
+    def __init__(self, freq_mhz: float, time_percent: float, path: str,
+                 pontos_distancia: int = PONTOS_DISTANCIA, pontos_altura: int = PONTOS_ALTURA):
+        d0, d1, _ = _selecionar(freq_mhz, time_percent, path)
+        dists = np.concatenate([_arrays(d0)[0], _arrays(d1)[0]])
+        alturas = np.concatenate([_arrays(d0)[1], _arrays(d1)[1]])
+        self._eixo_d = self._eixo(dists.min(), dists.max(), pontos_distancia)
+        self._eixo_h = self._eixo(alturas.min(), alturas.max(), pontos_altura)
+        grade_d = np.logspace(np.log10(dists.min()), np.log10(dists.max()), pontos_distancia)
+        grade_h = np.logspace(np.log10(alturas.min()), np.log10(alturas.max()), pontos_altura)
+        tempo = float(time_percent)
+        self.campos = np.ascontiguousarray(
+            campos_p1546(freq_mhz, grade_d[:, None], grade_h[None, :], (tempo,), path)[tempo]
+        )
+
+    @staticmethod
+    def _eixo(minimo: float, maximo: float, n: int) -> tuple:
+        """(mínimo, máximo, log10 do mínimo, pontos por década, último índice de célula)."""
+        return float(minimo), float(maximo), math.log10(minimo), (n - 1) / math.log10(maximo / minimo), n - 2
+
+    @staticmethod
+    def _indice(x: np.ndarray, eixo: tuple) -> Tuple[np.ndarray, np.ndarray]:
+        minimo, maximo, log_min, escala, ultimo = eixo
+        pos = (np.log10(np.minimum(np.maximum(x, minimo), maximo)) - log_min) * escala
+        i = np.minimum(pos.astype(np.intp), ultimo)
+        return i, pos - i
+
+    def __call__(self, dist_km, h_eff_m) -> np.ndarray:
+        """Lookup bilinear; `dist_km`/`h_eff_m` escalares ou arrays (broadcast)."""
+        c = self.campos
+        i, td = self._indice(np.asarray(dist_km, dtype=float), self._eixo_d)
+        j, th = self._indice(np.asarray(h_eff_m, dtype=float), self._eixo_h)
+        v00, v01, v10, v11 = c[i, j], c[i, j + 1], c[i + 1, j], c[i + 1, j + 1]
+        v0 = v00 + (v01 - v00) * th
+        return v0 + (v10 + (v11 - v10) * th - v0) * td
+
+
+def tabela_campo(freq_mhz: float, time_percent: float = 50.0, path: str = "Land") -> TabelaCampo:
+    """Tabela densa do (freq, tempo, path), construída sob demanda e mantida no LRU."""
+    chave = (round(float(freq_mhz), 3), float(time_percent), path.lower())
+    tabela = _tabelas.get(chave)
+    if tabela is None:
+        tabela = TabelaCampo(*chave)
+        _tabelas.set(chave, tabela)
+    return tabela
+
+
 # --- Exemplo de uso ---
 if __name__ == "__main__":
     try:
@@ -0,0 +1,127 @@
+"""
+Parâmetros fixos de propagação por estação (`estacoes_propagacao`), calculados uma vez por
+hash técnico da estação e versão do terreno, em vez de a cada task:
+
+- altitude do terreno no local da estação;
+- altura efetiva por radial de 5° (estação - média do terreno entre 3 e 15 km, como
+  `terrain.effective_height`), amostrada numa única consulta vetorizada;
+- diagrama (dBd) interpolado para 360° e ERP (kW) por grau (`diagrama.Diagrama`).
+
+Gerados por `app.utils.etl.build_estacoes_propagacao`; tasks leem com `obter`/`obter_lote` e
+recaem no cálculo direto quando não há parâmetros vigentes.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from app import db
+from app.models import EstacaoFM, EstacaoPropagacao, EstacaoTV
+from app.utils.estacoes import hash_estacao
+from app.utils.propagacao.diagrama import decodificar
+from app.utils.propagacao.terrain import destination_points, sample_height, sample_heights
+from app.utils.resultados import desempacotar, empacotar
+from app.utils.versoes import versao
+
+PASSO_RADIAL_GRAUS = 5
+DIST_INICIO_M = 3000.0
+DIST_FIM_M = 15000.0
+AMOSTRAS_RADIAL = 20
+HNMT_PADRAO_M = 30.0
+
+
+@dataclass
+class Parametros:
+    altitude_m: Optional[float]
+    h_eff_m: np.ndarray  # por radial de PASSO_RADIAL_GRAUS
+    diagrama_db: np.ndarray  # 360 valores, um por grau
+    erp_kw: np.ndarray  # 360 valores, um por grau
+
+    def h_eff(self, angle: float) -> float:
+        return float(self.h_eff_m[int(round(angle / PASSO_RADIAL_GRAUS)) % len(self.h_eff_m)])
+
+    def erp(self, angle: float) -> float:
+        return float(self.erp_kw[int(angle) % 360])
+
+
+def calcular(lat: float, lon: float, hnmt_m: Optional[float], erp_max_kw: Optional[float], erp_por_radial) -> Parametros:
+    """Calcula os parâmetros de uma estação (terreno via raster/.hgt, como `effective_height`)."""
+    fallback = hnmt_m or HNMT_PADRAO_M
+    azimutes = np.arange(0, 360, PASSO_RADIAL_GRAUS, dtype=float)
+    dists = np.linspace(DIST_INICIO_M, DIST_FIM_M, AMOSTRAS_RADIAL)
+    altitude = sample_height(lat, lon)
+    if altitude is None:
+        h_eff = np.full(azimutes.shape, fallback, dtype=np.float32)
+    else:
+        lats, lons = destination_points(lat, lon, azimutes[:, None], dists[None, :])
+        alturas = sample_heights(lats.ravel(), lons.ravel()).reshape(lats.shape)
+        validas = ~np.isnan(alturas)
+        soma = np.where(validas, alturas, 0.0).sum(axis=1)
+        n = validas.sum(axis=1)
+        media = np.divide(soma, n, out=np.full(n.shape, np.nan), where=n > 0)
+        h_eff = altitude - media
+        h_eff = np.where(np.isnan(h_eff) | (h_eff <= 0), fallback, h_eff).astype(np.float32)
+    graus = np.arange(360, dtype=float)
+    diagrama = decodificar(erp_por_radial)
+    return Parametros(
+        altitude,
+        h_eff,
+        diagrama.ganho_db(graus).astype(np.float32),
+        diagrama.erp_kw(erp_max_kw, graus).astype(np.float32),
+    )
+
+
+def empacotar_parametros(servico: str, estacao_id: int, hash_tecnico: str, versao_terreno: int, p: Parametros) -> dict:
+    """Linha de `estacoes_propagacao` (dict de colunas) para os parâmetros calculados."""
+    dados, layout = empacotar({"h_eff_m": p.h_eff_m, "diagrama_db": p.diagrama_db, "erp_kw": p.erp_kw})
+    return {
+        "servico": servico,
+        "estacao_id": estacao_id,
+        "hash_tecnico": hash_tecnico,
+        "versao_terreno": versao_terreno,
+        "altitude_m": p.altitude_m,
+        "layout": layout,
+        "dados": dados,
+        "calculado_em": datetime.utcnow(),
+    }
+
+
+def _de_linha(linha: EstacaoPropagacao) -> Parametros:
+    arrays = desempacotar(linha.dados, linha.layout)
+    return Parametros(linha.altitude_m, arrays["h_eff_m"], arrays["diagrama_db"], arrays["erp_kw"])
+
+
+def obter(servico: str, est) -> Optional[Parametros]:
+    """Parâmetros vigentes da estação (mesmo hash técnico e versão do terreno) ou None."""
+    if est is None or est.id is None:
+        return None
+    linha = EstacaoPropagacao.query.get((servico, est.id))
+    if linha is None or linha.versao_terreno != versao("terreno") or linha.hash_tecnico != hash_estacao(servico, est):
+        return None
+    return _de_linha(linha)
+
+
+def obter_lote(servico: str, ids: Iterable[int]) -> Dict[int, Parametros]:
+    """
+    Parâmetros vigentes de várias estações numa consulta; hash conferido como em `obter`
+    (`hash_estacao`: o gravado na carga ou, se ainda NULL, o calculado).
+    """
+    ids = sorted({int(i) for i in ids})
+    if not ids:
+        return {}
+    modelo = EstacaoFM if servico == "fm" else EstacaoTV
+    pares = (
+        db.session.query(EstacaoPropagacao, modelo)
+        .join(modelo, modelo.id == EstacaoPropagacao.estacao_id)
+        .filter(EstacaoPropagacao.servico == servico)
+        .filter(EstacaoPropagacao.estacao_id.in_(ids))
+        .filter(EstacaoPropagacao.versao_terreno == versao("terreno"))
+        .all()
+    )
+    return {
+        linha.estacao_id: _de_linha(linha)
+        for linha, est in pares
+        if linha.hash_tecnico == hash_estacao(servico, est)
+    }
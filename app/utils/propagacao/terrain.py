@@ -5,7 +5,7 @@ Dependências: numpy; downloader `ensure_tile_loaded` para garantir o arquivo.
 
 import math
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Iterable, List, Optional, Sequence, Tuple
 
 import numpy as np
 import sqlalchemy as sa
@@ -13,10 +13,13 @@ import sqlalchemy as sa
 from flask import current_app
 
 from app import db
-from app.utils.etl.srtm_downloader import ensure_tile_loaded
+from app.utils.etl.srtm_downloader import ensure_tile_loaded, tile_name
+from app.utils.lru import LRU
 
 EARTH_RADIUS_M = 6371000.0
 
+_tiles = LRU(max_itens=64)  # tiles .hgt em memória (~2,9 MB cada), chave = caminho do arquivo
+
 
 def _hgt_path(lat: float, lon: float) -> Path:
     return Path(ensure_tile_loaded(lat, lon, load=False, download=False))
@@ -29,8 +32,17 @@ def _read_hgt(path: Path) -> np.ndarray:
     return data.reshape((1201, 1201))
 
 
+def _hgt_cached(path_str: str) -> np.ndarray:
+    """Tile .hgt mantido em memória (amostragem vetorizada lê cada tile uma vez por processo)."""
+    arr = _tiles.get(path_str)
+    if arr is None:
+        arr = _read_hgt(Path(path_str))
+        _tiles.set(path_str, arr)
+    return arr
+
+
 def _height_from_db(lat: float, lon: float) -> Optional[float]:
-    """Tenta obter altura via raster no PostGIS (tabela configurada)."""
+    """Tenta obter altura via raster no PostGIS (tabela configurada, blocos indexados por ST_ConvexHull)."""
     try:
         cfg = current_app.config if current_app else {}
         table = cfg.get("PROPAGATION_RASTER_TABLE", "srtm_raster")
@@ -79,6 +91,101 @@ def sample_height(lat: float, lon: float) -> Optional[float]:
         return None
 
 
+def _heights_from_db(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Alturas de vários pontos numa única consulta ao raster (NaN onde não houver cobertura)."""
+    out = np.full(lats.shape, np.nan)
+    try:
+        cfg = current_app.config if current_app else {}
+        table = cfg.get("PROPAGATION_RASTER_TABLE", "srtm_raster")
+        column = cfg.get("PROPAGATION_RASTER_COLUMN", "rast")
+        sql = sa.text(
+            f"""
+            SELECT p.idx, ST_Value(r.{column}, p.pt) AS h
+            FROM (
+              SELECT t.idx, ST_SetSRID(ST_MakePoint(t.lon, t.lat), 4326) AS pt
+              FROM unnest(CAST(:lons AS float8[]), CAST(:lats AS float8[])) WITH ORDINALITY AS t(lon, lat, idx)
+            ) p
+            JOIN {table} r ON ST_Intersects(r.{column}, p.pt);
+            """
+        )
+        rows = db.session.execute(sql, {"lats": lats.tolist(), "lons": lons.tolist()}).fetchall()
+        for row in rows:
+            if row.h is not None and np.isnan(out[row.idx - 1]):
+                out[row.idx - 1] = float(row.h)
+    except Exception:
+        db.session.rollback()
+    return out
+
+
+def _heights_from_hgt(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Alturas via tiles .hgt locais, agrupando os pontos por tile (NaN se o tile não existir)."""
+    out = np.full(lats.shape, np.nan)
+    lat_floor = np.floor(lats)
+    lon_floor = np.floor(lons)
+    for tlat, tlon in set(zip(lat_floor.tolist(), lon_floor.tolist())):
+        try:
+            path = _hgt_path(tlat + 0.5, tlon + 0.5)
+            if not path.exists():
+                continue
+            arr = _hgt_cached(str(path))
+        except Exception:
+            continue
+        sel = (lat_floor == tlat) & (lon_floor == tlon)
+        rows = np.clip(np.rint((tlat + 1 - lats[sel]) * 1200), 0, 1200).astype(int)
+        cols = np.clip(np.rint((lons[sel] - tlon) * 1200), 0, 1200).astype(int)
+        vals = arr[rows, cols].astype(float)
+        vals[vals == -32768] = np.nan
+        out[sel] = vals
+    return out
+
+
+def sample_heights(lats: Sequence[float], lons: Sequence[float], use_db: bool = True) -> np.ndarray:
+    """
+    Versão vetorizada de `sample_height`: uma consulta ao raster para todos os pontos
+    e fallback .hgt por tile. Retorna array float com NaN onde não houver dado.
+    """
+    lats_arr = np.asarray(lats, dtype=float)
+    lons_arr = np.asarray(lons, dtype=float)
+    if lats_arr.size == 0:
+        return np.empty(0)
+    out = _heights_from_db(lats_arr, lons_arr) if use_db else np.full(lats_arr.shape, np.nan)
+    falta = np.isnan(out)
+    if falta.any():
+        out[falta] = _heights_from_hgt(lats_arr[falta], lons_arr[falta])
+    return out
+
+
+def carregar_tiles(tiles: Iterable[Tuple[float, float]]) -> int:
+    """Pré-carrega no cache do processo os tiles .hgt locais (canto SW lat, lon); retorna quantos."""
+    carregados = 0
+    for tlat, tlon in tiles:
+        try:
+            path = _hgt_path(tlat + 0.5, tlon + 0.5)
+            if not path.exists():
+                continue
+            _hgt_cached(str(path))
+        except Exception:
+            continue
+        carregados += 1
+    return carregados
+
+
+def hgt_tiles_em_memoria(lats: Sequence[float], lons: Sequence[float]) -> bool:
+    """Indica se todos os tiles .hgt cobrindo os pontos já estão no cache do processo (sem I/O)."""
+    base = Path(current_app.config.get("SRTM_DOWNLOAD_DIR", "data/srtm"))
+    tiles = set(zip(np.floor(np.asarray(lats, dtype=float)).tolist(), np.floor(np.asarray(lons, dtype=float)).tolist()))
+    return all(str(base / f"{tile_name(tlat + 0.5, tlon + 0.5)}.hgt") in _tiles for tlat, tlon in tiles)
+
+
+def hgt_tiles_available(lats: Sequence[float], lons: Sequence[float]) -> bool:
+    """Indica se todos os tiles .hgt cobrindo os pontos já estão no disco local."""
+    tiles = set(zip(np.floor(np.asarray(lats, dtype=float)).tolist(), np.floor(np.asarray(lons, dtype=float)).tolist()))
+    try:
+        return all(_hgt_path(tlat + 0.5, tlon + 0.5).exists() for tlat, tlon in tiles)
+    except Exception:
+        return False
+
+
 def destination_point(lat: float, lon: float, bearing_deg: float, distance_m: float) -> Tuple[float, float]:
     """Calcula ponto destino a partir de lat/lon inicial, azimute e distância (esférica)."""
     brad = math.radians(bearing_deg)
@@ -95,6 +202,22 @@ def destination_point(lat: float, lon: float, bearing_deg: float, distance_m: fl
     return math.degrees(lat2), math.degrees(lon2)
 
 
+def destination_points(
+    lat: float, lon: float, bearings_deg: np.ndarray, distances_m: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Versão vetorizada de `destination_point` (arrays de azimutes/distâncias com broadcast)."""
+    brad = np.radians(np.asarray(bearings_deg, dtype=float))
+    ang_dist = np.asarray(distances_m, dtype=float) / EARTH_RADIUS_M
+    lat1 = math.radians(lat)
+    lon1 = math.radians(lon)
+    lat2 = np.arcsin(math.sin(lat1) * np.cos(ang_dist) + math.cos(lat1) * np.sin(ang_dist) * np.cos(brad))
+    lon2 = lon1 + np.arctan2(
+        np.sin(brad) * np.sin(ang_dist) * math.cos(lat1),
+        np.cos(ang_dist) - math.sin(lat1) * np.sin(lat2),
+    )
+    return np.degrees(lat2), np.degrees(lon2)
+
+
 def mean_height_along_radial(
     lat: float,
     lon: float,
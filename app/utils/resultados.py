@@ -0,0 +1,93 @@
+"""
+Resultados detalhados das simulações em forma compacta (`resultados_simulacao`).
+
+Arrays numéricos (distância/h_eff/campo por radial, margens por interferente, ...) são gravados
+como float32/int32 little-endian concatenados em um único bytea; `layout` guarda
+nome -> [dtype, offset, n]. Metadados pequenos (mensagens completas, flags, tempos) vão em JSON.
+Relatórios e drill-downs leem daqui em vez de recalcular a simulação.
+"""
+
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from app import db
+from app.models import ResultadoSimulacao
+
+DTYPES = {"f4": np.dtype("<f4"), "i4": np.dtype("<i4")}
+
+
+def empacotar(arrays: Dict[str, Iterable], tipos: Optional[Dict[str, str]] = None) -> tuple[bytes, dict]:
+    """Concatena os arrays (float32 por padrão; `tipos` permite 'i4') em bytes + layout."""
+    tipos = tipos or {}
+    partes: list[bytes] = []
+    layout: dict = {}
+    offset = 0
+    for nome, valores in arrays.items():
+        dtype = tipos.get(nome, "f4")
+        arr = np.asarray(list(valores) if not isinstance(valores, np.ndarray) else valores, dtype=DTYPES[dtype])
+        raw = arr.tobytes()
+        layout[nome] = [dtype, offset, int(arr.size)]
+        partes.append(raw)
+        offset += len(raw)
+    return b"".join(partes), layout
+
+
+def desempacotar(dados: bytes, layout: dict, campos: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+    """Reconstrói os arrays (sem cópia) a partir dos bytes e do layout; `campos` filtra os nomes."""
+    nomes = list(layout) if campos is None else [c for c in campos if c in layout]
+    buf = memoryview(dados)
+    saida: Dict[str, np.ndarray] = {}
+    for nome in nomes:
+        dtype, offset, n = layout[nome]
+        saida[nome] = np.frombuffer(buf, dtype=DTYPES[dtype], count=n, offset=offset)
+    return saida
+
+
+def gravar_resultado(
+    sim_id: str, meta: dict, arrays: Dict[str, Iterable], tipos: Optional[Dict[str, str]] = None
+) -> ResultadoSimulacao:
+    """Insere/substitui o resultado da simulação na sessão atual (o commit fica com o chamador)."""
+    dados, layout = empacotar(arrays, tipos)
+    res = ResultadoSimulacao.query.get(sim_id)
+    if res is None:
+        res = ResultadoSimulacao(simulacao_id=sim_id)
+        db.session.add(res)
+    res.meta = meta
+    res.layout = layout
+    res.dados = dados
+    return res
+
+
+def resultado_para_dict(res: ResultadoSimulacao, campos: Optional[Iterable[str]] = None) -> dict:
+    """Meta + arrays como listas (float32 arredondado a 4 casas; NaN -> None), para resposta JSON."""
+    saida = {}
+    for nome, arr in desempacotar(res.dados, res.layout, campos).items():
+        if arr.dtype.kind == "f":
+            arr = np.round(arr.astype(np.float64), 4)
+            saida[nome] = [None if np.isnan(v) else v for v in arr.tolist()]
+        else:
+            saida[nome] = arr.tolist()
+    return {"simulacao_id": res.simulacao_id, "meta": res.meta or {}, "arrays": saida}
+
+
+MODELOS_INTERFERENCIA = ["P.526/Assis", "P.1546"]
+
+
+def gravar_resultado_estacao(
+    sim_id: str, meta: dict, radiais: Dict[str, list], interferentes: Optional[list] = None
+) -> ResultadoSimulacao:
+    """
+    Resultado de contorno/viabilidade de uma estação: arrays `radiais.*` (um valor por radial) e,
+    se avaliados, `interferentes.*` (id, dist_km, delta, ci_requerida_db, campo_dbuv_m, margem_db,
+    modelo = índice em meta["modelos"]).
+    """
+    arrays: Dict[str, Iterable] = {f"radiais.{k}": v for k, v in radiais.items()}
+    tipos = {"radiais.azimute": "i4"}
+    if interferentes is not None:
+        meta = {**meta, "modelos": MODELOS_INTERFERENCIA}
+        for chave in ("id", "dist_km", "delta", "ci_requerida_db", "campo_dbuv_m", "margem_db"):
+            arrays[f"interferentes.{chave}"] = [d[chave] for d in interferentes]
+        arrays["interferentes.modelo"] = [MODELOS_INTERFERENCIA.index(d["modelo"]) for d in interferentes]
+        tipos.update({"interferentes.id": "i4", "interferentes.delta": "f4", "interferentes.modelo": "i4"})
+    return gravar_resultado(sim_id, meta, arrays, tipos)
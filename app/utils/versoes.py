@@ -0,0 +1,31 @@
+"""
+Versões dos conjuntos de dados (`versoes_dados`): um contador por nome, incrementado na mesma
+transação que altera os dados. Caches derivados (tiles vetoriais, estatísticas, ...) incluem a
+versão na chave, então uma carga nova invalida tudo sem apagar nada (entradas antigas expiram por TTL).
+"""
+
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import insert
+
+from app import db
+from app.models import VersaoDados
+
+
+def versao(nome: str) -> int:
+    """Versão atual (0 se o conjunto nunca foi versionado)."""
+    atual = db.session.query(VersaoDados.versao).filter(VersaoDados.nome == nome).scalar()
+    return int(atual or 0)
+
+
+def incrementar(nome: str, conn=None) -> int:
+    """
+    Incrementa a versão na sessão atual (ou na conexão `conn`, para ETLs com transação própria);
+    o commit fica com o chamador. Retorna o novo valor.
+    """
+    stmt = insert(VersaoDados).values(nome=nome, versao=1, atualizado_em=datetime.utcnow())
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[VersaoDados.nome],
+        set_={"versao": VersaoDados.versao + 1, "atualizado_em": stmt.excluded.atualizado_em},
+    ).returning(VersaoDados.versao)
+    return int((conn if conn is not None else db.session).execute(stmt).scalar())
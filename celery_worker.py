@@ -1,4 +1,7 @@
+from celery.signals import worker_init, worker_process_init
+
 from app import create_app, make_celery
+from app.utils.aquecimento import aquecer, estado, reiniciar_conexoes
 
 flask_app = create_app()
 celery = make_celery(flask_app)
@@ -7,6 +10,23 @@ celery = make_celery(flask_app)
 celery.autodiscover_tasks(["app.tasks"])
 
 
+@worker_init.connect
+def _aquecer_worker(**_):
+    """Processo principal do worker: aquece antes de criar o pool (filhos herdam via fork)."""
+    import app.tasks  # noqa: F401  (pandas/curvas carregados no pai)
+
+    aquecer(flask_app)
+
+
+@worker_process_init.connect
+def _iniciar_processo(**_):
+    """Filho do pool: conexões novas; aquece aqui só se o pai não aqueceu (ex.: start method spawn)."""
+    if estado()["pronto"]:
+        reiniciar_conexoes(flask_app)
+    else:
+        aquecer(flask_app)
+
+
 @celery.task(name="app.tasks.healthcheck")
 def healthcheck() -> str:
     """Tarefa simples para validar se o worker está ativo."""
@@ -6,6 +6,14 @@ class BaseConfig:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
     CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", CELERY_BROKER_URL)
+    # Estado efêmero (progresso/SSE, flags, caches); "memory://" usa stand-in em processo.
+    KVSTORE_URL = os.getenv("KVSTORE_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    SSE_HEARTBEAT_S = 15
+    SSE_MAX_S = int(os.getenv("SSE_MAX_S", "90"))  # abaixo do timeout do gunicorn (120 s); o cliente reconecta
+    # Tiles vetoriais (/api/v1/gis/tiles): cache no kvstore por versão dos dados.
+    MVT_CACHE_TTL_S = int(os.getenv("MVT_CACHE_TTL_S", "86400"))
+    MVT_MAX_AGE_S = 60  # Cache-Control do cliente (URL não carrega a versão)
+    MVT_ZOOM_AGRUPAMENTO = 8  # abaixo deste zoom, estações agrupadas em grade
     JSON_SORT_KEYS = False
     PROPAGATION_DEFAULT_SRID = 4674  # SIRGAS 2000
     PROPAGATION_SAMPLE_POINTS = 72  # radiais de 5 em 5°
@@ -16,6 +24,57 @@ class BaseConfig:
         "SRTM_BASE_URL", "https://s3.amazonaws.com/elevation-tiles-prod/skadi"
     )
     SRTM_DOWNLOAD_DIR = os.getenv("SRTM_DOWNLOAD_DIR", "data/srtm")
+    # Raster no PostGIS: blocos de N x N px (índice GiST por bloco) e overviews 1:4 e 1:16.
+    SRTM_RASTER_BLOCO = 100
+    SRTM_RASTER_OVERVIEWS = (4, 16)
+    # Grade nacional de população (app.utils.etl.build_pop_grid): 1/120° ≈ 0,9 km.
+    POP_GRADE_DIR = os.getenv("POP_GRADE_DIR", "data/pop_grid")
+    POP_GRADE_RES_GRAUS = 1 / 120
+    # Aquecimento antes do fork (app.utils.aquecimento): tiles .hgt com mais estações carregados no
+    # processo pai (limitado ao cache de tiles) e arquivo criado quando pronto ("" = não cria).
+    AQUECIMENTO_TILES_MAX = int(os.getenv("AQUECIMENTO_TILES_MAX", "64"))
+    AQUECIMENTO_ARQUIVO_PRONTO = os.getenv("AQUECIMENTO_ARQUIVO_PRONTO", "")
+    # Interferência ponto-a-ponto em lote: até INLINE_MAX pares calcula na requisição
+    # (só com tiles .hgt já em memória).
+    INTERFERENCIA_LOTE_MAX = int(os.getenv("INTERFERENCIA_LOTE_MAX", "1000"))
+    INTERFERENCIA_LOTE_INLINE_MAX = int(os.getenv("INTERFERENCIA_LOTE_INLINE_MAX", "10"))
+    # Viabilidade em lote (group/chord): itens por task e limite por lote.
+    VIABILIDADE_LOTE_CHUNK = int(os.getenv("VIABILIDADE_LOTE_CHUNK", "25"))
+    VIABILIDADE_LOTE_MAX = int(os.getenv("VIABILIDADE_LOTE_MAX", "20000"))
+    # Filas Celery: "interativo" (uma estação, resposta rápida) e "lote" (lotes/jobs nacionais).
+    # Workers dedicados por fila (-Q) evitam que um lote nacional segure requisições interativas.
+    CELERY_FILA_INTERATIVA = "interativo"
+    CELERY_FILA_LOTE = "lote"
+    # Jobs com até N itens (estações/pares) são enfileirados como interativos (ver app.tasks.submissao).
+    CELERY_LIMIAR_INTERATIVO = int(os.getenv("CELERY_LIMIAR_INTERATIVO", "10"))
+    # Prioridades no transporte Redis: 0 = mais alta, 9 = mais baixa.
+    CELERY_PRIORIDADE_INTERATIVA = 0
+    CELERY_PRIORIDADE_LOTE = 6
+    CELERY_PRIORIDADE_NACIONAL = 9
+    # Roteamento estático para a fila de lote (padrão de nome -> prioridade); submissões explícitas
+    # (fila/prioridade por tamanho do job) têm precedência.
+    CELERY_ROTAS_LOTE = {
+        "app.tasks.lote.*": CELERY_PRIORIDADE_LOTE,
+        "app.tasks.matriz.*": CELERY_PRIORIDADE_NACIONAL,
+        "app.tasks.estatisticas.*": CELERY_PRIORIDADE_NACIONAL,
+    }
+    # Limites de tempo (soft, hard) em segundos; soft levanta SoftTimeLimitExceeded na tarefa.
+    CELERY_LIMITES_TEMPO = {
+        "app.tasks.fm.viabilidade": (300, 360),
+        "app.tasks.fm.contorno": (300, 360),
+        "app.tasks.tv.viabilidade": (300, 360),
+        "app.tasks.tv.contorno": (300, 360),
+        "app.tasks.radcom.viabilidade": (60, 90),
+        "app.tasks.interferencia.lote": (1800, 1900),
+        "app.tasks.lote.viabilidade": (120, 180),
+        "app.tasks.lote.chunk": (3600, 3700),
+        "app.tasks.lote.consolidar": (300, 360),
+        "app.tasks.matriz.calcular": (120, 180),
+        "app.tasks.matriz.tile": (3600, 3700),
+        "app.tasks.matriz.finalizar": (300, 360),
+        "app.tasks.matriz.atualizar": (1800, 1900),
+        "app.tasks.estatisticas.contorno": (300, 360),
+    }
 
 
 class DevConfig(BaseConfig):
@@ -29,3 +88,4 @@ class ProdConfig(BaseConfig):
 class TestConfig(BaseConfig):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = os.getenv("TEST_DATABASE_URL", "sqlite:///:memory:")
+    KVSTORE_URL = os.getenv("TEST_KVSTORE_URL", "memory://")
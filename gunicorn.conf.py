@@ -0,0 +1,34 @@
+"""
+Configuração do gunicorn: `gunicorn -c gunicorn.conf.py wsgi:app`.
+
+Com `preload_app` a aplicação é importada no master; `when_ready` aquece o processo
+(app.utils.aquecimento: curvas P.1546, normas, terreno, grade de população) antes de criar os
+workers, que herdam tudo via fork (copy-on-write) e já respondem 200 em `GET /ready`.
+
+Workers `gthread`: streams SSE (`/simulacoes/<id>/eventos`) ocupam uma thread, não o worker
+inteiro, e o worker continua mandando heartbeat ao arbiter enquanto a stream está aberta.
+SSE_MAX_S fica abaixo de `timeout` (o EventSource reconecta e recebe o último evento).
+"""
+
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "16"))  # streams SSE simultâneas + requisições por worker
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = True
+
+
+def when_ready(server):
+    from app.utils.aquecimento import aquecer
+    from wsgi import app
+
+    aquecer(app)
+
+
+def post_fork(server, worker):
+    from app.utils.aquecimento import reiniciar_conexoes
+    from wsgi import app
+
+    reiniciar_conexoes(app)
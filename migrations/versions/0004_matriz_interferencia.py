@@ -0,0 +1,53 @@
+"""Interference matrix (sparse pairs) and per-tile checkpoints."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0004_matriz_interferencia"
+down_revision = "0003_setores_geom_generic"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "matriz_interferencia",
+        sa.Column("servico", sa.String(length=8), nullable=False),
+        sa.Column("desejado_id", sa.Integer(), nullable=False),
+        sa.Column("interferente_id", sa.Integer(), nullable=False),
+        sa.Column("dist_km", sa.Float(), nullable=True),
+        sa.Column("delta", sa.Float(), nullable=True),
+        sa.Column("campo_dbuv_m", sa.Float(), nullable=False),
+        sa.Column("ci_requerida_db", sa.Float(), nullable=False),
+        sa.Column("margem_db", sa.Float(), nullable=False),
+        sa.Column("modelo", sa.String(length=32), nullable=False),
+        sa.Column("atualizado_em", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("servico", "desejado_id", "interferente_id"),
+    )
+    op.create_index(
+        "idx_matriz_interferencia_interferente", "matriz_interferencia", ["servico", "interferente_id"]
+    )
+    op.create_index("idx_matriz_interferencia_margem", "matriz_interferencia", ["servico", "margem_db"])
+    op.create_table(
+        "matriz_interferencia_tiles",
+        sa.Column("servico", sa.String(length=8), nullable=False),
+        sa.Column("tile", sa.String(length=16), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("pares", sa.Integer(), nullable=True),
+        sa.Column("mensagem", sa.String(length=255), nullable=True),
+        sa.Column("atualizado_em", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("servico", "tile"),
+    )
+    # Poda espacial dos pares usa ST_DWithin em geography.
+    op.execute("CREATE INDEX IF NOT EXISTS idx_estacoes_fm_geog ON estacoes_fm USING gist ((geom::geography))")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_estacoes_tv_geog ON estacoes_tv USING gist ((geom::geography))")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS idx_estacoes_tv_geog")
+    op.execute("DROP INDEX IF EXISTS idx_estacoes_fm_geog")
+    op.drop_table("matriz_interferencia_tiles")
+    op.drop_index("idx_matriz_interferencia_margem", table_name="matriz_interferencia")
+    op.drop_index("idx_matriz_interferencia_interferente", table_name="matriz_interferencia")
+    op.drop_table("matriz_interferencia")
@@ -0,0 +1,26 @@
+"""Add JSON result column to simulacoes (batch jobs)."""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0005_simulacao_resultado"
+down_revision = "0004_matriz_interferencia"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "simulacoes",
+        sa.Column(
+            "resultado",
+            sa.JSON().with_variant(postgresql.JSONB(astext_type=sa.Text()), "postgresql"),
+            nullable=True,
+        ),
+    )
+
+
+def downgrade():
+    op.drop_column("simulacoes", "resultado")
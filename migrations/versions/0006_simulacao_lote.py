@@ -0,0 +1,22 @@
+"""Link child simulations to a batch (lote) simulation."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0006_simulacao_lote"
+down_revision = "0005_simulacao_resultado"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("simulacoes", sa.Column("lote_id", sa.String(length=36), nullable=True))
+    op.create_foreign_key("fk_simulacoes_lote", "simulacoes", "simulacoes", ["lote_id"], ["id"])
+    op.create_index("ix_simulacoes_lote_id", "simulacoes", ["lote_id"])
+
+
+def downgrade():
+    op.drop_index("ix_simulacoes_lote_id", table_name="simulacoes")
+    op.drop_constraint("fk_simulacoes_lote", "simulacoes", type_="foreignkey")
+    op.drop_column("simulacoes", "lote_id")
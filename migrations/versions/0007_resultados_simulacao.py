@@ -0,0 +1,31 @@
+"""Compact per-simulation results (metadata + packed numeric arrays)."""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0007_resultados_simulacao"
+down_revision = "0006_simulacao_lote"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "resultados_simulacao",
+        sa.Column(
+            "simulacao_id",
+            sa.String(length=36),
+            sa.ForeignKey("simulacoes.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("meta", postgresql.JSONB(), nullable=True),
+        sa.Column("layout", postgresql.JSONB(), nullable=False),
+        sa.Column("dados", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table("resultados_simulacao")
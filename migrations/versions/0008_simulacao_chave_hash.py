@@ -0,0 +1,26 @@
+"""Submission hash on simulacoes for in-flight deduplication."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0008_simulacao_chave_hash"
+down_revision = "0007_resultados_simulacao"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("simulacoes", sa.Column("chave_hash", sa.String(length=64), nullable=True))
+    op.create_index(
+        "uq_simulacoes_chave_ativa",
+        "simulacoes",
+        ["chave_hash"],
+        unique=True,
+        postgresql_where=sa.text("status IN ('queued', 'running') AND chave_hash IS NOT NULL"),
+    )
+
+
+def downgrade():
+    op.drop_index("uq_simulacoes_chave_ativa", table_name="simulacoes")
+    op.drop_column("simulacoes", "chave_hash")
@@ -0,0 +1,18 @@
+"""Celery task id on simulacoes (cancellation)."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0009_simulacao_task_id"
+down_revision = "0008_simulacao_chave_hash"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("simulacoes", sa.Column("task_id", sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    op.drop_column("simulacoes", "task_id")
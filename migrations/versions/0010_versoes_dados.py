@@ -0,0 +1,23 @@
+"""Data version counters (cache invalidation for vector tiles and derived data)."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0010_versoes_dados"
+down_revision = "0009_simulacao_task_id"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "versoes_dados",
+        sa.Column("nome", sa.String(length=64), primary_key=True),
+        sa.Column("versao", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("atualizado_em", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table("versoes_dados")
@@ -0,0 +1,35 @@
+"""Subdivided census sectors with precomputed area (fast overlays)."""
+
+from alembic import op
+import sqlalchemy as sa
+from geoalchemy2 import Geometry
+
+# revision identifiers, used by Alembic.
+revision = "0011_setores_subdivididos"
+down_revision = "0010_versoes_dados"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "setores_subdivididos",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "setor_id",
+            sa.String(length=32),
+            sa.ForeignKey("setores_censitarios.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("area_km2", sa.Float(), nullable=False),
+        sa.Column("fracao_setor", sa.Float(), nullable=False),
+        sa.Column("geom", Geometry(geometry_type="GEOMETRY", srid=4674, spatial_index=False), nullable=False),
+    )
+    op.create_index("idx_setores_subdivididos_setor", "setores_subdivididos", ["setor_id"])
+    op.execute("CREATE INDEX idx_setores_subdivididos_geom ON setores_subdivididos USING gist (geom)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS idx_setores_subdivididos_geom")
+    op.drop_index("idx_setores_subdivididos_setor", table_name="setores_subdivididos")
+    op.drop_table("setores_subdivididos")
@@ -0,0 +1,33 @@
+"""Persisted contour statistics (area, population, per-municipality breakdown)."""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0012_estatisticas_contorno"
+down_revision = "0011_setores_subdivididos"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "estatisticas_contorno",
+        sa.Column(
+            "contorno_id",
+            sa.Integer(),
+            sa.ForeignKey("resultados_cobertura.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("versao_censo", sa.BigInteger(), nullable=False),
+        sa.Column("area_km2", sa.Float(), nullable=False),
+        sa.Column("pop_estimada", sa.Float(), nullable=True),
+        sa.Column("setores_intersect", sa.Integer(), nullable=False),
+        sa.Column("por_municipio", postgresql.JSONB(), nullable=True),
+        sa.Column("calculado_em", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table("estatisticas_contorno")
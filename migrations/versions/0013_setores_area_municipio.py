@@ -0,0 +1,31 @@
+"""Census sectors: stored geodesic area and municipality code."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0013_setores_area_municipio"
+down_revision = "0012_estatisticas_contorno"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("setores_censitarios", sa.Column("cod_municipio", sa.String(length=7), nullable=True))
+    op.add_column("setores_censitarios", sa.Column("area_km2", sa.Float(), nullable=True))
+    op.execute("UPDATE setores_censitarios SET cod_municipio = substring(id from 1 for 7)")
+    op.execute(
+        """
+        UPDATE setores_censitarios s
+        SET area_km2 = a.area_km2
+        FROM (SELECT setor_id, SUM(area_km2) AS area_km2 FROM setores_subdivididos GROUP BY setor_id) a
+        WHERE s.id = a.setor_id
+        """
+    )
+    op.create_index("idx_setores_censitarios_cod_municipio", "setores_censitarios", ["cod_municipio"])
+
+
+def downgrade():
+    op.drop_index("idx_setores_censitarios_cod_municipio", table_name="setores_censitarios")
+    op.drop_column("setores_censitarios", "area_km2")
+    op.drop_column("setores_censitarios", "cod_municipio")
@@ -0,0 +1,24 @@
+"""Stations: technical hash column and plan-key indexes for diff reloads."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0014_estacoes_hash_tecnico"
+down_revision = "0013_setores_area_municipio"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("estacoes_fm", sa.Column("hash_tecnico", sa.String(length=40), nullable=True))
+    op.add_column("estacoes_tv", sa.Column("hash_tecnico", sa.String(length=40), nullable=True))
+    op.execute("CREATE INDEX idx_estacoes_fm_chave_plano ON estacoes_fm ((COALESCE(id_plano, id_mosaico)))")
+    op.create_index("idx_estacoes_tv_id_plano", "estacoes_tv", ["id_plano"])
+
+
+def downgrade():
+    op.drop_index("idx_estacoes_tv_id_plano", table_name="estacoes_tv")
+    op.execute("DROP INDEX IF EXISTS idx_estacoes_fm_chave_plano")
+    op.drop_column("estacoes_tv", "hash_tecnico")
+    op.drop_column("estacoes_fm", "hash_tecnico")
@@ -0,0 +1,29 @@
+"""Precomputed per-station propagation parameters (packed float32 arrays)."""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0015_estacoes_propagacao"
+down_revision = "0014_estacoes_hash_tecnico"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "estacoes_propagacao",
+        sa.Column("servico", sa.String(length=2), primary_key=True),
+        sa.Column("estacao_id", sa.Integer(), primary_key=True),
+        sa.Column("hash_tecnico", sa.String(length=40), nullable=False),
+        sa.Column("versao_terreno", sa.BigInteger(), nullable=False),
+        sa.Column("altitude_m", sa.Float(), nullable=True),
+        sa.Column("layout", postgresql.JSONB(), nullable=False),
+        sa.Column("dados", sa.LargeBinary(), nullable=False),
+        sa.Column("calculado_em", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table("estacoes_propagacao")
@@ -3,4 +3,7 @@ from app import create_app
 app = create_app()
 
 if __name__ == "__main__":
+    from app.utils.aquecimento import aquecer
+
+    aquecer(app)
     app.run(host="0.0.0.0", port=5000)